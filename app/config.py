@@ -14,6 +14,102 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
+    # Response cache (endpoint /status dan halaman awal /list)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 4096
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    RESPONSE_CACHE_LIST_MAX_SKIP: int = 200  # hanya cache halaman /list dengan skip < nilai ini
+    
+    # Idempotency-Key untuk POST /api/pmb/register
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_MAX_KEYS: int = 100_000
+    
+    # Rate limiting per client (token bucket), 0 per minute = nonaktif untuk route tsb
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REGISTER_PER_MINUTE: float = 30.0
+    RATE_LIMIT_REGISTER_BURST: int = 10
+    RATE_LIMIT_STATUS_PER_MINUTE: float = 120.0
+    RATE_LIMIT_STATUS_BURST: int = 30
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000
+    # API key terdaftar (JSON list di env) yang mendapat bucket sendiri; key lain memakai bucket IP
+    RATE_LIMIT_API_KEYS: list[str] = []
+    
+    # Adaptive concurrency limit (AIMD) dan load shedding per kelas route
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_WRITE_INITIAL_LIMIT: int = 8
+    CONCURRENCY_WRITE_MIN_LIMIT: int = 1
+    CONCURRENCY_WRITE_MAX_LIMIT: int = 32
+    CONCURRENCY_WRITE_TARGET_LATENCY_MS: float = 250.0
+    CONCURRENCY_READ_INITIAL_LIMIT: int = 64
+    CONCURRENCY_READ_MIN_LIMIT: int = 4
+    CONCURRENCY_READ_MAX_LIMIT: int = 256
+    CONCURRENCY_READ_TARGET_LATENCY_MS: float = 100.0
+    
+    # Group-commit registrasi: batch insert dalam satu transaksi
+    REGISTRATION_GROUP_COMMIT_ENABLED: bool = False
+    REGISTRATION_BATCH_MAX_ROWS: int = 64
+    REGISTRATION_BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # Deteksi duplikat saat register: off | warn (header X-Possible-Duplicates) | block (409)
+    DUPLICATE_CHECK_MODE: str = "warn"
+    DUPLICATE_MIN_SCORE: float = 0.7
+    
+    # Maksimal ID per request POST /api/pmb/status/bulk
+    BULK_STATUS_MAX_IDS: int = 500
+    
+    # Live feed dashboard (SSE): jendela coalescing delta dan antrian per koneksi
+    LIVE_FEED_COALESCE_MS: float = 250.0
+    LIVE_FEED_QUEUE_SIZE: int = 64
+    LIVE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    
+    # Event bus: ukuran antrian per subscriber async (event di-drop jika penuh)
+    EVENT_BUS_QUEUE_SIZE: int = 1000
+    
+    # Notifikasi approval (transactional outbox + dispatcher background)
+    NOTIFICATION_DISPATCHER_ENABLED: bool = True
+    NOTIFICATION_SENDER: str = "pmb@universitas.ac.id"
+    NOTIFICATION_BATCH_SIZE: int = 50
+    NOTIFICATION_CONCURRENCY: int = 4
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BASE_SECONDS: float = 30.0
+    NOTIFICATION_POLL_INTERVAL_SECONDS: float = 2.0
+    # Lease baris sending; setelah lewat dianggap ditinggal dispatcher yang mati
+    NOTIFICATION_LEASE_SECONDS: float = 300.0
+    
+    # SMTP (default: server lokal untuk development, mis. python -m aiosmtpd -n -l localhost:1025)
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_USE_TLS: bool = False
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    
+    # Job background admin (POST /api/jobs)
+    JOB_MAX_WORKERS: int = 4
+    JOB_EXPORT_DIR: str = "exports"
+    JOB_RESULT_MAX_ITEMS: int = 100
+    # Heartbeat job running; tanpa heartbeat selama lease job dianggap terputus
+    JOB_HEARTBEAT_SECONDS: float = 10.0
+    JOB_LEASE_SECONDS: float = 60.0
+    
+    # Upload dokumen calon (ijazah, foto, KK)
+    UPLOAD_DIR: str = "uploads"
+    UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024
+    
+    # Feed perubahan GET /api/pmb/changes: ukuran halaman maksimal
+    CHANGES_MAX_PAGE_SIZE: int = 1000
+    
+    # Seleksi berbasis skor: jumlah maksimal pilihan prodi per calon
+    SELEKSI_MAX_PILIHAN: int = 3
+    
+    # Backup online database SQLite (python backup_db.py / scheduler)
+    BACKUP_DIR: str = "backups"
+    BACKUP_METHOD: str = "backup"  # backup (online backup API per page) | vacuum (VACUUM INTO)
+    BACKUP_PAGES_PER_STEP: int = 256
+    BACKUP_STEP_SLEEP_SECONDS: float = 0.01
+    BACKUP_KEEP: int = 7
+    BACKUP_INTERVAL_MINUTES: float = 0  # 0 = scheduler nonaktif
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,318 @@
+"""
+Domain event bus untuk perubahan status calon mahasiswa
+
+Handler router mem-publish event (Registered, Approved, Rejected,
+BulkRejected, BulkApproved, SkorUpdated) setelah transaksi ter-commit; state
+turunan (cache, live feed, index peringkat, ...) dipelihara oleh subscriber
+tanpa perlu di-wire satu per satu di setiap handler.
+
+Dua jenis subscriber:
+- sync: dijalankan langsung saat publish. Untuk pekerjaan murah yang harus
+  selesai sebelum response dikirim (mis. invalidasi cache, read-your-writes)
+  atau yang urutannya harus terjaga (live feed: delta harus sampai ke
+  LiveFeed sebelum dashboard baru mengambil snapshot, dan tidak boleh
+  hilang).
+- async: setiap subscriber punya antrian terbatas dan worker thread sendiri.
+  Publish tidak pernah menunggu; jika antrian penuh event di-drop dan
+  dihitung (back-pressure), sehingga subscriber lambat tidak menambah
+  latency write path.
+
+Counter yang harus konsisten dengan data (rollup, stats cube) tetap di-update
+di dalam transaksi, bukan lewat event bus.
+"""
+
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, ClassVar, Optional
+
+from app.config import settings
+from app.models import StatusPendaftaran
+from app.utils.cache import invalidate_calon, invalidate_calon_many
+from app.utils.live_feed import live_feed, status_delta
+from app.utils.outbox import wake_notification_dispatcher
+from app.utils.ranking import rank_index
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+# ================== EVENTS ==================
+
+@dataclass(frozen=True, kw_only=True)
+class ApplicantEvent:
+    """Base event perubahan status calon mahasiswa"""
+    calon_id: int
+    program_studi_id: int
+    jalur_masuk_id: int
+    old_status: Optional[StatusPendaftaran] = None
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+
+    new_status: ClassVar[StatusPendaftaran]
+
+    @property
+    def status_values(self) -> tuple:
+        """Status lama (jika ada) dan baru, untuk invalidasi"""
+        if self.old_status is None:
+            return (self.new_status.value,)
+        return (self.old_status.value, self.new_status.value)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Registered(ApplicantEvent):
+    """Calon mahasiswa baru terdaftar (status pending)"""
+    program_studi_nama: str
+    jalur_masuk_nama: str
+
+    new_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.PENDING
+
+
+@dataclass(frozen=True, kw_only=True)
+class Approved(ApplicantEvent):
+    """Calon mahasiswa di-approve dan mendapat NIM"""
+    nim: str
+
+    new_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.APPROVED
+
+
+@dataclass(frozen=True, kw_only=True)
+class Rejected(ApplicantEvent):
+    """Calon mahasiswa ditolak"""
+
+    new_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.REJECTED
+
+
+@dataclass(frozen=True, kw_only=True)
+class BulkStatusChanged:
+    """Base event banyak calon pending berubah status sekaligus (UPDATE set-based)"""
+    calon_ids: tuple
+    program_studi_ids: tuple
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+
+    old_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.PENDING
+    new_status: ClassVar[StatusPendaftaran]
+
+
+@dataclass(frozen=True, kw_only=True)
+class BulkRejected(BulkStatusChanged):
+    """Calon pending yang cocok dengan filter ditolak sekaligus"""
+
+    new_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.REJECTED
+
+
+@dataclass(frozen=True, kw_only=True)
+class BulkApproved(BulkStatusChanged):
+    """Hasil seleksi diterapkan: calon pending diterima sekaligus"""
+
+    new_status: ClassVar[StatusPendaftaran] = StatusPendaftaran.APPROVED
+
+
+@dataclass(frozen=True, kw_only=True)
+class SkorUpdated:
+    """Skor seleksi dan pilihan program studi calon pending di-set"""
+    calon_id: int
+    jalur_masuk_id: int
+    skor: float
+    # program_studi_id terurut prioritas (tanpa pilihan = prodi saat mendaftar)
+    pilihan: tuple
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+
+
+# ================== BUS ==================
+
+class _AsyncSubscriber:
+    """Antrian terbatas + worker thread untuk satu subscriber async"""
+
+    def __init__(self, name: str, handler: Callable, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, event: ApplicantEvent) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """Tunggu sampai semua event di antrian selesai diproses (test / shutdown)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        done.wait(timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "queued": self._queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"event-subscriber-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                return
+            if isinstance(event, threading.Event):
+                event.set()
+                continue
+            try:
+                self.handler(event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("Subscriber %s gagal memproses %s", self.name, type(event).__name__)
+
+
+class EventBus:
+    """Event bus in-process dengan dispatch berdasarkan tipe event"""
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._sync: dict = {}
+        self._async: dict = {}
+        self._async_subscribers: list = []
+        self.published = 0
+
+    def subscribe(self, event_type: type, handler: Callable) -> None:
+        """Subscriber sync, dijalankan di thread publisher"""
+        self._sync.setdefault(event_type, []).append(handler)
+
+    def subscribe_async(
+        self,
+        event_type: type,
+        handler: Callable,
+        name: Optional[str] = None,
+        queue_size: Optional[int] = None,
+    ) -> None:
+        """Subscriber async dengan antrian terbatas dan worker thread sendiri"""
+        subscriber = _AsyncSubscriber(
+            name or getattr(handler, "__name__", repr(handler)),
+            handler,
+            queue_size or self.queue_size,
+        )
+        self._async.setdefault(event_type, []).append(subscriber)
+        self._async_subscribers.append(subscriber)
+
+    def publish(self, event) -> None:
+        """
+        Publish event setelah commit; tidak pernah raise dan tidak pernah blocking
+
+        Subscriber terdaftar untuk base class (mis. ApplicantEvent) menerima
+        semua subclass-nya.
+        """
+        self.published += 1
+        for event_type in type(event).__mro__:
+            for handler in self._sync.get(event_type, ()):
+                try:
+                    handler(event)
+                except Exception:
+                    logger.exception("Subscriber sync gagal memproses %s", type(event).__name__)
+            for subscriber in self._async.get(event_type, ()):
+                subscriber.offer(event)
+
+    def drain(self, timeout: Optional[float] = 5.0) -> None:
+        """Tunggu semua subscriber async menyelesaikan antriannya"""
+        for subscriber in self._async_subscribers:
+            subscriber.drain(timeout)
+
+    def stop(self) -> None:
+        """Proses sisa antrian lalu hentikan worker thread subscriber async"""
+        for subscriber in self._async_subscribers:
+            subscriber.stop()
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "async_subscribers": [subscriber.stats() for subscriber in self._async_subscribers],
+        }
+
+
+event_bus = EventBus(queue_size=settings.EVENT_BUS_QUEUE_SIZE)
+
+
+# ================== DEFAULT SUBSCRIBERS ==================
+
+def _invalidate_cache(event: ApplicantEvent) -> None:
+    invalidate_calon(event.calon_id, event.program_studi_id, *event.status_values)
+
+
+def _invalidate_cache_bulk(event: BulkStatusChanged) -> None:
+    invalidate_calon_many(
+        event.calon_ids, event.program_studi_ids, event.old_status.value, event.new_status.value
+    )
+
+
+def _publish_live_delta(event: ApplicantEvent) -> None:
+    if isinstance(event, Registered):
+        live_feed.publish(status_delta(
+            None, event.new_status, event.program_studi_nama, event.jalur_masuk_nama
+        ))
+    else:
+        live_feed.publish(status_delta(event.old_status, event.new_status))
+
+
+def _publish_live_delta_bulk(event: BulkStatusChanged) -> None:
+    live_feed.publish(status_delta(event.old_status, event.new_status, count=len(event.calon_ids)))
+
+
+def _update_rank(event: SkorUpdated) -> None:
+    rank_index.update(event.calon_id, event.skor, event.jalur_masuk_id, event.pilihan)
+
+
+def _remove_rank(event: ApplicantEvent) -> None:
+    if event.old_status == StatusPendaftaran.PENDING:
+        rank_index.remove((event.calon_id,))
+
+
+def _remove_rank_bulk(event: BulkStatusChanged) -> None:
+    rank_index.remove(event.calon_ids)
+
+
+def register_default_subscribers(bus: EventBus) -> None:
+    """
+    Subscriber bawaan aplikasi: invalidasi cache, index peringkat, dispatcher
+    notifikasi dan live feed
+
+    Semuanya sync. LiveFeed.publish sudah thread-safe, tidak memblok dan
+    meng-coalesce delta; lewat antrian async delta bisa terlambat (terhitung
+    dua kali oleh snapshot dashboard baru) atau di-drop tanpa resync.
+    """
+    bus.subscribe(ApplicantEvent, _invalidate_cache)
+    bus.subscribe(BulkStatusChanged, _invalidate_cache_bulk)
+    bus.subscribe(SkorUpdated, _update_rank)
+    bus.subscribe(ApplicantEvent, _remove_rank)
+    bus.subscribe(BulkStatusChanged, _remove_rank_bulk)
+    bus.subscribe(Approved, wake_notification_dispatcher)
+    bus.subscribe(BulkApproved, wake_notification_dispatcher)
+    bus.subscribe(ApplicantEvent, _publish_live_delta)
+    bus.subscribe(BulkStatusChanged, _publish_live_delta_bulk)
@@ -1,12 +1,33 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import init_db, Base, engine
-from app.routers import pmb, master_data
+from app.database import init_db, Base, engine, SessionLocal, get_db
+from app.routers import pmb, master_data, jobs
 from app.models import CalonMahasiswa, ProgramStudi, JalurMasuk
+from app.utils.concurrency import AdaptiveConcurrencyMiddleware, limiters as concurrency_limiters
+from app.utils.cache import response_cache
+from app.utils.ranking import rank_index
+from app.utils.rate_limit import limiters as rate_limiters
+from app.utils.write_behind import stop_registration_writers
+from app.utils.search import ensure_search_index
+from app.utils.migrations import ensure_schema
+from app.utils.rollups import ensure_rollups
+from app.utils.stats_cube import ensure_stats_cube
+from app.utils.live_feed import live_feed
+from app.events import event_bus, register_default_subscribers
+from app.utils.outbox import outbox_metrics, start_notification_dispatcher, stop_notification_dispatcher
+from app.utils.jobs import get_job_runner, stop_job_runners
+from app.utils.backup import start_backup_scheduler, stop_backup_scheduler, backup_scheduler_stats
 
 # Initialize database
 Base.metadata.create_all(bind=engine)
+# Kolom / index baru pada database yang dibuat versi sebelumnya
+ensure_schema(engine)
+ensure_search_index(engine)
+# Rollup time-series dan stats cube untuk data yang ada sebelum tabelnya dibuat
+ensure_rollups(engine)
+ensure_stats_cube(engine)
 
 # Create FastAPI app
 app = FastAPI(
@@ -15,6 +36,12 @@ app = FastAPI(
     description="Sistem Penerimaan Mahasiswa Baru (PMB) dengan NIM Auto-Generate"
 )
 
+# Load shedding: tolak request berlebih lebih awal dengan 503. Ditambahkan
+# sebelum CORS (middleware terakhir = terluar) agar response 503 tetap
+# mendapat header CORS
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(AdaptiveConcurrencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,9 +51,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# State turunan (cache, live feed) dipelihara oleh subscriber event bus
+register_default_subscribers(event_bus)
+
 # Include routers
 app.include_router(master_data.router)
 app.include_router(pmb.router)
+app.include_router(jobs.router)
+
+
+@app.on_event("startup")
+def start_background_workers():
+    """Jalankan dispatcher notifikasi (outbox), lanjutkan job yang belum selesai dan scheduler backup"""
+    if settings.NOTIFICATION_DISPATCHER_ENABLED:
+        start_notification_dispatcher(SessionLocal)
+    get_job_runner(engine).resume()
+    if settings.BACKUP_INTERVAL_MINUTES > 0:
+        start_backup_scheduler()
+
+
+@app.on_event("shutdown")
+def flush_background_writers():
+    """Flush registrasi yang masih di antrian group-commit dan event bus sebelum shutdown"""
+    stop_registration_writers()
+    event_bus.stop()
+    stop_notification_dispatcher()
+    stop_job_runners()
+    stop_backup_scheduler()
 
 
 @app.get("/", tags=["Root"])
@@ -44,3 +95,25 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "version": settings.APP_VERSION}
+
+
+@app.get("/metrics", tags=["Health"])
+async def metrics(db: Session = Depends(get_db)):
+    """Metrics runtime (cache, rate limit, concurrency limit, live feed, event bus, outbox, job, backup, peringkat)"""
+    return {
+        "response_cache": response_cache.stats(),
+        "rate_limit": {
+            route: {"allowed": limiter.allowed, "limited": limiter.limited}
+            for route, limiter in rate_limiters.items()
+        },
+        "concurrency": {
+            route_class: limiter.stats()
+            for route_class, limiter in concurrency_limiters.items()
+        },
+        "live_feed": live_feed.stats(),
+        "event_bus": event_bus.stats(),
+        "notification_outbox": outbox_metrics(db),
+        "jobs": get_job_runner(db.get_bind()).stats(),
+        "backup": backup_scheduler_stats(),
+        "rank_index": rank_index.stats(),
+    }
@@ -1,5 +1,18 @@
 from .program_studi import ProgramStudi
 from .calon_mahasiswa import CalonMahasiswa, StatusPendaftaran
 from .jalur_masuk import JalurMasuk
+from .registration_rollup import RegistrationRollup
+from .stats_cube import StatsCubeCell
+from .notification_outbox import NotificationOutbox, OutboxStatus
+from .job import Job, JobStatus
+from .dokumen_calon import DokumenCalon, JenisDokumen
+from .change_sequence import ChangeSequence, next_change_seq
+from .kuota_prodi import KuotaProdi
+from .pilihan_prodi import PilihanProdi
 
-__all__ = ["ProgramStudi", "CalonMahasiswa", "JalurMasuk", "StatusPendaftaran"]
+__all__ = [
+    "ProgramStudi", "CalonMahasiswa", "JalurMasuk", "StatusPendaftaran",
+    "RegistrationRollup", "StatsCubeCell", "NotificationOutbox", "OutboxStatus",
+    "Job", "JobStatus", "DokumenCalon", "JenisDokumen", "ChangeSequence", "next_change_seq",
+    "KuotaProdi", "PilihanProdi"
+]
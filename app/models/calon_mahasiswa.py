@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Date, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Enum, Date, DDL, Index, event, func
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from enum import Enum as PyEnum
 from app.database import Base
+from app.utils.validators import build_name_key
 
 
 class StatusPendaftaran(str, PyEnum):
@@ -16,6 +17,14 @@ class CalonMahasiswa(Base):
     """Model untuk data calon mahasiswa"""
     
     __tablename__ = "calon_mahasiswa"
+    __table_args__ = (
+        # Blocking key deteksi duplikat: tanggal lahir + key fonetik nama
+        Index("ix_calon_mahasiswa_dob_name_key", "tanggal_lahir", "name_key"),
+        # Urutan feed perubahan (GET /api/pmb/changes)
+        Index("ix_calon_mahasiswa_change_seq", "change_seq", "id"),
+        # Pool seleksi: calon pending per jalur
+        Index("ix_calon_mahasiswa_jalur_status", "jalur_masuk_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nama_lengkap = Column(String(100), nullable=False)
@@ -27,13 +36,70 @@ class CalonMahasiswa(Base):
     jalur_masuk_id = Column(Integer, ForeignKey("jalur_masuk.id"), nullable=False, index=True)
     status = Column(Enum(StatusPendaftaran), default=StatusPendaftaran.PENDING, nullable=False, index=True)
     nim = Column(String(20), unique=True, nullable=True, index=True)  # NIM generated after approval
+    skor = Column(Float, nullable=True)  # nilai seleksi (SNBT / Mandiri), makin besar makin baik
+    # Prodi tempat calon diterima (approve / hasil seleksi); program_studi_id tetap prodi saat mendaftar
+    program_studi_diterima_id = Column(Integer, ForeignKey("program_studi.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     approved_at = Column(DateTime, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    name_key = Column(String(50), nullable=True)  # diisi otomatis dari nama_lengkap
+    change_seq = Column(Integer, nullable=True)  # diisi otomatis setiap insert/update (lihat change_sequence.py)
     
     # Relationships
-    program_studi = relationship("ProgramStudi")
+    program_studi = relationship("ProgramStudi", foreign_keys=[program_studi_id])
+    program_studi_diterima = relationship("ProgramStudi", foreign_keys=[program_studi_diterima_id])
     jalur_masuk = relationship("JalurMasuk")
     
+    @validates("nama_lengkap")
+    def _update_name_key(self, key, value):
+        self.name_key = build_name_key(value) if value else None
+        return value
+    
     def __repr__(self):
         return f"<CalonMahasiswa(id={self.id}, nama={self.nama_lengkap}, email={self.email}, nim={self.nim})>"
+
+
+# Full-text search index (SQLite FTS5) atas nama_lengkap, alamat dan email.
+# External-content table: isi teks tetap di calon_mahasiswa, index disinkronkan
+# oleh trigger sehingga setiap insert/update/delete (termasuk bulk) ikut ter-index.
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS calon_mahasiswa_fts USING fts5(
+        nama_lengkap, alamat, email,
+        content='calon_mahasiswa', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calon_mahasiswa_fts_ai AFTER INSERT ON calon_mahasiswa BEGIN
+        INSERT INTO calon_mahasiswa_fts(rowid, nama_lengkap, alamat, email)
+        VALUES (new.id, new.nama_lengkap, new.alamat, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calon_mahasiswa_fts_ad AFTER DELETE ON calon_mahasiswa BEGIN
+        INSERT INTO calon_mahasiswa_fts(calon_mahasiswa_fts, rowid, nama_lengkap, alamat, email)
+        VALUES ('delete', old.id, old.nama_lengkap, old.alamat, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calon_mahasiswa_fts_au
+    AFTER UPDATE OF nama_lengkap, alamat, email ON calon_mahasiswa BEGIN
+        INSERT INTO calon_mahasiswa_fts(calon_mahasiswa_fts, rowid, nama_lengkap, alamat, email)
+        VALUES ('delete', old.id, old.nama_lengkap, old.alamat, old.email);
+        INSERT INTO calon_mahasiswa_fts(rowid, nama_lengkap, alamat, email)
+        VALUES (new.id, new.nama_lengkap, new.alamat, new.email);
+    END
+    """,
+]
+
+for _statement in SEARCH_INDEX_DDL:
+    event.listen(
+        CalonMahasiswa.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+
+event.listen(
+    CalonMahasiswa.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS calon_mahasiswa_fts").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, String, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models.calon_mahasiswa import CalonMahasiswa
+
+CALON_MAHASISWA_SEQUENCE = "calon_mahasiswa"
+
+
+class ChangeSequence(Base):
+    """
+    Counter monotonic untuk feed perubahan (change data capture)
+    
+    Nilai dinaikkan di transaksi yang sama dengan perubahan data. Karena
+    penulis SQLite ter-serialisasi (lock dipegang sampai commit), nomor yang
+    lebih kecil selalu ter-commit lebih dulu, sehingga consumer yang membaca
+    change_seq > cursor tidak pernah melewatkan perubahan.
+    """
+    
+    __tablename__ = "change_sequence"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ChangeSequence(name={self.name}, value={self.value})>"
+
+
+def next_change_seq(session: Session, count: int = 1, name: str = CALON_MAHASISWA_SEQUENCE) -> int:
+    """
+    Alokasikan `count` nomor urut di transaksi session yang sedang berjalan
+    
+    Dipakai langsung oleh UPDATE set-based (Core) yang tidak melewati ORM flush.
+    
+    Returns:
+        Nomor pertama dari blok [first, first + count)
+    """
+    statement = sqlite_insert(ChangeSequence).values(name=name, value=count)
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"value": ChangeSequence.value + statement.excluded.value},
+    ).returning(ChangeSequence.value)
+    last = session.connection().execute(statement).scalar_one()
+    return last - count + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_change_seq(session, flush_context, instances):
+    """Beri change_seq baru pada setiap CalonMahasiswa yang di-insert atau berubah"""
+    changed = [
+        obj for obj in session.new if isinstance(obj, CalonMahasiswa)
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, CalonMahasiswa) and session.is_modified(obj, include_collections=False)
+    ]
+    if not changed:
+        return
+    first = next_change_seq(session, len(changed))
+    for offset, obj in enumerate(changed):
+        obj.change_seq = first + offset
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from enum import Enum as PyEnum
+from app.database import Base
+
+
+class JenisDokumen(str, PyEnum):
+    """Enum untuk jenis dokumen calon mahasiswa"""
+    IJAZAH = "ijazah"
+    FOTO = "foto"
+    KK = "kk"
+
+
+# Content type yang diizinkan per jenis dokumen
+ALLOWED_CONTENT_TYPES = {
+    JenisDokumen.IJAZAH: ("application/pdf", "image/jpeg", "image/png"),
+    JenisDokumen.FOTO: ("image/jpeg", "image/png"),
+    JenisDokumen.KK: ("application/pdf", "image/jpeg", "image/png"),
+}
+
+
+class DokumenCalon(Base):
+    """Metadata dokumen calon mahasiswa; isi file disimpan di UPLOAD_DIR"""
+    
+    __tablename__ = "dokumen_calon"
+    __table_args__ = (
+        # Satu dokumen aktif per jenis; upload ulang mengganti file lama
+        UniqueConstraint("calon_mahasiswa_id", "jenis", name="uq_dokumen_calon_jenis"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    calon_mahasiswa_id = Column(Integer, ForeignKey("calon_mahasiswa.id"), nullable=False, index=True)
+    jenis = Column(Enum(JenisDokumen), nullable=False)
+    filename = Column(String(255), nullable=True)  # nama file asli dari client
+    content_type = Column(String(100), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    storage_path = Column(String(255), nullable=False)  # relatif terhadap UPLOAD_DIR
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    calon_mahasiswa = relationship("CalonMahasiswa")
+    
+    def __repr__(self):
+        return f"<DokumenCalon(id={self.id}, calon={self.calon_mahasiswa_id}, jenis={self.jenis}, size={self.size_bytes})>"
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON
+from datetime import datetime
+from enum import Enum as PyEnum
+from app.database import Base
+
+
+class JobStatus(str, PyEnum):
+    """Enum untuk status job background"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    """Job admin yang dijalankan di background (bulk approve, export, rekomputasi)"""
+    
+    __tablename__ = "jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID
+    type = Column(String(50), nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # diperbarui worker selama running
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, type={self.type}, status={self.status})>"
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint, CheckConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class KuotaProdi(Base):
+    """
+    Kuota penerimaan per program studi x jalur masuk
+    
+    `terisi` adalah counter kursi yang sudah dipakai, dinaikkan atomik oleh
+    approve (UPDATE ... WHERE terisi < kapasitas) di transaksi yang sama,
+    sehingga cek kuota tidak perlu COUNT calon approved. Kombinasi prodi x
+    jalur tanpa baris kuota tidak dibatasi.
+    """
+    
+    __tablename__ = "kuota_prodi"
+    __table_args__ = (
+        UniqueConstraint("program_studi_id", "jalur_masuk_id", name="uq_kuota_prodi_jalur"),
+        CheckConstraint("terisi >= 0", name="ck_kuota_prodi_terisi"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    program_studi_id = Column(Integer, ForeignKey("program_studi.id"), nullable=False)
+    jalur_masuk_id = Column(Integer, ForeignKey("jalur_masuk.id"), nullable=False)
+    kapasitas = Column(Integer, nullable=False)
+    terisi = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    @property
+    def sisa(self) -> int:
+        return max(self.kapasitas - self.terisi, 0)
+    
+    def __repr__(self):
+        return (
+            f"<KuotaProdi(prodi={self.program_studi_id}, jalur={self.jalur_masuk_id}, "
+            f"terisi={self.terisi}/{self.kapasitas})>"
+        )
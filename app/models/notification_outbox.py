@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+from datetime import datetime
+from enum import Enum as PyEnum
+from app.database import Base
+
+
+class OutboxStatus(str, PyEnum):
+    """Enum untuk status pengiriman notifikasi"""
+    PENDING = "pending"  # menunggu dikirim / dijadwalkan retry
+    SENDING = "sending"  # sedang diproses dispatcher
+    SENT = "sent"
+    FAILED = "failed"    # gagal permanen setelah max attempts
+
+
+class NotificationOutbox(Base):
+    """
+    Transactional outbox notifikasi calon mahasiswa
+    
+    Baris ditulis di transaksi yang sama dengan perubahan status (approve),
+    lalu dikirim oleh dispatcher di background.
+    """
+    
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Query dispatcher: status pending yang sudah jatuh tempo
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    calon_mahasiswa_id = Column(Integer, ForeignKey("calon_mahasiswa.id"), nullable=False, index=True)
+    channel = Column(String(20), nullable=False, default="email")
+    recipient = Column(String(100), nullable=False)
+    subject = Column(String(200), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)  # awal lease status sending
+    
+    def __repr__(self):
+        return (
+            f"<NotificationOutbox(id={self.id}, calon={self.calon_mahasiswa_id}, "
+            f"status={self.status}, attempts={self.attempts})>"
+        )
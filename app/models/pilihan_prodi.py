@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from app.database import Base
+
+
+class PilihanProdi(Base):
+    """Pilihan program studi calon mahasiswa, terurut prioritas (urutan 1 = pilihan pertama)"""
+    
+    __tablename__ = "pilihan_prodi"
+    __table_args__ = (
+        UniqueConstraint("calon_mahasiswa_id", "urutan", name="uq_pilihan_prodi_urutan"),
+        UniqueConstraint("calon_mahasiswa_id", "program_studi_id", name="uq_pilihan_prodi_prodi"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    calon_mahasiswa_id = Column(Integer, ForeignKey("calon_mahasiswa.id"), nullable=False, index=True)
+    urutan = Column(Integer, nullable=False)
+    program_studi_id = Column(Integer, ForeignKey("program_studi.id"), nullable=False)
+    
+    def __repr__(self):
+        return f"<PilihanProdi(calon={self.calon_mahasiswa_id}, urutan={self.urutan}, prodi={self.program_studi_id})>"
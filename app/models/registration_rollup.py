@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, UniqueConstraint
+from app.database import Base
+from app.models.calon_mahasiswa import StatusPendaftaran
+
+
+class RegistrationRollup(Base):
+    """Rollup jumlah event pendaftaran per jam, per status, program studi dan jalur masuk"""
+    
+    __tablename__ = "registration_rollup"
+    __table_args__ = (
+        # Juga berfungsi sebagai index untuk query range waktu
+        UniqueConstraint(
+            "bucket_start", "status", "program_studi_id", "jalur_masuk_id",
+            name="uq_registration_rollup_bucket"
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False)  # awal jam (UTC)
+    status = Column(Enum(StatusPendaftaran), nullable=False)  # pending = registrasi baru
+    program_studi_id = Column(Integer, ForeignKey("program_studi.id"), nullable=False)
+    jalur_masuk_id = Column(Integer, ForeignKey("jalur_masuk.id"), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return (
+            f"<RegistrationRollup(bucket={self.bucket_start}, status={self.status}, "
+            f"prodi={self.program_studi_id}, jalur={self.jalur_masuk_id}, count={self.count})>"
+        )
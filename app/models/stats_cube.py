@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, ForeignKey, Enum, UniqueConstraint
+from app.database import Base
+from app.models.calon_mahasiswa import StatusPendaftaran
+
+
+class StatsCubeCell(Base):
+    """Sel cube statistik: jumlah calon per status x program studi x jalur masuk x tahun"""
+    
+    __tablename__ = "stats_cube"
+    __table_args__ = (
+        UniqueConstraint(
+            "status", "program_studi_id", "jalur_masuk_id", "tahun",
+            name="uq_stats_cube_cell"
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    status = Column(Enum(StatusPendaftaran), nullable=False)
+    program_studi_id = Column(Integer, ForeignKey("program_studi.id"), nullable=False)
+    jalur_masuk_id = Column(Integer, ForeignKey("jalur_masuk.id"), nullable=False)
+    tahun = Column(Integer, nullable=False)  # tahun pendaftaran
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return (
+            f"<StatsCubeCell(status={self.status}, prodi={self.program_studi_id}, "
+            f"jalur={self.jalur_masuk_id}, tahun={self.tahun}, count={self.count})>"
+        )
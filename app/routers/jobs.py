@@ -0,0 +1,119 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Job, JobStatus
+from app.schemas import JobCreate, JobResponse
+from app.utils.jobs import get_job_runner, JOB_TYPES
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+def _job_response(job: Job, db: Session) -> JobResponse:
+    """Gabungkan data job di database dengan progress in-memory job yang sedang berjalan"""
+    done, total = job.progress_done, job.progress_total
+    if job.status == JobStatus.RUNNING:
+        done, total = get_job_runner(db.get_bind()).progress(job.id) or (done, total)
+    
+    return JobResponse(
+        id=job.id,
+        type=job.type,
+        status=job.status.value,
+        params=job.params or {},
+        result=job.result,
+        error=job.error,
+        progress_done=done,
+        progress_total=total,
+        progress=round(done * 100 / total, 1) if total else None,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+
+def _get_job_or_404(job_id: str, db: Session) -> Job:
+    job = db.query(Job).filter_by(id=job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job dengan ID {job_id} tidak ditemukan"
+        )
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(data: JobCreate, db: Session = Depends(get_db)):
+    """
+    Buat job background dan langsung return ID-nya
+    
+    Tipe job yang tersedia (dari registry handler) ada di GET /api/jobs/types.
+    Pantau progress lewat GET /api/jobs/{job_id}.
+    """
+    try:
+        job = get_job_runner(db.get_bind()).create(db, data.type, data.params)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return _job_response(job, db)
+
+
+@router.get("/types")
+async def list_job_types():
+    """Daftar tipe job beserta batas concurrency-nya"""
+    return {
+        name: {"max_concurrency": definition.max_concurrency, "description": (definition.handler.__doc__ or "").strip()}
+        for name, definition in JOB_TYPES.items()
+    }
+
+
+@router.get("", response_model=list[JobResponse])
+async def list_jobs(
+    status_filter: str = Query(None, description="Filter by status: queued, running, succeeded, failed"),
+    type: str = Query(None, description="Filter by tipe job"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Daftar job terbaru
+    """
+    query = db.query(Job)
+    if status_filter:
+        try:
+            query = query.filter(Job.status == JobStatus(status_filter.lower()))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Status tidak valid. Gunakan: queued, running, succeeded, failed"
+            )
+    if type:
+        query = query.filter(Job.type == type)
+    
+    jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+    return [_job_response(job, db) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Status, progress dan hasil job
+    """
+    return _job_response(_get_job_or_404(job_id, db), db)
+
+
+@router.get("/{job_id}/download")
+async def download_job_result(job_id: str, db: Session = Depends(get_db)):
+    """
+    Download file hasil job export
+    """
+    job = _get_job_or_404(job_id, db)
+    path = (job.result or {}).get("path")
+    if job.status != JobStatus.SUCCEEDED or not path or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job tidak memiliki file hasil"
+        )
+    return FileResponse(path, media_type="text/csv", filename=os.path.basename(path))
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import ProgramStudi, JalurMasuk
-from app.schemas import ProgramStudiCreate, ProgramStudiResponse, JalurMasukCreate, JalurMasukResponse
+from app.models import ProgramStudi, JalurMasuk, KuotaProdi
+from app.schemas import (
+    ProgramStudiCreate,
+    ProgramStudiResponse,
+    JalurMasukCreate,
+    JalurMasukResponse,
+    KuotaProdiSet,
+    KuotaProdiResponse
+)
+from app.utils.kuota import set_kuota
 
 router = APIRouter(prefix="/api/master", tags=["Master Data"])
 
@@ -89,3 +97,49 @@ async def get_jalur_masuk(jalur_id: int, db: Session = Depends(get_db)):
             detail=f"Jalur masuk dengan ID {jalur_id} tidak ditemukan"
         )
     return jalur
+
+
+# Kuota Endpoints
+@router.put("/kuota", response_model=KuotaProdiResponse)
+async def set_kuota_prodi(data: KuotaProdiSet, db: Session = Depends(get_db)):
+    """
+    Set kapasitas kuota program studi x jalur masuk
+    
+    Approve calon di prodi x jalur ini ditolak (409) setelah kuota penuh.
+    Prodi x jalur tanpa kuota tidak dibatasi.
+    """
+    
+    if not db.get(ProgramStudi, data.program_studi_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Program studi dengan ID {data.program_studi_id} tidak ditemukan"
+        )
+    if not db.get(JalurMasuk, data.jalur_masuk_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Jalur masuk dengan ID {data.jalur_masuk_id} tidak ditemukan"
+        )
+    
+    try:
+        kuota = set_kuota(db, data.program_studi_id, data.jalur_masuk_id, data.kapasitas)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    db.commit()
+    db.refresh(kuota)
+    return kuota
+
+
+@router.get("/kuota", response_model=list[KuotaProdiResponse])
+async def list_kuota_prodi(
+    program_studi_id: int = Query(None, description="Filter by program studi"),
+    db: Session = Depends(get_db)
+):
+    """Get kuota (kapasitas, terisi, sisa) per program studi x jalur masuk"""
+    query = db.query(KuotaProdi)
+    if program_studi_id is not None:
+        query = query.filter(KuotaProdi.program_studi_id == program_studi_id)
+    return query.order_by(KuotaProdi.program_studi_id, KuotaProdi.jalur_masuk_id).all()
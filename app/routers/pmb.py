@@ -1,26 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, FileResponse
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+from typing import Optional
 from app.database import get_db
-from app.models import CalonMahasiswa, ProgramStudi, JalurMasuk, StatusPendaftaran
+from app.models import CalonMahasiswa, ProgramStudi, JalurMasuk, StatusPendaftaran, DokumenCalon, JenisDokumen, PilihanProdi
+from app.models.dokumen_calon import ALLOWED_CONTENT_TYPES
 from app.schemas import (
     CalonMahasiswaCreate, 
     CalonMahasiswaResponse,
     CalonMahasiswaListResponse,
+    CalonMahasiswaSearchResult,
+    DuplicatePair,
+    DuplicateScanResponse,
+    BulkStatusRequest,
+    BulkStatusResponse,
+    BulkRejectRequest,
+    BulkRejectResponse,
+    SeleksiInput,
+    SeleksiResponse,
+    RankResponse,
+    RankTopResponse,
+    TimeseriesResponse,
+    StatsCubeResponse,
+    DokumenResponse,
+    ChangesResponse,
+    CalonMahasiswaChange,
     ApproveRequest,
     NIMResponse,
     StatsResponse
 )
-from app.utils.nim_generator import generate_nim, validate_nim_format
-from app.utils.validators import validate_phone_indonesia, normalize_phone
+from app.utils.nim_generator import validate_nim_format, parse_nim
+from app.utils.validators import validate_phone_indonesia, normalize_phone, validate_email
+from app.utils.cache import (
+    response_cache,
+    STATS_CUBE_TAG,
+    status_key,
+    calon_tag,
+    list_key,
+    list_bucket_tag
+)
+from app.utils.singleflight import singleflight
+from app.utils.write_behind import get_registration_writer
+from app.utils.search import search_calon_mahasiswa, build_match_query
+from app.utils.rollups import record_rollup, query_timeseries, default_range, GRANULARITIES
+from app.utils.stats_cube import (
+    cached_cube,
+    CUBE_DIMENSIONS,
+    record_cube_transition,
+    rebuild_stats_cube
+)
+from app.utils.duplicates import find_duplicates_for, scan_duplicates, load_applicant_records
+from app.utils.rate_limit import rate_limit
+from app.utils.live_feed import live_feed
+from app.utils.admission import approve_calon, reject_calon, bulk_reject, count_bulk_reject, StatusConflict
+from app.utils.changes import fetch_changes
+from app.utils.kuota import KuotaPenuh
+from app.utils.ranking import rank_index
+from app.utils.uploads import (
+    save_upload_stream,
+    remove_upload,
+    parse_range,
+    FileRangeResponse,
+    UploadTooLarge,
+    UnsupportedFileType,
+    RangeNotSatisfiable
+)
+from app.events import event_bus, Registered, SkorUpdated
+from app.utils.idempotency import idempotency_store, request_fingerprint, IdempotencyKeyConflict
+from app.config import settings
 
 router = APIRouter(prefix="/api/pmb", tags=["PMB"])
 
 
-@router.post("/register", response_model=CalonMahasiswaResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=CalonMahasiswaResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register"))]
+)
 async def register_calon_mahasiswa(
     data: CalonMahasiswaCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db)
 ):
     """
@@ -30,8 +97,53 @@ async def register_calon_mahasiswa(
     - Email harus unik
     - Nomor telepon format Indonesia
     - Program studi dan jalur masuk harus valid
+    
+    Idempotent jika header Idempotency-Key dikirim: retry dengan key dan data
+    yang sama mendapatkan response awal tanpa mengulang proses database
+    
+    Kemungkinan duplikat (nama/tanggal lahir/telepon mirip) dilaporkan di
+    header X-Possible-Duplicates atau ditolak, sesuai DUPLICATE_CHECK_MODE
     """
     
+    if not idempotency_key:
+        return await _register_calon_mahasiswa(data, db, response)
+    
+    try:
+        stored = await idempotency_store.begin(
+            idempotency_key, request_fingerprint(data.model_dump_json())
+        )
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    if stored is not None:
+        return stored.to_response()
+    
+    try:
+        result = await _register_calon_mahasiswa(data, db, response)
+    except BaseException:
+        idempotency_store.release(idempotency_key)
+        raise
+    
+    # Header hasil deteksi duplikat ikut disimpan agar retry melihat peringatan yang sama
+    headers = {
+        name: response.headers[name] for name in ("X-Possible-Duplicates",)
+        if name in response.headers
+    }
+    idempotency_store.complete(
+        idempotency_key, status.HTTP_201_CREATED, result.model_dump_json().encode(), headers
+    )
+    return result
+
+
+async def _register_calon_mahasiswa(
+    data: CalonMahasiswaCreate,
+    db: Session,
+    response: Response
+) -> CalonMahasiswaResponse:
+    """Validasi dan simpan calon mahasiswa baru"""
+    
     # Check: Email sudah terdaftar?
     existing_email = db.query(CalonMahasiswa).filter_by(email=data.email.lower()).first()
     if existing_email:
@@ -63,34 +175,94 @@ async def register_calon_mahasiswa(
             detail="Format nomor telepon tidak valid. Gunakan format Indonesia (0812... atau +628...)"
         )
     
+    phone = normalize_phone(data.phone)
+    
+    # Check: Kemungkinan orang yang sama sudah mendaftar dengan email lain
+    duplicates = []
+    if settings.DUPLICATE_CHECK_MODE != "off":
+        duplicates = find_duplicates_for(
+            db, data.nama_lengkap, phone, data.tanggal_lahir,
+            min_score=settings.DUPLICATE_MIN_SCORE
+        )
+    if duplicates and settings.DUPLICATE_CHECK_MODE == "block":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                "Kemungkinan sudah terdaftar sebagai calon dengan ID "
+                + ", ".join(str(match.duplicate_of) for match in duplicates)
+            )
+        )
+    
     # Create new calon mahasiswa
-    calon = CalonMahasiswa(
+    values = dict(
         nama_lengkap=data.nama_lengkap,
         email=data.email.lower(),
-        phone=normalize_phone(data.phone),
+        phone=phone,
         tanggal_lahir=data.tanggal_lahir,
         alamat=data.alamat,
         program_studi_id=data.program_studi_id,
         jalur_masuk_id=data.jalur_masuk_id,
-        status=StatusPendaftaran.PENDING
+        status=StatusPendaftaran.PENDING,
+        created_at=datetime.utcnow()
     )
     
-    db.add(calon)
-    db.commit()
-    db.refresh(calon)
+    if settings.REGISTRATION_GROUP_COMMIT_ENABLED:
+        # Simpan lewat group-commit writer; return setelah batch ter-commit
+        writer = get_registration_writer(db.get_bind())
+        try:
+            calon_id = await asyncio.wrap_future(writer.submit(values))
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email sudah terdaftar. Gunakan email lain."
+            )
+        calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
+    else:
+        calon = CalonMahasiswa(**values)
+        db.add(calon)
+        record_rollup(db, StatusPendaftaran.PENDING, calon.program_studi_id, calon.jalur_masuk_id)
+        record_cube_transition(
+            db, calon.program_studi_id, calon.jalur_masuk_id, calon.created_at.year,
+            None, StatusPendaftaran.PENDING
+        )
+        db.commit()
+        db.refresh(calon)
     
-    return calon
+    event_bus.publish(Registered(
+        calon_id=calon.id,
+        program_studi_id=calon.program_studi_id,
+        jalur_masuk_id=calon.jalur_masuk_id,
+        program_studi_nama=calon.program_studi.nama,
+        jalur_masuk_nama=calon.jalur_masuk.nama
+    ))
+    
+    if duplicates:
+        response.headers["X-Possible-Duplicates"] = ",".join(
+            str(match.duplicate_of) for match in duplicates
+        )
+    
+    return CalonMahasiswaResponse.model_validate(calon)
 
 
-@router.get("/status/{calon_id}", response_model=CalonMahasiswaResponse)
+@router.get(
+    "/status/{calon_id}",
+    response_model=CalonMahasiswaResponse,
+    dependencies=[Depends(rate_limit("status"))]
+)
 async def get_registration_status(
     calon_id: int,
     db: Session = Depends(get_db)
 ):
     """
     Cek status pendaftaran calon mahasiswa
+    
+    Response di-cache dan di-invalidate saat calon di-approve/reject
     """
     
+    cached = response_cache.get(status_key(calon_id))
+    if cached is not None:
+        return cached
+    
     calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
     if not calon:
         raise HTTPException(
@@ -98,9 +270,147 @@ async def get_registration_status(
             detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
         )
     
+    response = CalonMahasiswaResponse.model_validate(calon)
+    response_cache.set(status_key(calon_id), response, tags=[calon_tag(calon_id)])
+    
+    return response
+
+
+@router.post("/status/bulk", response_model=BulkStatusResponse)
+async def get_bulk_registration_status(
+    request: BulkStatusRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Cek status banyak calon mahasiswa sekaligus
+    
+    Semua ID di-resolve dengan satu query IN (program studi dan jalur masuk
+    di-JOIN); ID yang ada di response cache tidak di-query ulang
+    """
+    
+    # Hilangkan duplikat, pertahankan urutan
+    ids = list(dict.fromkeys(request.ids))
+    if len(ids) > settings.BULK_STATUS_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maksimal {settings.BULK_STATUS_MAX_IDS} ID per request"
+        )
+    
+    results = {}
+    uncached = []
+    for calon_id in ids:
+        cached = response_cache.get(status_key(calon_id))
+        if cached is not None:
+            results[calon_id] = cached
+        else:
+            uncached.append(calon_id)
+    
+    if uncached:
+        for calon in _calon_with_relations(db).filter(CalonMahasiswa.id.in_(uncached)):
+            response = CalonMahasiswaResponse.model_validate(calon)
+            response_cache.set(status_key(calon.id), response, tags=[calon_tag(calon.id)])
+            results[calon.id] = response
+    
+    return BulkStatusResponse(
+        results={calon_id: results[calon_id] for calon_id in ids if calon_id in results},
+        missing=[calon_id for calon_id in ids if calon_id not in results]
+    )
+
+
+def _calon_with_relations(db: Session):
+    """Query calon mahasiswa dengan program studi dan jalur masuk di-JOIN (satu query)"""
+    return db.query(CalonMahasiswa).options(
+        joinedload(CalonMahasiswa.program_studi),
+        joinedload(CalonMahasiswa.jalur_masuk)
+    )
+
+
+@router.get(
+    "/lookup/nim/{nim}",
+    response_model=CalonMahasiswaResponse,
+    dependencies=[Depends(rate_limit("status"))]
+)
+async def lookup_by_nim(nim: str, db: Session = Depends(get_db)):
+    """
+    Cari calon mahasiswa berdasarkan NIM
+    
+    Format NIM divalidasi sebelum query (YYYY[KODE_PRODI]-XXXX)
+    """
+    
+    try:
+        parse_nim(nim)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    calon = _calon_with_relations(db).filter(CalonMahasiswa.nim == nim).first()
+    if not calon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan NIM {nim} tidak ditemukan"
+        )
+    
     return calon
 
 
+@router.get(
+    "/lookup/email/{email}",
+    response_model=CalonMahasiswaResponse,
+    dependencies=[Depends(rate_limit("status"))]
+)
+async def lookup_by_email(email: str, db: Session = Depends(get_db)):
+    """
+    Cari calon mahasiswa berdasarkan email
+    """
+    
+    if not validate_email(email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format email tidak valid: {email}"
+        )
+    
+    calon = _calon_with_relations(db).filter(CalonMahasiswa.email == email.lower()).first()
+    if not calon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan email {email} tidak ditemukan"
+        )
+    
+    return calon
+
+
+@router.get(
+    "/lookup/phone/{phone}",
+    response_model=list[CalonMahasiswaResponse],
+    dependencies=[Depends(rate_limit("status"))]
+)
+async def lookup_by_phone(phone: str, db: Session = Depends(get_db)):
+    """
+    Cari calon mahasiswa berdasarkan nomor telepon
+    
+    Nomor tidak unik (mis. dipakai bersama saudara), jadi hasilnya berupa list
+    """
+    
+    if not validate_phone_indonesia(phone):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format nomor telepon tidak valid. Gunakan format Indonesia (0812... atau +628...)"
+        )
+    
+    calon_list = _calon_with_relations(db).filter(
+        CalonMahasiswa.phone == normalize_phone(phone)
+    ).order_by(CalonMahasiswa.id).all()
+    if not calon_list:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan nomor telepon {phone} tidak ditemukan"
+        )
+    
+    return calon_list
+
+
 @router.put("/approve/{calon_id}", response_model=NIMResponse, status_code=status.HTTP_200_OK)
 async def approve_calon_mahasiswa(
     calon_id: int,
@@ -113,7 +423,9 @@ async def approve_calon_mahasiswa(
     Format NIM: YYYY[KODE_PRODI][RUNNING_NUMBER]
     Contoh: 2025001-0001
     
-    Idempotent: Jika sudah approve, tidak generate NIM baru
+    Idempotent: Jika sudah approve, tidak generate NIM baru.
+    Calon yang sudah di-reject, atau kuota prodi x jalur-nya sudah penuh,
+    tidak bisa di-approve (409 Conflict).
     """
     
     calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
@@ -123,38 +435,29 @@ async def approve_calon_mahasiswa(
             detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
         )
     
-    # Jika sudah approve dan punya NIM, return yang existing (idempotent)
-    if calon.status == StatusPendaftaran.APPROVED and calon.nim:
-        return NIMResponse(
-            id=calon.id,
-            nim=calon.nim,
-            nama_lengkap=calon.nama_lengkap,
-            email=calon.email,
-            program_studi=calon.program_studi.nama,
-            status=calon.status.value
-        )
-    
-    # Generate NIM
-    tahun_pendaftaran = datetime.now().year
-    kode_prodi = calon.program_studi.kode
-    
     try:
-        nim = generate_nim(calon.id, tahun_pendaftaran, kode_prodi, db)
+        if calon.status == StatusPendaftaran.PENDING:
+            approve_calon(db, calon)
+    except StatusConflict:
+        # Diproses admin lain di antara SELECT dan UPDATE; calon sudah di-refresh
+        pass
+    except KuotaPenuh as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Gagal generate NIM: {str(e)}"
         )
     
-    # Update calon status menjadi approved dan set NIM
-    calon.status = StatusPendaftaran.APPROVED
-    calon.nim = nim
-    calon.approved_at = datetime.utcnow()
-    calon.updated_at = datetime.utcnow()
-    
-    db.add(calon)
-    db.commit()
-    db.refresh(calon)
+    # Jika sudah approve dan punya NIM, return yang existing (idempotent)
+    if calon.status != StatusPendaftaran.APPROVED or not calon.nim:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Calon mahasiswa dengan ID {calon_id} sudah berstatus {calon.status.value}, tidak bisa di-approve"
+        )
     
     return NIMResponse(
         id=calon.id,
@@ -176,9 +479,12 @@ async def list_calon_mahasiswa(
 ):
     """
     Dapatkan list calon mahasiswa dengan filter dan pagination
+    
+    Halaman awal (skip < RESPONSE_CACHE_LIST_MAX_SKIP) di-cache per filter bucket
     """
     
     query = db.query(CalonMahasiswa)
+    status_enum = None
     
     # Apply filters
     if status_filter:
@@ -194,17 +500,300 @@ async def list_calon_mahasiswa(
     if program_studi_id:
         query = query.filter_by(program_studi_id=program_studi_id)
     
+    status_value = status_enum.value if status_enum else None
+    cacheable = skip < settings.RESPONSE_CACHE_LIST_MAX_SKIP
+    cache_key = list_key(status_value, program_studi_id or None, skip, limit)
+    if cacheable:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
     # Order by created_at descending dan apply pagination
     calon_list = query.order_by(CalonMahasiswa.created_at.desc()).offset(skip).limit(limit).all()
     
+    if cacheable:
+        response = [CalonMahasiswaListResponse.model_validate(calon) for calon in calon_list]
+        response_cache.set(
+            cache_key,
+            response,
+            tags=[list_bucket_tag(status_value, program_studi_id or None)]
+        )
+        return response
+    
     return calon_list
 
 
+@router.get("/changes", response_model=ChangesResponse)
+async def list_changes(
+    since: Optional[str] = Query(None, description="Cursor dari next_cursor sebelumnya; kosong = dari awal"),
+    limit: int = Query(100, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Feed perubahan calon mahasiswa untuk sistem downstream (SIAKAD, keuangan)
+    
+    Mengembalikan calon yang di-insert atau di-update (termasuk pemberian
+    NIM) setelah cursor, terurut sesuai urutan perubahan. Simpan next_cursor
+    dan kirim sebagai ?since= pada polling berikutnya; ulangi selama has_more.
+    Calon yang berubah beberapa kali hanya muncul sekali dengan versi terbaru.
+    """
+    
+    if limit > settings.CHANGES_MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maksimal {settings.CHANGES_MAX_PAGE_SIZE} perubahan per request"
+        )
+    
+    try:
+        changes, next_cursor, has_more = fetch_changes(db, since, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return ChangesResponse(
+        changes=[CalonMahasiswaChange.model_validate(calon) for calon in changes],
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
+
+
+@router.get("/search", response_model=list[CalonMahasiswaSearchResult])
+async def search_calon(
+    q: str = Query(..., min_length=2, max_length=200, description="Kata kunci nama, alamat atau email"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search calon mahasiswa (nama lengkap, alamat, email)
+    
+    Setiap kata dicocokkan sebagai prefix, hasil diurutkan berdasarkan relevansi
+    """
+    
+    if not build_match_query(q):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Kata kunci pencarian tidak valid"
+        )
+    
+    results = search_calon_mahasiswa(db, q, skip=skip, limit=limit)
+    
+    return [
+        CalonMahasiswaSearchResult(
+            **CalonMahasiswaListResponse.model_validate(calon).model_dump(),
+            score=score
+        )
+        for calon, score in results
+    ]
+
+
+@router.get("/duplicates", response_model=DuplicateScanResponse)
+async def scan_duplicate_calon(
+    min_score: float = Query(settings.DUPLICATE_MIN_SCORE, ge=0, le=1),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Batch scan calon mahasiswa yang kemungkinan duplikat
+    
+    Pasangan hanya dibandingkan di dalam block (telepon, tanggal lahir + nama)
+    sehingga waktu scan mendekati linear terhadap jumlah calon
+    """
+    
+    result = await run_in_threadpool(
+        lambda: scan_duplicates(load_applicant_records(db), min_score=min_score)
+    )
+    
+    return DuplicateScanResponse(
+        total_pairs=len(result["matches"]),
+        blocks=result["blocks"],
+        oversized_blocks=result["oversized_blocks"],
+        pairs=[
+            DuplicatePair(
+                calon_id=match.calon_id,
+                duplicate_of=match.duplicate_of,
+                score=match.score,
+                reasons=match.reasons
+            )
+            for match in result["matches"][:limit]
+        ]
+    )
+
+
+@router.get("/stats/timeseries", response_model=TimeseriesResponse)
+async def get_registration_timeseries(
+    granularity: str = Query("hour", description="Ukuran bucket: hour atau day"),
+    start: Optional[datetime] = Query(None, description="Awal range (UTC), default 24 jam / 30 hari terakhir"),
+    end: Optional[datetime] = Query(None, description="Akhir range (UTC, eksklusif)"),
+    status_filter: str = Query(None, description="Filter by status: pending (registrasi), approved, rejected"),
+    program_studi_id: int = Query(None, description="Filter by program studi"),
+    jalur_masuk_id: int = Query(None, description="Filter by jalur masuk"),
+    db: Session = Depends(get_db)
+):
+    """
+    Jumlah registrasi, approval dan rejection per jam/hari
+    
+    Dibaca dari tabel rollup yang di-update bersamaan dengan setiap perubahan
+    status, jadi tidak memindai tabel calon_mahasiswa. Bucket yang masih
+    berjalan (range default selalu berakhir di bucket saat ini) ditandai
+    partial=true karena count-nya masih bisa bertambah
+    """
+    
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Granularity tidak valid. Gunakan: hour, day"
+        )
+    
+    status_enum = None
+    if status_filter:
+        try:
+            status_enum = StatusPendaftaran(status_filter.lower())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Status tidak valid. Gunakan: pending, approved, rejected"
+            )
+    
+    default_start, default_end = default_range(granularity)
+    start = start or default_start
+    end = end or default_end
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start harus lebih awal dari end"
+        )
+    
+    points = query_timeseries(
+        db, start, end, granularity,
+        status=status_enum,
+        program_studi_id=program_studi_id,
+        jalur_masuk_id=jalur_masuk_id
+    )
+    
+    return TimeseriesResponse(granularity=granularity, start=start, end=end, points=points)
+
+
+@router.get("/stats/cube", response_model=StatsCubeResponse)
+async def get_stats_cube(
+    group_by: str = Query("status", description=f"Dimensi hasil, dipisah koma: {', '.join(CUBE_DIMENSIONS)}"),
+    status_filter: str = Query(None, description="Filter by status: pending, approved, rejected"),
+    program_studi: str = Query(None, description="Filter by kode program studi"),
+    fakultas: str = Query(None, description="Filter by fakultas"),
+    jalur_masuk: str = Query(None, description="Filter by kode jalur masuk (SNBP, SNBT, ...)"),
+    tahun: int = Query(None, description="Filter by tahun pendaftaran"),
+    db: Session = Depends(get_db)
+):
+    """
+    Slice dan roll-up statistik status x prodi x fakultas x jalur x tahun
+    
+    Contoh: calon approved jalur SNBT per fakultas
+    /stats/cube?group_by=fakultas&status_filter=approved&jalur_masuk=SNBT
+    
+    Dijawab dari cube in-memory (dimuat dari tabel stats_cube), tanpa
+    GROUP BY atas tabel calon_mahasiswa
+    """
+    
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    invalid = [d for d in dimensions if d not in CUBE_DIMENSIONS]
+    if invalid or len(set(dimensions)) != len(dimensions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dimensi tidak valid. Gunakan: {', '.join(CUBE_DIMENSIONS)}"
+        )
+    
+    filters = {
+        "status": status_filter.lower() if status_filter else None,
+        "program_studi": program_studi,
+        "fakultas": fakultas,
+        "jalur_masuk": jalur_masuk,
+        "tahun": tahun,
+    }
+    filters = {dimension: value for dimension, value in filters.items() if value is not None}
+    
+    cells = cached_cube.get(db).slice(filters, dimensions)
+    
+    return StatsCubeResponse(
+        group_by=dimensions,
+        filters=filters,
+        total=sum(cell["count"] for cell in cells),
+        cells=cells
+    )
+
+
+@router.post("/stats/cube/rebuild")
+async def rebuild_cube(db: Session = Depends(get_db)):
+    """
+    Hitung ulang cube statistik dari data calon (backfill setelah migrasi)
+    """
+    cells = await run_in_threadpool(rebuild_stats_cube, db)
+    response_cache.invalidate_tags(STATS_CUBE_TAG)
+    return {"message": "Cube statistik berhasil dihitung ulang", "cells": cells}
+
+
 @router.get("/stats", response_model=StatsResponse)
+@singleflight()
 async def get_pmb_statistics(db: Session = Depends(get_db)):
     """
     Dapatkan statistik PMB (dashboard)
+    
+    Request bersamaan berbagi satu komputasi (single-flight); query agregat
+    dijalankan di threadpool agar event loop tetap bisa menerima request lain.
+    Komputasi bersama memakai session sendiri, bukan session request leader
+    yang ditutup get_db jika leader di-cancel saat follower masih menunggu.
+    """
+    return await run_in_threadpool(_compute_pmb_statistics_shared, db.get_bind())
+
+
+@router.get("/stats/stream")
+async def stream_pmb_statistics(db: Session = Depends(get_db)):
     """
+    Live feed statistik dashboard (Server-Sent Events)
+    
+    Event pertama "snapshot" berisi statistik lengkap (format /stats), lalu
+    event "delta" berisi perubahan yang di-coalesce per jendela waktu.
+    Event "resync" berarti client tertinggal dan harus mengambil ulang /stats.
+    
+    Berlangganan dulu, baru snapshot dihitung langsung dari database (bukan
+    hasil single-flight /stats yang bisa lebih lama), agar tidak ada delta
+    yang jatuh di antara snapshot dan subscribe.
+    """
+    queue = live_feed.subscribe()
+    snapshot_seq = live_feed.seq
+    try:
+        snapshot = await run_in_threadpool(_compute_pmb_statistics, db)
+    except BaseException:
+        live_feed.unsubscribe(queue)
+        raise
+    finally:
+        # Koneksi DB tidak dipegang selama stream berjalan
+        db.close()
+    
+    return StreamingResponse(
+        live_feed.stream(
+            snapshot.model_dump(),
+            settings.LIVE_FEED_HEARTBEAT_SECONDS,
+            queue=queue,
+            snapshot_seq=snapshot_seq
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _compute_pmb_statistics_shared(bind) -> StatsResponse:
+    """Hitung statistik PMB dengan session milik komputasi single-flight"""
+    db = Session(bind=bind, autoflush=False)
+    try:
+        return _compute_pmb_statistics(db)
+    finally:
+        db.close()
+
+
+def _compute_pmb_statistics(db: Session) -> StatsResponse:
+    """Jalankan query agregat untuk statistik PMB"""
     
     # Total pendaftar
     total_pendaftar = db.query(func.count(CalonMahasiswa.id)).scalar() or 0
@@ -226,7 +815,7 @@ async def get_pmb_statistics(db: Session = Depends(get_db)):
     program_studi_counts_raw = db.query(
         ProgramStudi.nama,
         func.count(CalonMahasiswa.id).label('count')
-    ).join(CalonMahasiswa).group_by(ProgramStudi.nama).all()
+    ).join(CalonMahasiswa, CalonMahasiswa.program_studi_id == ProgramStudi.id).group_by(ProgramStudi.nama).all()
     
     program_studi_counts = {nama: count for nama, count in program_studi_counts_raw}
     
@@ -255,6 +844,9 @@ async def reject_calon_mahasiswa(
 ):
     """
     Admin reject calon mahasiswa
+    
+    Idempotent untuk calon yang sudah di-reject. Calon yang sudah di-approve
+    (punya NIM) tidak bisa di-reject (409 Conflict).
     """
     
     calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
@@ -264,11 +856,323 @@ async def reject_calon_mahasiswa(
             detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
         )
     
-    calon.status = StatusPendaftaran.REJECTED
-    calon.updated_at = datetime.utcnow()
+    try:
+        if calon.status == StatusPendaftaran.PENDING:
+            reject_calon(db, calon)
+    except StatusConflict:
+        # Diproses admin lain di antara SELECT dan UPDATE; calon sudah di-refresh
+        pass
     
-    db.add(calon)
-    db.commit()
-    db.refresh(calon)
+    if calon.status != StatusPendaftaran.REJECTED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Calon mahasiswa dengan ID {calon_id} sudah berstatus {calon.status.value}, tidak bisa di-reject"
+        )
     
     return {"message": "Calon mahasiswa berhasil di-reject", "id": calon.id}
+
+
+@router.put("/seleksi/{calon_id}", response_model=SeleksiResponse)
+async def set_seleksi_calon_mahasiswa(
+    calon_id: int,
+    request: SeleksiInput,
+    db: Session = Depends(get_db)
+):
+    """
+    Set skor seleksi dan pilihan program studi (terurut prioritas) calon pending
+    
+    Dipakai oleh job seleksi (POST /api/jobs type=seleksi). Tanpa pilihan,
+    calon hanya diseleksi untuk prodi saat mendaftar.
+    """
+    
+    if len(request.pilihan) > settings.SELEKSI_MAX_PILIHAN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maksimal {settings.SELEKSI_MAX_PILIHAN} pilihan program studi"
+        )
+    
+    calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
+    if not calon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
+        )
+    if calon.status != StatusPendaftaran.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Calon mahasiswa dengan ID {calon_id} sudah berstatus {calon.status.value}"
+        )
+    
+    found = {
+        prodi_id for (prodi_id,) in
+        db.query(ProgramStudi.id).filter(ProgramStudi.id.in_(request.pilihan))
+    }
+    missing = [prodi_id for prodi_id in request.pilihan if prodi_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Program studi dengan ID {missing} tidak ditemukan"
+        )
+    
+    # Hapus pilihan lama dulu agar unique (calon, urutan) tidak bentrok saat flush
+    db.query(PilihanProdi).filter(PilihanProdi.calon_mahasiswa_id == calon_id).delete()
+    db.add_all([
+        PilihanProdi(calon_mahasiswa_id=calon_id, urutan=urutan, program_studi_id=prodi_id)
+        for urutan, prodi_id in enumerate(request.pilihan, start=1)
+    ])
+    calon.skor = request.skor
+    db.commit()
+    response_cache.invalidate_tags(calon_tag(calon_id))
+    
+    event_bus.publish(SkorUpdated(
+        calon_id=calon_id,
+        jalur_masuk_id=calon.jalur_masuk_id,
+        skor=request.skor,
+        pilihan=tuple(request.pilihan) or (calon.program_studi_id,)
+    ))
+    
+    return SeleksiResponse(calon_id=calon_id, skor=request.skor, pilihan=request.pilihan)
+
+
+@router.get("/rank/top", response_model=RankTopResponse)
+async def get_rank_top(
+    program_studi_id: int = Query(..., description="Program studi"),
+    jalur_masuk_id: int = Query(..., description="Jalur masuk"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Calon dengan peringkat teratas di satu program studi x jalur masuk
+    
+    Dijawab dari index peringkat di memori (O(log n + limit)), tanpa
+    ORDER BY atas tabel calon_mahasiswa.
+    """
+    
+    total, items = await run_in_threadpool(rank_index.top, db, program_studi_id, jalur_masuk_id, limit)
+    return RankTopResponse(
+        program_studi_id=program_studi_id,
+        jalur_masuk_id=jalur_masuk_id,
+        total=total,
+        items=items
+    )
+
+
+@router.post("/rank/rebuild")
+async def rebuild_rank_index(db: Session = Depends(get_db)):
+    """Bangun ulang index peringkat dari database (koreksi / setelah impor data)"""
+    
+    calon = await run_in_threadpool(rank_index.rebuild, db)
+    return {"message": "Index peringkat berhasil dibangun ulang", "calon": calon}
+
+
+@router.get("/rank/{calon_id}", response_model=RankResponse)
+async def get_rank_calon_mahasiswa(calon_id: int, db: Session = Depends(get_db)):
+    """
+    Peringkat calon di setiap program studi pilihannya (jalur masuk calon)
+    
+    Hanya calon pending yang sudah punya skor seleksi yang diperingkat. Skor
+    sama diurutkan berdasarkan ID, sama seperti alokasi seleksi.
+    """
+    
+    # Index dibangun dari database saat pertama dipakai: jalankan di threadpool
+    result = await run_in_threadpool(rank_index.rank, db, calon_id)
+    if result is None:
+        exists = db.query(CalonMahasiswa.id).filter_by(id=calon_id).first()
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan ID {calon_id} tidak sedang mengikuti seleksi (belum punya skor atau sudah tidak pending)"
+        )
+    
+    return RankResponse(calon_id=calon_id, **result)
+
+
+@router.post("/bulk/reject", response_model=BulkRejectResponse)
+async def bulk_reject_calon_mahasiswa(
+    request: BulkRejectRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Admin reject semua calon pending yang cocok dengan filter sekaligus
+    
+    Dipakai di akhir jalur untuk menolak sisa calon pending per prodi / jalur
+    (opsional rentang created_at). Dijalankan sebagai satu UPDATE set-based
+    berapa pun jumlah calonnya. dry_run=true hanya menghitung calon yang akan
+    di-reject tanpa mengubah data.
+    
+    skipped berisi jumlah calon yang cocok dengan filter tetapi sudah approved /
+    rejected (dilewati), sehingga affected=0 karena semua sudah diproses bisa
+    dibedakan dari filter yang tidak cocok dengan calon mana pun.
+    """
+    
+    if request.program_studi_id is None and request.jalur_masuk_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Minimal satu filter program_studi_id atau jalur_masuk_id harus diisi"
+        )
+    
+    filters = request.model_dump(exclude={"dry_run"})
+    result = count_bulk_reject(db, **filters) if request.dry_run else bulk_reject(db, **filters)
+    
+    return BulkRejectResponse(
+        dry_run=request.dry_run,
+        affected=sum(result.groups.values()),
+        skipped=result.skipped,
+        groups=[
+            {"program_studi_id": prodi, "jalur_masuk_id": jalur, "count": count}
+            for (prodi, jalur), count in sorted(result.groups.items())
+        ]
+    )
+
+
+@router.put(
+    "/dokumen/{calon_id}/{jenis}",
+    response_model=DokumenResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def upload_dokumen(
+    calon_id: int,
+    jenis: JenisDokumen,
+    request: Request,
+    filename: Optional[str] = Query(None, max_length=255, description="Nama file asli"),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload dokumen calon mahasiswa (ijazah, foto, kk)
+    
+    Body request adalah isi file mentah (bukan multipart), dengan header
+    Content-Type sesuai file: application/pdf, image/jpeg atau image/png.
+    File di-stream ke disk per chunk; upload ulang jenis yang sama mengganti
+    dokumen sebelumnya.
+    """
+    
+    calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
+    if not calon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Calon mahasiswa dengan ID {calon_id} tidak ditemukan"
+        )
+    
+    # Tolak lebih awal jika client sudah menyatakan ukuran yang terlalu besar
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Ukuran file melebihi batas {settings.UPLOAD_MAX_BYTES} bytes"
+        )
+    
+    try:
+        stored = await save_upload_stream(
+            request.stream(),
+            settings.UPLOAD_DIR,
+            str(calon_id),
+            settings.UPLOAD_MAX_BYTES,
+            ALLOWED_CONTENT_TYPES[jenis],
+            declared_type=request.headers.get("content-type")
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except UnsupportedFileType as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    
+    dokumen = db.query(DokumenCalon).filter_by(calon_mahasiswa_id=calon_id, jenis=jenis).first()
+    old_path = dokumen.storage_path if dokumen else None
+    if dokumen is None:
+        dokumen = DokumenCalon(calon_mahasiswa_id=calon_id, jenis=jenis)
+    dokumen.filename = filename
+    dokumen.content_type = stored.content_type
+    dokumen.size_bytes = stored.size_bytes
+    dokumen.sha256 = stored.sha256
+    dokumen.storage_path = stored.relative_path
+    
+    db.add(dokumen)
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        await run_in_threadpool(remove_upload, settings.UPLOAD_DIR, stored.relative_path)
+        if isinstance(e, IntegrityError):
+            # Upload lain untuk (calon, jenis) yang sama ter-commit lebih dulu
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Dokumen {jenis.value} sedang di-upload bersamaan. Silakan ulangi upload."
+            )
+        raise
+    db.refresh(dokumen)
+    
+    if old_path:
+        await run_in_threadpool(remove_upload, settings.UPLOAD_DIR, old_path)
+    
+    return dokumen
+
+
+@router.get("/dokumen/{calon_id}", response_model=list[DokumenResponse])
+async def list_dokumen(calon_id: int, db: Session = Depends(get_db)):
+    """
+    Daftar dokumen yang sudah di-upload calon mahasiswa
+    """
+    return db.query(DokumenCalon).filter_by(
+        calon_mahasiswa_id=calon_id
+    ).order_by(DokumenCalon.jenis).all()
+
+
+@router.get("/dokumen/{calon_id}/{jenis}")
+async def download_dokumen(
+    calon_id: int,
+    jenis: JenisDokumen,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Session = Depends(get_db)
+):
+    """
+    Download dokumen calon mahasiswa
+    
+    Mendukung header Range (satu range bytes) untuk resume / preview sebagian.
+    Tanpa Range file dikirim utuh lewat FileResponse Starlette; response 206
+    dikirim per chunk oleh FileRangeResponse.
+    """
+    
+    dokumen = db.query(DokumenCalon).filter_by(calon_mahasiswa_id=calon_id, jenis=jenis).first()
+    if not dokumen:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dokumen {jenis.value} untuk calon ID {calon_id} tidak ditemukan"
+        )
+    
+    path = os.path.join(settings.UPLOAD_DIR, dokumen.storage_path)
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{dokumen.sha256}"'}
+    filename = dokumen.filename or os.path.basename(dokumen.storage_path)
+    
+    try:
+        byte_range = parse_range(range_header, dokumen.size_bytes)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range tidak valid",
+            headers={"Content-Range": f"bytes */{dokumen.size_bytes}"}
+        )
+    
+    if byte_range is None:
+        return FileResponse(path, media_type=dokumen.content_type, filename=filename, headers=headers)
+    start, end = byte_range
+    return FileRangeResponse(
+        path, start, end, dokumen.size_bytes,
+        media_type=dokumen.content_type, filename=filename, headers=headers
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_statistics():
+    """
+    Metrics response cache (hit ratio, jumlah entry, eviction)
+    """
+    return response_cache.stats()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional
 from datetime import date, datetime
 import re
@@ -47,6 +47,27 @@ class JalurMasukResponse(JalurMasukBase):
         from_attributes = True
 
 
+class KuotaProdiSet(BaseModel):
+    """Request schema untuk set kuota program studi x jalur masuk"""
+    program_studi_id: int
+    jalur_masuk_id: int
+    kapasitas: int = Field(..., ge=0)
+
+
+class KuotaProdiResponse(BaseModel):
+    """Response schema untuk kuota program studi x jalur masuk"""
+    id: int
+    program_studi_id: int
+    jalur_masuk_id: int
+    kapasitas: int
+    terisi: int
+    sisa: int
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class CalonMahasiswaBase(BaseModel):
     """Base schema untuk calon mahasiswa"""
     nama_lengkap: str
@@ -108,10 +129,12 @@ class CalonMahasiswaResponse(CalonMahasiswaBase):
     id: int
     status: str
     nim: Optional[str] = None
+    skor: Optional[float] = None
     created_at: datetime
     approved_at: Optional[datetime] = None
     updated_at: datetime
     program_studi: ProgramStudiResponse
+    program_studi_diterima: Optional[ProgramStudiResponse] = None
     jalur_masuk: JalurMasukResponse
     
     class Config:
@@ -131,6 +154,138 @@ class CalonMahasiswaListResponse(BaseModel):
         from_attributes = True
 
 
+class CalonMahasiswaSearchResult(CalonMahasiswaListResponse):
+    """Response schema untuk hasil full-text search"""
+    score: float  # bm25, semakin kecil semakin relevan
+
+
+class DuplicatePair(BaseModel):
+    """Pasangan calon mahasiswa yang kemungkinan duplikat"""
+    calon_id: int
+    duplicate_of: int
+    score: float
+    reasons: list[str]
+
+
+class DuplicateScanResponse(BaseModel):
+    """Response schema untuk batch scan duplikat"""
+    total_pairs: int
+    blocks: int
+    oversized_blocks: int
+    pairs: list[DuplicatePair]
+
+
+class BulkStatusRequest(BaseModel):
+    """Request schema untuk cek status banyak calon sekaligus"""
+    ids: list[int] = Field(..., min_length=1)
+
+
+class BulkStatusResponse(BaseModel):
+    """Response schema untuk cek status banyak calon sekaligus"""
+    results: dict[int, CalonMahasiswaResponse]
+    missing: list[int]
+
+
+class BulkRejectRequest(BaseModel):
+    """Request schema untuk reject massal calon pending berdasarkan filter"""
+    program_studi_id: Optional[int] = None
+    jalur_masuk_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None  # eksklusif
+    dry_run: bool = False
+
+
+class BulkTransitionGroup(BaseModel):
+    """Jumlah calon yang berubah status per program studi dan jalur masuk"""
+    program_studi_id: int
+    jalur_masuk_id: int
+    count: int
+
+
+class BulkRejectResponse(BaseModel):
+    """Response schema untuk reject massal"""
+    dry_run: bool
+    affected: int
+    skipped: int  # cocok dengan filter tetapi sudah tidak pending
+    groups: list[BulkTransitionGroup]
+
+
+class TimeseriesPoint(BaseModel):
+    """Jumlah event dalam satu bucket waktu"""
+    bucket: datetime
+    status: str
+    program_studi_id: int
+    jalur_masuk_id: int
+    count: int
+    partial: bool = False  # bucket masih berjalan atau terpotong range: count belum final
+
+
+class TimeseriesResponse(BaseModel):
+    """Response schema untuk time-series registrasi"""
+    granularity: str
+    start: datetime
+    end: datetime
+    points: list[TimeseriesPoint]
+
+
+class StatsCubeResponse(BaseModel):
+    """Response schema untuk slice cube statistik"""
+    group_by: list[str]
+    filters: dict
+    total: int
+    cells: list[dict]  # nilai per dimensi group_by + count
+
+
+class SeleksiInput(BaseModel):
+    """Request schema untuk skor seleksi dan pilihan prodi calon mahasiswa"""
+    skor: float = Field(..., ge=0)
+    pilihan: list[int] = Field(default_factory=list)  # program_studi_id terurut prioritas
+    
+    @field_validator('pilihan')
+    @classmethod
+    def validate_pilihan(cls, v):
+        if len(set(v)) != len(v):
+            raise ValueError('Pilihan program studi tidak boleh duplikat')
+        return v
+
+
+class SeleksiResponse(BaseModel):
+    """Response schema untuk skor seleksi dan pilihan prodi"""
+    calon_id: int
+    skor: float
+    pilihan: list[int]
+
+
+class RankPilihan(BaseModel):
+    """Peringkat calon di satu prodi pilihan"""
+    urutan: int
+    program_studi_id: int
+    rank: int
+    total: int
+
+
+class RankResponse(BaseModel):
+    """Response schema untuk peringkat calon di setiap prodi pilihannya"""
+    calon_id: int
+    skor: float
+    jalur_masuk_id: int
+    peringkat: list[RankPilihan]
+
+
+class RankTopItem(BaseModel):
+    rank: int
+    calon_id: int
+    skor: float
+
+
+class RankTopResponse(BaseModel):
+    """Response schema untuk calon peringkat teratas di satu prodi x jalur"""
+    program_studi_id: int
+    jalur_masuk_id: int
+    total: int
+    items: list[RankTopItem]
+
+
 class ApproveRequest(BaseModel):
     """Request schema untuk approve calon mahasiswa"""
     pass
@@ -154,3 +309,70 @@ class StatsResponse(BaseModel):
     rejected: int
     program_studi_counts: dict  # {program_name: count}
     jalur_masuk_counts: dict    # {jalur_name: count}
+
+
+class CalonMahasiswaChange(BaseModel):
+    """Versi terbaru satu calon mahasiswa di feed perubahan"""
+    id: int
+    change_seq: int
+    nama_lengkap: str
+    email: str
+    phone: str
+    program_studi_id: int
+    program_studi_diterima_id: Optional[int] = None
+    jalur_masuk_id: int
+    status: str
+    nim: Optional[str] = None
+    skor: Optional[float] = None
+    created_at: datetime
+    approved_at: Optional[datetime] = None
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ChangesResponse(BaseModel):
+    """Response schema untuk feed perubahan (change data capture)"""
+    changes: list[CalonMahasiswaChange]
+    next_cursor: str  # kirim sebagai ?since= pada request berikutnya
+    has_more: bool
+
+
+class DokumenResponse(BaseModel):
+    """Response schema untuk metadata dokumen calon mahasiswa"""
+    id: int
+    calon_mahasiswa_id: int
+    jenis: str
+    filename: Optional[str] = None
+    content_type: str
+    size_bytes: int
+    sha256: str
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class JobCreate(BaseModel):
+    """Request schema untuk membuat job background"""
+    type: str  # nama tipe terdaftar, lihat GET /api/jobs/types
+    params: dict = Field(default_factory=dict)
+
+
+class JobResponse(BaseModel):
+    """Response schema untuk job background"""
+    id: str
+    type: str
+    status: str
+    params: dict
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    progress_done: int
+    progress_total: Optional[int] = None
+    progress: Optional[float] = None  # persen, None jika total belum diketahui
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,279 @@
+"""
+Transisi status calon mahasiswa (approve / reject)
+
+Dipakai oleh endpoint admin dan job background (bulk approve) agar setiap
+perubahan status melakukan hal yang sama dalam satu transaksi: update calon,
+kuota, rollup, stats cube dan outbox notifikasi, lalu publish event setelah
+commit.
+
+Transisi dilakukan dengan UPDATE bersyarat (WHERE status = 'pending'), bukan
+read-modify-write di Python. Dua admin yang memproses calon yang sama secara
+bersamaan tidak saling menimpa: hanya satu UPDATE yang mengenai baris, yang
+lain mendapat StatusConflict (409) tanpa perlu lock global.
+
+Reject massal (mis. sisa calon pending di akhir jalur) dijalankan sebagai satu
+UPDATE set-based berdasarkan filter, bukan satu request per calon. Calon yang
+cocok dengan filter tetapi sudah tidak pending dilewati dan jumlahnya
+dilaporkan, agar "sudah diproses" bisa dibedakan dari "tidak ada yang cocok".
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.events import event_bus, Approved, Rejected, BulkRejected
+from app.models import CalonMahasiswa, StatusPendaftaran, next_change_seq
+from app.utils.kuota import claim_seats, KuotaPenuh
+from app.utils.nim_generator import next_nim
+from app.utils.outbox import enqueue_approval_notification
+from app.utils.rollups import record_rollup
+from app.utils.stats_cube import record_cube_transition
+
+# Percobaan ulang jika NIM yang dihitung sudah dipakai approve lain
+NIM_MAX_ATTEMPTS = 5
+
+
+class StatusConflict(ValueError):
+    """Status calon sudah berubah (mis. diproses admin lain) sehingga transisi ditolak"""
+
+    def __init__(self, calon_id: int, current_status: StatusPendaftaran):
+        self.calon_id = calon_id
+        self.current_status = current_status
+        super().__init__(
+            f"Calon mahasiswa dengan ID {calon_id} sudah berstatus {current_status.value}"
+        )
+
+
+def _transition(db: Session, calon: CalonMahasiswa, new_status: StatusPendaftaran, values: dict) -> bool:
+    """
+    UPDATE calon ... WHERE id = :id AND status = 'pending'
+
+    Returns:
+        True jika baris berubah (transisi berhasil), False jika status sudah berubah
+    """
+    now = datetime.utcnow()
+    updated = db.query(CalonMahasiswa).filter(
+        CalonMahasiswa.id == calon.id,
+        CalonMahasiswa.status == StatusPendaftaran.PENDING
+    ).update(
+        {
+            CalonMahasiswa.status: new_status,
+            CalonMahasiswa.updated_at: now,
+            # UPDATE Core tidak melewati before_flush, change_seq diisi di sini
+            CalonMahasiswa.change_seq: next_change_seq(db),
+            **values,
+        },
+        synchronize_session="evaluate"
+    )
+    return updated == 1
+
+
+def _conflict(db: Session, calon: CalonMahasiswa) -> StatusConflict:
+    db.rollback()
+    db.refresh(calon)
+    return StatusConflict(calon.id, calon.status)
+
+
+def approve_calon(db: Session, calon: CalonMahasiswa) -> StatusPendaftaran:
+    """
+    Approve calon mahasiswa (pending) dan generate NIM
+
+    Returns:
+        Status sebelum approve
+
+    Raises:
+        StatusConflict: Jika calon sudah tidak pending
+        KuotaPenuh: Jika kuota prodi x jalur calon sudah penuh
+        ValueError: Jika NIM gagal di-generate
+    """
+    calon_id = calon.id
+    kode_prodi = calon.program_studi.kode
+    for _ in range(NIM_MAX_ATTEMPTS):
+        nim = next_nim(datetime.now().year, kode_prodi, db)
+        try:
+            updated = _transition(db, calon, StatusPendaftaran.APPROVED, {
+                CalonMahasiswa.nim: nim,
+                CalonMahasiswa.approved_at: datetime.utcnow(),
+                CalonMahasiswa.program_studi_diterima_id: calon.program_studi_id,
+            })
+            break
+        except IntegrityError:
+            # NIM sama sudah di-commit approve lain: hitung ulang
+            db.rollback()
+    else:
+        raise ValueError(f"NIM unik untuk calon {calon_id} gagal dialokasikan")
+
+    if not updated:
+        raise _conflict(db, calon)
+
+    try:
+        claim_seats(db, calon.program_studi_id, calon.jalur_masuk_id)
+    except KuotaPenuh:
+        db.rollback()
+        raise
+
+    old_status = StatusPendaftaran.PENDING
+    record_rollup(db, StatusPendaftaran.APPROVED, calon.program_studi_id, calon.jalur_masuk_id)
+    record_cube_transition(
+        db, calon.program_studi_id, calon.jalur_masuk_id, calon.created_at.year,
+        old_status, StatusPendaftaran.APPROVED
+    )
+    # Notifikasi dikirim dispatcher di background setelah commit
+    enqueue_approval_notification(db, calon)
+    db.commit()
+    db.refresh(calon)
+
+    event_bus.publish(Approved(
+        calon_id=calon.id,
+        program_studi_id=calon.program_studi_id,
+        jalur_masuk_id=calon.jalur_masuk_id,
+        old_status=old_status,
+        nim=calon.nim
+    ))
+    return old_status
+
+
+def reject_calon(db: Session, calon: CalonMahasiswa) -> StatusPendaftaran:
+    """
+    Reject calon mahasiswa (pending)
+
+    Returns:
+        Status sebelum reject
+
+    Raises:
+        StatusConflict: Jika calon sudah tidak pending
+    """
+    if not _transition(db, calon, StatusPendaftaran.REJECTED, {}):
+        raise _conflict(db, calon)
+
+    old_status = StatusPendaftaran.PENDING
+    record_rollup(db, StatusPendaftaran.REJECTED, calon.program_studi_id, calon.jalur_masuk_id)
+    record_cube_transition(
+        db, calon.program_studi_id, calon.jalur_masuk_id, calon.created_at.year,
+        old_status, StatusPendaftaran.REJECTED
+    )
+    db.commit()
+    db.refresh(calon)
+
+    event_bus.publish(Rejected(
+        calon_id=calon.id,
+        program_studi_id=calon.program_studi_id,
+        jalur_masuk_id=calon.jalur_masuk_id,
+        old_status=old_status
+    ))
+    return old_status
+
+
+class BulkRejectResult(NamedTuple):
+    """Hasil reject massal"""
+    groups: Counter  # (program_studi_id, jalur_masuk_id) -> jumlah calon di-reject
+    skipped: int  # cocok dengan filter tetapi sudah tidak pending
+
+
+def _match_filter(
+    program_studi_id: Optional[int] = None,
+    jalur_masuk_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> list:
+    criteria = []
+    if program_studi_id is not None:
+        criteria.append(CalonMahasiswa.program_studi_id == program_studi_id)
+    if jalur_masuk_id is not None:
+        criteria.append(CalonMahasiswa.jalur_masuk_id == jalur_masuk_id)
+    if created_from is not None:
+        criteria.append(CalonMahasiswa.created_at >= created_from)
+    if created_to is not None:
+        criteria.append(CalonMahasiswa.created_at < created_to)
+    return criteria
+
+
+def _pending_filter(**filters) -> list:
+    return [CalonMahasiswa.status == StatusPendaftaran.PENDING, *_match_filter(**filters)]
+
+
+def _count_skipped(db: Session, **filters) -> int:
+    """Jumlah calon yang cocok dengan filter tetapi sudah approved / rejected"""
+    return db.query(func.count(CalonMahasiswa.id)).filter(
+        CalonMahasiswa.status != StatusPendaftaran.PENDING, *_match_filter(**filters)
+    ).scalar()
+
+
+def count_bulk_reject(db: Session, **filters) -> BulkRejectResult:
+    """
+    Hitung calon pending yang akan di-reject oleh filter (dry run)
+
+    Args:
+        filters: program_studi_id, jalur_masuk_id, created_from, created_to (eksklusif)
+
+    Returns:
+        BulkRejectResult: jumlah calon per (prodi, jalur) dan jumlah yang akan dilewati
+    """
+    rows = db.query(
+        CalonMahasiswa.program_studi_id,
+        CalonMahasiswa.jalur_masuk_id,
+        func.count(CalonMahasiswa.id)
+    ).filter(*_pending_filter(**filters)).group_by(
+        CalonMahasiswa.program_studi_id, CalonMahasiswa.jalur_masuk_id
+    )
+    return BulkRejectResult(
+        groups=Counter({(prodi, jalur): count for prodi, jalur, count in rows}),
+        skipped=_count_skipped(db, **filters)
+    )
+
+
+def bulk_reject(db: Session, **filters) -> BulkRejectResult:
+    """
+    Reject semua calon pending yang cocok dengan filter dalam satu UPDATE
+
+    Rollup dan stats cube di-update per kelompok (prodi, jalur, tahun) di
+    transaksi yang sama; semua baris mendapat satu change_seq.
+
+    Args:
+        filters: program_studi_id, jalur_masuk_id, created_from, created_to (eksklusif)
+
+    Returns:
+        BulkRejectResult: jumlah calon yang di-reject per (prodi, jalur) dan
+        jumlah calon cocok yang dilewati karena sudah tidak pending
+    """
+    # Satu change_seq untuk semua baris; cursor feed perubahan memakai (change_seq, id)
+    change_seq = next_change_seq(db)
+    # Dihitung di transaksi tulis yang sama (sebelum UPDATE) agar konsisten dengan hasilnya
+    skipped = _count_skipped(db, **filters)
+    now = datetime.utcnow()
+    statement = update(CalonMahasiswa).where(*_pending_filter(**filters)).values(
+        status=StatusPendaftaran.REJECTED,
+        updated_at=now,
+        change_seq=change_seq
+    ).returning(
+        CalonMahasiswa.id,
+        CalonMahasiswa.program_studi_id,
+        CalonMahasiswa.jalur_masuk_id,
+        CalonMahasiswa.created_at
+    )
+    rows = db.execute(statement, execution_options={"synchronize_session": False}).all()
+    if not rows:
+        db.rollback()
+        return BulkRejectResult(groups=Counter(), skipped=skipped)
+
+    groups = Counter((prodi, jalur) for _, prodi, jalur, _ in rows)
+    cube_groups = Counter((prodi, jalur, created_at.year) for _, prodi, jalur, created_at in rows)
+    for (prodi, jalur), count in groups.items():
+        record_rollup(db, StatusPendaftaran.REJECTED, prodi, jalur, at=now, count=count)
+    for (prodi, jalur, tahun), count in cube_groups.items():
+        record_cube_transition(
+            db, prodi, jalur, tahun, StatusPendaftaran.PENDING, StatusPendaftaran.REJECTED, count=count
+        )
+    db.commit()
+    # Objek calon yang sudah ada di session tidak lagi sesuai database
+    db.expire_all()
+
+    event_bus.publish(BulkRejected(
+        calon_ids=tuple(calon_id for calon_id, _, _, _ in rows),
+        program_studi_ids=tuple({prodi for prodi, _ in groups})
+    ))
+    return BulkRejectResult(groups=groups, skipped=skipped)
@@ -0,0 +1,320 @@
+"""
+Backup online database PMB (SQLite) tanpa menghentikan pendaftaran
+
+Menyalin file pmb.db saat aplikasi berjalan bisa menghasilkan salinan yang
+tidak konsisten (torn copy), sedangkan mengunci database selama menyalin
+menghentikan registrasi. Dua metode yang didukung:
+
+- backup: SQLite online backup API. Database disalin per `pages_per_step`
+  halaman; lock baca hanya dipegang selama satu step dan dilepas di antara
+  step (dengan jeda singkat) sehingga transaksi registrasi tetap bisa
+  commit. Jika database berubah di tengah backup, SQLite mengulang dari awal
+  agar hasilnya tetap konsisten (dihitung sebagai restart). Setelah
+  `max_restarts` kali (beban tulis terus-menerus), sisa backup dilakukan
+  dalam satu step agar tetap selesai.
+- vacuum: VACUUM INTO, satu transaksi baca yang menghasilkan file ringkas
+  (tanpa halaman kosong). Lebih cepat, tetapi writer menunggu sampai selesai.
+
+Backup ditulis ke file sementara, diverifikasi dengan PRAGMA integrity_check,
+baru kemudian di-rename ke nama final. Backup lama di luar `keep` dihapus.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKUP_METHODS = ("backup", "vacuum")
+BACKUP_PREFIX = "pmb-"
+BACKUP_SUFFIX = ".db"
+
+
+class BackupError(RuntimeError):
+    """Backup gagal atau hasilnya tidak lolos integrity check"""
+
+
+@dataclass(frozen=True)
+class BackupResult:
+    """Hasil satu kali backup"""
+    path: str
+    method: str
+    size_bytes: int
+    pages: int
+    restarts: int
+    duration_seconds: float
+    throughput_mb_per_second: float
+    integrity: str
+    started_at: datetime
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["started_at"] = self.started_at.isoformat()
+        return data
+
+
+def sqlite_path(database_url: str) -> str:
+    """
+    Path file database dari DATABASE_URL
+
+    Raises:
+        BackupError: Jika database bukan SQLite file
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise BackupError(f"Backup online hanya untuk database SQLite file: {database_url}")
+    return url.database
+
+
+def backup_database(
+    source_path: str,
+    backup_dir: str,
+    method: str = "backup",
+    pages_per_step: int = 256,
+    step_sleep_seconds: float = 0.01,
+    keep: Optional[int] = None,
+    max_restarts: int = 3,
+) -> BackupResult:
+    """
+    Backup database SQLite secara online lalu verifikasi hasilnya
+
+    Args:
+        source_path: File database sumber
+        backup_dir: Direktori tujuan backup
+        method: "backup" (online backup API per step) atau "vacuum" (VACUUM INTO)
+        pages_per_step: Jumlah halaman per step (method backup)
+        step_sleep_seconds: Jeda antar step agar writer mendapat lock
+        keep: Jumlah backup terbaru yang disimpan (None = semua)
+        max_restarts: Batas restart sebelum backup diselesaikan dalam satu step
+
+    Raises:
+        BackupError: Jika method tidak dikenal, backup gagal, atau integrity check gagal
+    """
+    if method not in BACKUP_METHODS:
+        raise BackupError(f"Method backup tidak dikenal: {method}. Gunakan: {', '.join(BACKUP_METHODS)}")
+    if not os.path.exists(source_path):
+        raise BackupError(f"Database tidak ditemukan: {source_path}")
+
+    os.makedirs(backup_dir, exist_ok=True)
+    started_at = datetime.utcnow()
+    final_path = os.path.join(
+        backup_dir, f"{BACKUP_PREFIX}{started_at.strftime('%Y%m%d-%H%M%S-%f')}{BACKUP_SUFFIX}"
+    )
+    temp_path = final_path + ".partial"
+
+    start = time.perf_counter()
+    try:
+        if method == "backup":
+            restarts = _online_backup(
+                source_path, temp_path, pages_per_step, step_sleep_seconds, max_restarts
+            )
+        else:
+            restarts = 0
+            _vacuum_into(source_path, temp_path)
+        duration = time.perf_counter() - start
+
+        integrity, pages = _verify(temp_path)
+        if integrity != "ok":
+            raise BackupError(f"Integrity check backup gagal: {integrity}")
+        os.replace(temp_path, final_path)
+    except sqlite3.Error as e:
+        raise BackupError(f"Backup gagal: {e}") from e
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    size = os.path.getsize(final_path)
+    if keep is not None:
+        prune_backups(backup_dir, keep)
+
+    return BackupResult(
+        path=final_path,
+        method=method,
+        size_bytes=size,
+        pages=pages,
+        restarts=restarts,
+        duration_seconds=round(duration, 3),
+        throughput_mb_per_second=round(size / 1024 / 1024 / duration, 2) if duration > 0 else 0.0,
+        integrity=integrity,
+        started_at=started_at,
+    )
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _online_backup(
+    source_path: str,
+    target_path: str,
+    pages_per_step: int,
+    step_sleep_seconds: float,
+    max_restarts: int,
+) -> int:
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # Sisa halaman naik lagi = SQLite mengulang backup karena sumber berubah
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and step_sleep_seconds > 0:
+            # Lock baca sudah dilepas di antara step: beri kesempatan writer commit
+            time.sleep(step_sleep_seconds)
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=max(pages_per_step, 1), progress=progress)
+        except _TooManyRestarts:
+            # Database terus berubah: salin sekaligus (satu lock baca singkat)
+            logger.warning("Backup restart %s kali, diselesaikan dalam satu step", max_restarts)
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+    return restarts
+
+
+def _vacuum_into(source_path: str, target_path: str) -> None:
+    source = sqlite3.connect(source_path, timeout=30)
+    try:
+        source.execute("VACUUM INTO ?", (target_path,))
+    finally:
+        source.close()
+
+
+def _verify(path: str) -> tuple:
+    conn = sqlite3.connect(path)
+    try:
+        messages = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    return "; ".join(messages), pages
+
+
+def list_backups(backup_dir: str) -> list:
+    """File backup di direktori, terbaru lebih dulu"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [
+        name for name in os.listdir(backup_dir)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)
+    ]
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def prune_backups(backup_dir: str, keep: int) -> list:
+    """Hapus backup lama, sisakan `keep` terbaru. Returns: path yang dihapus"""
+    removed = list_backups(backup_dir)[max(keep, 1):]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def backup_from_settings() -> BackupResult:
+    """Backup database aplikasi dengan konfigurasi BACKUP_*"""
+    return backup_database(
+        sqlite_path(settings.DATABASE_URL),
+        settings.BACKUP_DIR,
+        method=settings.BACKUP_METHOD,
+        pages_per_step=settings.BACKUP_PAGES_PER_STEP,
+        step_sleep_seconds=settings.BACKUP_STEP_SLEEP_SECONDS,
+        keep=settings.BACKUP_KEEP,
+    )
+
+
+class BackupScheduler:
+    """Background thread yang menjalankan backup setiap interval"""
+
+    def __init__(self, backup: Callable, interval_seconds: float):
+        self.backup = backup
+        self.interval_seconds = interval_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_result: Optional[BackupResult] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Hentikan scheduler (backup yang sedang berjalan diselesaikan dulu)"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_once(self) -> Optional[BackupResult]:
+        self.runs += 1
+        try:
+            self.last_result = self.backup()
+            self.last_error = None
+            logger.info(
+                "Backup selesai: %s (%s bytes, %.3f s, %.2f MB/s)",
+                self.last_result.path,
+                self.last_result.size_bytes,
+                self.last_result.duration_seconds,
+                self.last_result.throughput_mb_per_second,
+            )
+            return self.last_result
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.exception("Backup terjadwal gagal")
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_backup": self.last_result.as_dict() if self.last_result else None,
+            "last_error": self.last_error,
+        }
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval_seconds):
+            self.run_once()
+
+
+# Scheduler aplikasi, dijalankan saat startup jika BACKUP_INTERVAL_MINUTES > 0
+_scheduler: Optional[BackupScheduler] = None
+
+
+def start_backup_scheduler() -> BackupScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BackupScheduler(backup_from_settings, settings.BACKUP_INTERVAL_MINUTES * 60)
+        _scheduler.start()
+    return _scheduler
+
+
+def stop_backup_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def backup_scheduler_stats() -> Optional[dict]:
+    return _scheduler.stats() if _scheduler is not None else None
@@ -0,0 +1,191 @@
+"""
+Response cache untuk endpoint baca yang sering diakses
+
+LRU + TTL cache in-process. Setiap entry diberi tag sehingga bisa
+di-invalidate secara tepat ketika data yang mendasarinya berubah
+(register, approve, reject).
+
+Thread-safe: semua operasi dilindungi satu lock.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from app.config import settings
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """LRU cache dengan TTL dan invalidasi berbasis tag"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, tuple[float, Any, frozenset]]" = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Ambil value dari cache, return default jika tidak ada / expired"""
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Any:
+        """Ambil value tanpa menghitung hit/miss dan tanpa mengubah urutan LRU"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        """Simpan value ke cache dengan tag untuk invalidasi"""
+        if not self.enabled:
+            return
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Hapus semua entry yang memiliki salah satu tag. Return jumlah entry yang dihapus."""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        """Kosongkan cache dan reset metrics"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> dict:
+        """Metrics cache (hit ratio, ukuran, eviction)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        # Caller harus memegang self._lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
+
+
+# ================== KEY & TAG HELPERS ==================
+
+def status_key(calon_id: int) -> tuple:
+    """Cache key untuk /status/{calon_id}"""
+    return ("status", calon_id)
+
+
+def calon_tag(calon_id: int) -> str:
+    """Tag untuk semua entry yang berisi data satu calon mahasiswa"""
+    return f"calon:{calon_id}"
+
+
+def list_key(status_value: Optional[str], program_studi_id: Optional[int], skip: int, limit: int) -> tuple:
+    """Cache key untuk /list"""
+    return ("list", status_value, program_studi_id, skip, limit)
+
+
+def list_bucket_tag(status_value: Optional[str], program_studi_id: Optional[int]) -> str:
+    """Tag untuk satu filter bucket /list (status x program studi, None = tanpa filter)"""
+    return f"list:{status_value or '*'}:{program_studi_id or '*'}"
+
+
+# Cube statistik in-memory; perubahan status diterapkan in place
+# (app.utils.stats_cube), tag hanya di-invalidate saat rebuild
+STATS_CUBE_KEY = ("stats_cube",)
+STATS_CUBE_TAG = "stats_cube"
+
+
+def invalidate_calon(calon_id: int, program_studi_id: int, *status_values: str) -> int:
+    """
+    Invalidate cache untuk satu calon mahasiswa yang berubah
+
+    Args:
+        calon_id: ID calon mahasiswa
+        program_studi_id: Program studi calon
+        status_values: Status lama dan/atau baru yang terpengaruh
+
+    Returns:
+        Jumlah entry yang dihapus
+    """
+    return invalidate_calon_many([calon_id], [program_studi_id], *status_values)
+
+
+def invalidate_calon_many(calon_ids, program_studi_ids, *status_values: str) -> int:
+    """
+    Invalidate cache untuk banyak calon sekaligus (transisi status massal)
+
+    Args:
+        calon_ids: ID calon mahasiswa yang berubah
+        program_studi_ids: Program studi yang terpengaruh
+        status_values: Status lama dan/atau baru yang terpengaruh
+
+    Returns:
+        Jumlah entry yang dihapus
+    """
+    tags = [calon_tag(calon_id) for calon_id in calon_ids]
+    for status_value in (*status_values, None):
+        for prodi in (*set(program_studi_ids), None):
+            tags.append(list_bucket_tag(status_value, prodi))
+    return response_cache.invalidate_tags(*tags)
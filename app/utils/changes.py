@@ -0,0 +1,63 @@
+"""
+Feed perubahan calon mahasiswa (change data capture)
+
+Setiap insert/update CalonMahasiswa mendapat change_seq baru (lihat
+app/models/change_sequence.py). Consumer (SIAKAD, keuangan) menyimpan cursor
+terakhir dan hanya mengambil baris dengan (change_seq, id) lebih besar,
+terurut lewat index ix_calon_mahasiswa_change_seq, per halaman terbatas.
+
+Cursor berbentuk "<change_seq>:<id>". ID ikut di cursor karena UPDATE
+set-based bisa memberi change_seq yang sama ke banyak baris.
+"""
+
+from typing import Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa
+
+START_CURSOR = "0:0"
+
+
+def parse_cursor(cursor: Optional[str]) -> tuple:
+    """
+    Parse cursor "<change_seq>:<id>" (None = dari awal)
+
+    Raises:
+        ValueError: Jika format cursor tidak valid
+    """
+    if not cursor:
+        return 0, 0
+    seq_text, separator, id_text = cursor.partition(":")
+    if not seq_text.isdigit() or (separator and not id_text.isdigit()):
+        raise ValueError(f"Cursor tidak valid: {cursor}")
+    return int(seq_text), int(id_text) if separator else 0
+
+
+def format_cursor(change_seq: int, calon_id: int) -> str:
+    return f"{change_seq}:{calon_id}"
+
+
+def fetch_changes(db: Session, cursor: Optional[str], limit: int) -> tuple:
+    """
+    Ambil perubahan setelah cursor
+
+    Returns:
+        Tuple (list CalonMahasiswa terurut change_seq, next_cursor, has_more)
+    """
+    since = parse_cursor(cursor)
+    rows = (
+        db.query(CalonMahasiswa)
+        .filter(
+            CalonMahasiswa.change_seq.isnot(None),
+            tuple_(CalonMahasiswa.change_seq, CalonMahasiswa.id) > tuple_(*since),
+        )
+        .order_by(CalonMahasiswa.change_seq, CalonMahasiswa.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = format_cursor(rows[-1].change_seq, rows[-1].id) if rows else format_cursor(*since)
+    return rows, next_cursor, has_more
@@ -0,0 +1,180 @@
+"""
+Adaptive concurrency limiting dan load shedding
+
+Middleware ASGI yang membatasi jumlah request in-flight per kelas route
+(write: POST/PUT/PATCH/DELETE, read: selain itu). Route yang memang lama
+(stream SSE, upload / download dokumen, job dan rebuild admin) dikecualikan
+lewat ROUTE_CLASSES agar latency-nya tidak menurunkan limit registrasi.
+Limit disesuaikan dengan algoritma AIMD berdasarkan latency yang diamati:
+
+- latency <= target  -> limit naik +1 per window (additive increase)
+- latency > target   -> limit dikali backoff (multiplicative decrease)
+
+Request yang melebihi limit langsung ditolak dengan 503 (load shedding)
+daripada mengantri sampai timeout, sehingga request yang diterima tetap cepat.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from app.config import settings
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# Prefix path -> kelas route ("write" / "read"), None = tidak dibatasi.
+# Prefix pertama yang cocok dipakai; path lain diklasifikasikan dari method.
+ROUTE_CLASSES = (
+    ("/health", None),
+    ("/api/pmb/stats/stream", None),
+    ("/api/pmb/dokumen/", None),
+    ("/api/jobs", None),
+    ("/api/pmb/stats/cube/rebuild", None),
+    ("/api/pmb/rank/rebuild", None),
+    ("/api/pmb/bulk/", None),
+    # Multi-get status memakai POST tetapi hanya membaca
+    ("/api/pmb/status/bulk", "read"),
+)
+
+
+def route_class(method: str, path: str, route_classes: tuple = ROUTE_CLASSES) -> Optional[str]:
+    """Kelas limiter untuk request: "write", "read", atau None jika dikecualikan"""
+    for prefix, route_class_name in route_classes:
+        if path.startswith(prefix):
+            return route_class_name
+    return "write" if method in WRITE_METHODS else "read"
+
+
+class AIMDLimiter:
+    """Concurrency limit adaptif dengan Additive Increase / Multiplicative Decrease"""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency_ms: float,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency_ms / 1000.0
+        self.backoff = backoff
+        self.in_flight = 0
+        self.shed = 0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Ambil slot in-flight; False jika limit sudah tercapai (request harus di-shed)"""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, dropped: bool = False) -> None:
+        """
+        Lepas slot dan sesuaikan limit
+
+        Args:
+            latency: Durasi request dalam detik
+            dropped: True jika request gagal karena overload (diperlakukan seperti latency tinggi)
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if dropped or latency > self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._successes = 0
+                return
+            # Additive increase: +1 setelah satu "window" (limit request) sukses
+            self._successes += 1
+            if self._successes >= int(self.limit):
+                self.limit = min(self.max_limit, self.limit + 1)
+                self._successes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "shed": self.shed,
+                "target_latency_ms": self.target_latency * 1000,
+            }
+
+
+class AdaptiveConcurrencyMiddleware:
+    """Middleware ASGI load shedding dengan limiter terpisah untuk write dan read"""
+
+    def __init__(
+        self,
+        app,
+        write_limiter: Optional[AIMDLimiter] = None,
+        read_limiter: Optional[AIMDLimiter] = None,
+        route_classes: tuple = ROUTE_CLASSES,
+    ):
+        self.app = app
+        self.write_limiter = write_limiter or AIMDLimiter(
+            settings.CONCURRENCY_WRITE_INITIAL_LIMIT,
+            settings.CONCURRENCY_WRITE_MIN_LIMIT,
+            settings.CONCURRENCY_WRITE_MAX_LIMIT,
+            settings.CONCURRENCY_WRITE_TARGET_LATENCY_MS,
+        )
+        self.read_limiter = read_limiter or AIMDLimiter(
+            settings.CONCURRENCY_READ_INITIAL_LIMIT,
+            settings.CONCURRENCY_READ_MIN_LIMIT,
+            settings.CONCURRENCY_READ_MAX_LIMIT,
+            settings.CONCURRENCY_READ_TARGET_LATENCY_MS,
+        )
+        self.route_classes = route_classes
+        limiters["write"] = self.write_limiter
+        limiters["read"] = self.read_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        kind = route_class(scope["method"], scope["path"], self.route_classes)
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.write_limiter if kind == "write" else self.read_limiter
+        if not limiter.try_acquire():
+            await _send_overloaded(send)
+            return
+
+        started = time.monotonic()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 503 dari downstream (mis. database locked) dianggap sinyal overload
+            limiter.release(time.monotonic() - started, dropped=status_code == 503)
+
+
+# Limiter aktif, diisi oleh middleware (untuk metrics)
+limiters: dict[str, AIMDLimiter] = {}
+
+
+async def _send_overloaded(send) -> None:
+    body = b'{"detail":"Server sedang sibuk. Coba lagi nanti."}'
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
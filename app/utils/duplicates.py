@@ -0,0 +1,189 @@
+"""
+Deteksi calon mahasiswa duplikat dengan blocking keys
+
+Satu orang bisa mendaftar dua kali dengan email berbeda. Membandingkan
+setiap pasangan calon (O(n^2)) tidak mungkin untuk jutaan baris, jadi calon
+dikelompokkan ke "block" berdasarkan key murah:
+
+- nomor telepon ter-normalisasi (normalize_phone)
+- tanggal lahir + key fonetik nama (build_name_key)
+
+Pasangan hanya di-score di dalam block yang sama, sehingga kompleksitas
+mendekati linear. Block yang terlalu besar (mis. nomor telepon sekolah yang
+dipakai banyak calon) dilewati agar tidak kembali menjadi kuadratik.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa
+from app.utils.validators import build_name_key, normalize_name
+
+# Bobot skor kemiripan
+WEIGHT_NAME = 0.45
+WEIGHT_TANGGAL_LAHIR = 0.30
+WEIGHT_PHONE = 0.25
+
+DEFAULT_MIN_SCORE = 0.7
+MAX_BLOCK_SIZE = 50
+
+
+@dataclass(frozen=True)
+class ApplicantRecord:
+    """Field yang dipakai untuk deteksi duplikat"""
+    id: int
+    nama_lengkap: str
+    phone: str
+    tanggal_lahir: date
+    normalized_name: str = field(compare=False)
+    name_key: str = field(compare=False)
+
+    @classmethod
+    def create(cls, id: int, nama_lengkap: str, phone: str, tanggal_lahir: date) -> "ApplicantRecord":
+        return cls(
+            id=id,
+            nama_lengkap=nama_lengkap,
+            phone=phone,
+            tanggal_lahir=tanggal_lahir,
+            normalized_name=normalize_name(nama_lengkap),
+            name_key=build_name_key(nama_lengkap),
+        )
+
+    def blocking_keys(self) -> list:
+        keys = [("phone", self.phone)]
+        if self.name_key:
+            keys.append(("dob_name", self.tanggal_lahir, self.name_key))
+        return keys
+
+
+@dataclass
+class DuplicateMatch:
+    """Pasangan calon yang kemungkinan orang yang sama"""
+    calon_id: int
+    duplicate_of: int
+    score: float
+    reasons: list
+
+
+def score_pair(a: ApplicantRecord, b: ApplicantRecord) -> tuple:
+    """
+    Hitung skor kemiripan dua calon (0..1)
+
+    Returns:
+        Tuple (score, reasons)
+    """
+    reasons = []
+    name_similarity = SequenceMatcher(None, a.normalized_name, b.normalized_name).ratio()
+    if a.name_key and a.name_key == b.name_key:
+        name_similarity = max(name_similarity, 0.9)
+    score = WEIGHT_NAME * name_similarity
+    if name_similarity >= 0.8:
+        reasons.append("nama")
+    if a.tanggal_lahir == b.tanggal_lahir:
+        score += WEIGHT_TANGGAL_LAHIR
+        reasons.append("tanggal_lahir")
+    if a.phone == b.phone:
+        score += WEIGHT_PHONE
+        reasons.append("phone")
+    return round(score, 4), reasons
+
+
+def find_duplicates_for(
+    db: Session,
+    nama_lengkap: str,
+    phone: str,
+    tanggal_lahir: date,
+    min_score: float = DEFAULT_MIN_SCORE,
+    exclude_id: Optional[int] = None,
+) -> list:
+    """
+    Cek duplikat untuk satu calon (dipakai saat register)
+
+    Kandidat diambil lewat index (phone, dan tanggal_lahir + name_key),
+    jadi biayanya tidak bergantung pada total jumlah calon.
+
+    Args:
+        phone: Nomor telepon yang sudah di-normalisasi
+
+    Returns:
+        List DuplicateMatch terurut dari skor tertinggi
+    """
+    record = ApplicantRecord.create(exclude_id or 0, nama_lengkap, phone, tanggal_lahir)
+    conditions = [CalonMahasiswa.phone == phone]
+    if record.name_key:
+        conditions.append(and_(
+            CalonMahasiswa.tanggal_lahir == tanggal_lahir,
+            CalonMahasiswa.name_key == record.name_key,
+        ))
+    query = db.query(
+        CalonMahasiswa.id,
+        CalonMahasiswa.nama_lengkap,
+        CalonMahasiswa.phone,
+        CalonMahasiswa.tanggal_lahir,
+    ).filter(or_(*conditions))
+    if exclude_id is not None:
+        query = query.filter(CalonMahasiswa.id != exclude_id)
+
+    matches = []
+    for row in query.limit(MAX_BLOCK_SIZE):
+        candidate = ApplicantRecord.create(*row)
+        score, reasons = score_pair(record, candidate)
+        if score >= min_score:
+            matches.append(DuplicateMatch(record.id, candidate.id, score, reasons))
+    return sorted(matches, key=lambda m: (-m.score, m.duplicate_of))
+
+
+def scan_duplicates(
+    records: Iterable[ApplicantRecord],
+    min_score: float = DEFAULT_MIN_SCORE,
+    max_block_size: int = MAX_BLOCK_SIZE,
+) -> dict:
+    """
+    Batch scan duplikat pada seluruh calon
+
+    Returns:
+        Dict dengan keys: matches (list DuplicateMatch), blocks, oversized_blocks
+    """
+    blocks: dict = {}
+    for record in records:
+        for key in record.blocking_keys():
+            blocks.setdefault(key, []).append(record)
+
+    seen = set()
+    matches = []
+    oversized = 0
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block_size:
+            oversized += 1
+            continue
+        for a, b in combinations(members, 2):
+            pair = (min(a.id, b.id), max(a.id, b.id))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            score, reasons = score_pair(a, b)
+            if score >= min_score:
+                matches.append(DuplicateMatch(pair[1], pair[0], score, reasons))
+
+    matches.sort(key=lambda m: (-m.score, m.duplicate_of, m.calon_id))
+    return {"matches": matches, "blocks": len(blocks), "oversized_blocks": oversized}
+
+
+def load_applicant_records(db: Session, batch_size: int = 10_000):
+    """Stream semua calon dari database sebagai ApplicantRecord"""
+    query = db.query(
+        CalonMahasiswa.id,
+        CalonMahasiswa.nama_lengkap,
+        CalonMahasiswa.phone,
+        CalonMahasiswa.tanggal_lahir,
+    ).yield_per(batch_size)
+    for row in query:
+        yield ApplicantRecord.create(*row)
@@ -0,0 +1,146 @@
+"""
+Idempotency-Key store untuk endpoint POST
+
+Request dengan header Idempotency-Key yang sama akan mendapatkan response
+yang disimpan dari eksekusi pertama, tanpa mengulang pekerjaan database.
+
+- Compact: hanya menyimpan fingerprint body request, status code, body
+  response (bytes JSON) dan header response yang ikut di-replay
+- Expiry: entry kadaluarsa setelah TTL dan jumlah key dibatasi (FIFO)
+- Concurrent duplicate: request kedua dengan key yang sedang diproses
+  menunggu request pertama selesai, lalu memakai response-nya
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Response
+
+from app.config import settings
+
+
+class IdempotencyKeyConflict(Exception):
+    """Idempotency-Key dipakai ulang dengan body request yang berbeda"""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Response yang disimpan untuk satu Idempotency-Key"""
+    fingerprint: str
+    status_code: int
+    body: bytes
+    expires_at: float
+    headers: tuple = ()  # (nama, nilai) header response asli
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers={**dict(self.headers), "Idempotent-Replayed": "true"}
+        )
+
+
+def request_fingerprint(payload: str) -> str:
+    """Hash body request agar key yang sama tidak bisa dipakai untuk data berbeda"""
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """In-memory store dengan TTL untuk response idempotent"""
+
+    def __init__(self, ttl_seconds: float = 86400, max_keys: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._completed: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._inflight: dict[str, tuple[str, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Mulai request dengan Idempotency-Key
+
+        Returns:
+            StoredResponse jika key sudah selesai diproses (replay), atau None
+            jika caller menjadi pemilik key dan harus mengeksekusi request lalu
+            memanggil complete() / release()
+
+        Raises:
+            IdempotencyKeyConflict: Jika key sudah dipakai dengan body berbeda
+        """
+        while True:
+            with self._lock:
+                self._purge_expired()
+                stored = self._completed.get(key)
+                if stored is not None:
+                    if stored.fingerprint != fingerprint:
+                        raise IdempotencyKeyConflict(
+                            "Idempotency-Key sudah dipakai untuk request dengan data berbeda"
+                        )
+                    self.replays += 1
+                    return stored
+
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    future = asyncio.get_running_loop().create_future()
+                    self._inflight[key] = (fingerprint, future)
+                    return None
+
+                inflight_fingerprint, future = inflight
+                if inflight_fingerprint != fingerprint:
+                    raise IdempotencyKeyConflict(
+                        "Idempotency-Key sedang dipakai untuk request dengan data berbeda"
+                    )
+
+            # Tunggu pemilik key selesai, lalu cek ulang (replay atau ambil alih)
+            await asyncio.shield(future)
+
+    def complete(self, key: str, status_code: int, body: bytes, headers: Optional[dict] = None) -> None:
+        """Simpan response pemilik key (termasuk header yang di-replay) dan bangunkan request yang menunggu"""
+        with self._lock:
+            fingerprint, future = self._inflight.pop(key)
+            self._completed[key] = StoredResponse(
+                fingerprint=fingerprint,
+                status_code=status_code,
+                body=body,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                headers=tuple((headers or {}).items())
+            )
+            while len(self._completed) > self.max_keys:
+                self._completed.popitem(last=False)
+        if not future.done():
+            future.set_result(None)
+
+    def release(self, key: str) -> None:
+        """Lepas key tanpa menyimpan response (request gagal), request yang menunggu akan dieksekusi ulang"""
+        with self._lock:
+            inflight = self._inflight.pop(key, None)
+        if inflight is not None and not inflight[1].done():
+            inflight[1].set_result(None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._completed.clear()
+            self._inflight.clear()
+            self.replays = 0
+
+    def _purge_expired(self) -> None:
+        # TTL konstan, jadi urutan insert == urutan expiry. Caller memegang lock.
+        now = time.monotonic()
+        while self._completed:
+            key, stored = next(iter(self._completed.items()))
+            if stored.expires_at > now:
+                break
+            del self._completed[key]
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+)
@@ -0,0 +1,509 @@
+"""
+Job background untuk operasi admin yang lama
+
+POST /api/jobs membuat baris jobs (status queued) lalu langsung return ID;
+JobRunner menjalankannya di thread pool. Setiap tipe job punya batas
+concurrency sendiri (mis. hanya satu bulk approve sekaligus) sehingga job
+berat tidak menghabiskan koneksi database dan worker yang dibutuhkan request.
+Job yang melebihi batas menunggu di antrian tipe-nya tanpa memakai thread.
+
+Job tersimpan di database. Worker yang menjalankan job memperbarui
+heartbeat_at (beserta progress done / total) secara berkala dari thread
+terpisah, sehingga proses lain bisa membaca progress dan tahu job masih
+hidup. Job running yang heartbeat-nya lebih tua dari lease (worker mati,
+restart) dikembalikan ke queued dan dijalankan ulang oleh worker mana pun;
+job yang masih dijalankan worker lain tidak disentuh. Handler job harus aman
+dijalankan ulang (idempotent), mis. bulk approve melewati calon yang sudah
+approved.
+
+Handler melaporkan progress ke memori; heartbeat yang menulisnya ke database
+berjalan di thread sendiri agar tidak berebut lock SQLite dengan transaksi
+job itu sendiri.
+"""
+
+import csv
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models import CalonMahasiswa, Job, JobStatus, StatusPendaftaran
+from app.utils.admission import approve_calon, StatusConflict
+from app.utils.cache import response_cache, STATS_CUBE_TAG
+from app.utils.duplicates import load_applicant_records, scan_duplicates
+from app.utils.seleksi import run_seleksi
+from app.utils.stats_cube import rebuild_stats_cube
+
+logger = logging.getLogger(__name__)
+
+
+# ================== REGISTRY ==================
+
+@dataclass
+class JobType:
+    """Definisi tipe job: handler, batas concurrency dan validasi params"""
+    name: str
+    handler: Callable
+    max_concurrency: int = 1
+    validate: Optional[Callable] = None
+
+
+JOB_TYPES: dict = {}
+
+
+def job_type(name: str, max_concurrency: int = 1, validate: Optional[Callable] = None):
+    """
+    Decorator untuk mendaftarkan handler job
+
+    Handler dipanggil dengan (db, context) dan mengembalikan dict result.
+    validate(params) raise ValueError untuk params yang tidak valid.
+    """
+    def decorator(handler: Callable) -> Callable:
+        JOB_TYPES[name] = JobType(name, handler, max_concurrency, validate)
+        return handler
+    return decorator
+
+
+@dataclass
+class JobContext:
+    """Informasi job yang diberikan ke handler"""
+    id: str
+    params: dict
+    progress: Callable = field(repr=False)  # progress(done, total)
+
+
+# ================== RUNNER ==================
+
+class JobRunner:
+    """Thread pool eksekusi job dengan batas concurrency per tipe"""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_workers: int = 4,
+        heartbeat_seconds: float = 10.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._condition = threading.Condition()
+        self._running: dict = defaultdict(int)
+        self._waiting: dict = defaultdict(deque)
+        self._progress: dict = {}
+        # Job yang sedang dijalankan proses ini (sudah di-claim)
+        self._active: set = set()
+        self._stopping = threading.Event()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name="job-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def create(self, db: Session, type_name: str, params: dict) -> Job:
+        """
+        Simpan job baru dan jadwalkan eksekusinya
+
+        Raises:
+            ValueError: Jika tipe job tidak dikenal atau params tidak valid
+        """
+        definition = JOB_TYPES.get(type_name)
+        if definition is None:
+            raise ValueError(f"Tipe job tidak dikenal: {type_name}")
+        if definition.validate is not None:
+            definition.validate(params)
+
+        job = Job(id=str(uuid.uuid4()), type=type_name, status=JobStatus.QUEUED, params=params)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.submit(job.id, type_name)
+        return job
+
+    def submit(self, job_id: str, type_name: str) -> None:
+        definition = JOB_TYPES[type_name]
+        with self._condition:
+            if self._running[type_name] >= definition.max_concurrency:
+                self._waiting[type_name].append(job_id)
+                return
+            self._running[type_name] += 1
+        self._executor.submit(self._execute, job_id, type_name)
+
+    def resume(self) -> int:
+        """Jadwalkan job queued dan job running yang terputus (heartbeat kedaluwarsa)"""
+        session = self.session_factory()
+        try:
+            queued = session.query(Job.id, Job.type, Job.created_at).filter(
+                Job.status == JobStatus.QUEUED
+            ).all()
+        finally:
+            session.close()
+        return self._schedule(queued + self._requeue_stale())
+
+    def recover_stale(self, now: Optional[datetime] = None) -> int:
+        """Jadwalkan ulang job running yang heartbeat-nya sudah kedaluwarsa"""
+        return self._schedule(self._requeue_stale(now))
+
+    def _requeue_stale(self, now: Optional[datetime] = None) -> list:
+        # Kembalikan ke queued dengan satu UPDATE bersyarat; job yang
+        # dijalankan proses ini sendiri tidak pernah dianggap terputus.
+        # Eksekusi tetap harus meng-claim ulang lewat _claim
+        expired_before = (now or datetime.utcnow()) - timedelta(seconds=self.lease_seconds)
+        with self._condition:
+            active = list(self._active)
+        session = self.session_factory()
+        try:
+            rows = session.execute(
+                update(Job)
+                .where(
+                    Job.status == JobStatus.RUNNING,
+                    or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < expired_before),
+                    Job.id.notin_(active),
+                )
+                .values(status=JobStatus.QUEUED)
+                .returning(Job.id, Job.type, Job.created_at),
+                execution_options={"synchronize_session": False},
+            ).all()
+            session.commit()
+        finally:
+            session.close()
+        for job_id, type_name, _ in rows:
+            logger.warning("Job %s (%s) tidak mengirim heartbeat, dijadwalkan ulang", job_id, type_name)
+        return rows
+
+    def _schedule(self, rows: list) -> int:
+        resumed = 0
+        for job_id, type_name, _ in sorted(rows, key=lambda row: row.created_at):
+            if type_name in JOB_TYPES:
+                self.submit(job_id, type_name)
+                resumed += 1
+            else:
+                logger.warning("Job %s bertipe %s tidak dikenal, dilewati", job_id, type_name)
+        return resumed
+
+    def progress(self, job_id: str) -> Optional[tuple]:
+        """Progress in-memory (done, total) job yang sedang berjalan"""
+        with self._condition:
+            return self._progress.get(job_id)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu sampai tidak ada job berjalan maupun menunggu (test / shutdown)"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not any(self._running.values()) and not any(self._waiting.values()),
+                timeout,
+            )
+
+    def stop(self) -> None:
+        """Tunggu job yang sedang berjalan; job yang belum mulai tetap queued untuk restart berikutnya"""
+        with self._condition:
+            self._waiting.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._stopping.set()
+        self._heartbeat_thread.join()
+
+    def heartbeat(self) -> int:
+        """
+        Perbarui heartbeat_at dan progress semua job yang dijalankan proses ini
+
+        Returns:
+            Jumlah job yang diperbarui
+        """
+        with self._condition:
+            active = {job_id: self._progress.get(job_id) for job_id in self._active}
+        if not active:
+            return 0
+        now = datetime.utcnow()
+        session = self.session_factory()
+        try:
+            for job_id, progress in active.items():
+                values = {Job.heartbeat_at: now}
+                if progress is not None:
+                    values[Job.progress_done], values[Job.progress_total] = progress
+                session.query(Job).filter(
+                    Job.id == job_id, Job.status == JobStatus.RUNNING
+                ).update(values, synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+        return len(active)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopping.wait(self.heartbeat_seconds):
+            try:
+                self.heartbeat()
+                # Job dari worker / proses lain yang mati di tengah jalan
+                self.recover_stale()
+            except Exception:
+                logger.exception("Heartbeat job gagal")
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "running": {name: count for name, count in self._running.items() if count},
+                "waiting": {name: len(queue) for name, queue in self._waiting.items() if queue},
+            }
+
+    def _execute(self, job_id: str, type_name: str) -> None:
+        try:
+            self._run_job(job_id, JOB_TYPES[type_name])
+        except Exception:
+            logger.exception("Job %s gagal dijalankan", job_id)
+        finally:
+            with self._condition:
+                self._progress.pop(job_id, None)
+                waiting = self._waiting[type_name]
+                next_job = waiting.popleft() if waiting else None
+                if next_job is None:
+                    self._running[type_name] -= 1
+                self._condition.notify_all()
+            if next_job is not None:
+                self._executor.submit(self._execute, next_job, type_name)
+
+    def _run_job(self, job_id: str, definition: JobType) -> None:
+        session = self.session_factory()
+        try:
+            params = self._claim(session, job_id)
+            if params is None:
+                return
+            with self._condition:
+                self._active.add(job_id)
+
+            def report(done: int, total: Optional[int] = None) -> None:
+                with self._condition:
+                    self._progress[job_id] = (done, total)
+
+            try:
+                result = definition.handler(session, JobContext(job_id, params, report))
+            except Exception as e:
+                session.rollback()
+                logger.exception("Job %s (%s) gagal", job_id, definition.name)
+                self._finish(session, job_id, JobStatus.FAILED, error=str(e) or type(e).__name__)
+                return
+            self._finish(session, job_id, JobStatus.SUCCEEDED, result=result)
+        finally:
+            with self._condition:
+                self._active.discard(job_id)
+            session.close()
+
+    def _claim(self, session: Session, job_id: str) -> Optional[dict]:
+        """
+        Ubah job queued menjadi running dengan UPDATE bersyarat
+
+        Returns:
+            Params job, atau None jika job sudah di-claim worker / proses lain
+        """
+        now = datetime.utcnow()
+        claimed = session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(
+                status=JobStatus.RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=Job.attempts + 1,
+            )
+            .returning(Job.params),
+            execution_options={"synchronize_session": False},
+        ).first()
+        session.commit()
+        return dict(claimed.params or {}) if claimed is not None else None
+
+    def _finish(self, session: Session, job_id: str, job_status: JobStatus, result=None, error=None) -> None:
+        job = session.get(Job, job_id)
+        done, total = self.progress(job_id) or (job.progress_done, job.progress_total)
+        job.status = job_status
+        job.result = result
+        job.error = error
+        job.progress_done = done
+        job.progress_total = total
+        job.finished_at = datetime.utcnow()
+        session.commit()
+
+
+# Satu runner per engine (aplikasi dan test memakai database berbeda)
+_runners: dict = {}
+_runners_lock = threading.Lock()
+
+
+def get_job_runner(bind) -> JobRunner:
+    """Ambil (atau buat) runner untuk engine database yang diberikan"""
+    with _runners_lock:
+        runner = _runners.get(bind)
+        if runner is None:
+            runner = JobRunner(
+                sessionmaker(autocommit=False, autoflush=False, bind=bind),
+                max_workers=settings.JOB_MAX_WORKERS,
+                heartbeat_seconds=settings.JOB_HEARTBEAT_SECONDS,
+                lease_seconds=settings.JOB_LEASE_SECONDS,
+            )
+            _runners[bind] = runner
+        return runner
+
+
+def stop_job_runners() -> None:
+    """Hentikan semua runner (dipanggil saat shutdown)"""
+    with _runners_lock:
+        runners = list(_runners.values())
+        _runners.clear()
+    for runner in runners:
+        runner.stop()
+
+
+# ================== JOB TYPES ==================
+
+def _validate_filters(params: dict) -> None:
+    for key in ("program_studi_id", "jalur_masuk_id", "limit"):
+        if key in params and (not isinstance(params[key], int) or params[key] < 1):
+            raise ValueError(f"{key} harus bilangan bulat positif")
+
+
+def _validate_export(params: dict) -> None:
+    _validate_filters(params)
+    if "status" in params and params["status"] not in [s.value for s in StatusPendaftaran]:
+        raise ValueError("Status tidak valid. Gunakan: pending, approved, rejected")
+
+
+def _validate_duplicate_scan(params: dict) -> None:
+    min_score = params.get("min_score", settings.DUPLICATE_MIN_SCORE)
+    if not isinstance(min_score, (int, float)) or not 0 <= min_score <= 1:
+        raise ValueError("min_score harus di antara 0 dan 1")
+
+
+def _validate_seleksi(params: dict) -> None:
+    if "jalur_masuk_id" not in params:
+        raise ValueError("jalur_masuk_id wajib diisi")
+    _validate_filters(params)
+    if not isinstance(params.get("dry_run", False), bool):
+        raise ValueError("dry_run harus boolean")
+
+
+def _filtered_calon(db: Session, params: dict):
+    query = db.query(CalonMahasiswa)
+    if params.get("program_studi_id"):
+        query = query.filter(CalonMahasiswa.program_studi_id == params["program_studi_id"])
+    if params.get("jalur_masuk_id"):
+        query = query.filter(CalonMahasiswa.jalur_masuk_id == params["jalur_masuk_id"])
+    return query
+
+
+@job_type("bulk_approve", max_concurrency=1, validate=_validate_filters)
+def bulk_approve_job(db: Session, context: JobContext) -> dict:
+    """
+    Approve semua calon pending (opsional filter program_studi_id, jalur_masuk_id, limit)
+
+    Setiap calon di-approve dalam transaksi sendiri; calon yang gagal dicatat
+    dan tidak menghentikan job.
+    """
+    query = _filtered_calon(db, context.params).filter(
+        CalonMahasiswa.status == StatusPendaftaran.PENDING
+    ).order_by(CalonMahasiswa.created_at, CalonMahasiswa.id)
+    if context.params.get("limit"):
+        query = query.limit(context.params["limit"])
+    ids = [calon_id for (calon_id,) in query.with_entities(CalonMahasiswa.id)]
+
+    approved, failed = 0, {}
+    for done, calon_id in enumerate(ids, start=1):
+        calon = db.get(CalonMahasiswa, calon_id)
+        if calon is not None and calon.status == StatusPendaftaran.PENDING:
+            try:
+                approve_calon(db, calon)
+                approved += 1
+            except StatusConflict:
+                # Sudah diproses admin lain sejak daftar ID diambil
+                pass
+            except ValueError as e:
+                db.rollback()
+                failed[calon_id] = str(e)
+        context.progress(done, len(ids))
+    return {"approved": approved, "failed": failed}
+
+
+@job_type("duplicate_scan", max_concurrency=1, validate=_validate_duplicate_scan)
+def duplicate_scan_job(db: Session, context: JobContext) -> dict:
+    """Scan duplikat seluruh calon (versi background dari GET /api/pmb/duplicates)"""
+    total = db.query(CalonMahasiswa.id).count()
+
+    def records():
+        for loaded, record in enumerate(load_applicant_records(db), start=1):
+            if loaded % 1000 == 0:
+                context.progress(loaded, total)
+            yield record
+        context.progress(total, total)
+
+    scan = scan_duplicates(records(), min_score=context.params.get("min_score", settings.DUPLICATE_MIN_SCORE))
+    return {
+        "total_pairs": len(scan["matches"]),
+        "blocks": scan["blocks"],
+        "oversized_blocks": scan["oversized_blocks"],
+        "pairs": [
+            {"calon_id": m.calon_id, "duplicate_of": m.duplicate_of, "score": m.score, "reasons": m.reasons}
+            for m in scan["matches"][:settings.JOB_RESULT_MAX_ITEMS]
+        ],
+    }
+
+
+@job_type("seleksi", max_concurrency=1, validate=_validate_seleksi)
+def seleksi_job(db: Session, context: JobContext) -> dict:
+    """
+    Seleksi berbasis skor satu jalur (stable matching atas pilihan prodi dan kuota)
+
+    Hasil diterapkan sebagai approve massal dalam satu transaksi; dry_run hanya
+    menghitung alokasi. Aman dijalankan ulang: hanya calon yang masih pending
+    dan sisa kuota yang diproses.
+    """
+    return run_seleksi(
+        db,
+        context.params["jalur_masuk_id"],
+        dry_run=context.params.get("dry_run", False),
+        progress=context.progress,
+    )
+
+
+@job_type("rebuild_stats_cube", max_concurrency=1)
+def rebuild_stats_cube_job(db: Session, context: JobContext) -> dict:
+    """Hitung ulang cube statistik dari tabel calon_mahasiswa"""
+    cells = rebuild_stats_cube(db)
+    response_cache.invalidate_tags(STATS_CUBE_TAG)
+    context.progress(1, 1)
+    return {"cells": cells}
+
+
+EXPORT_COLUMNS = (
+    "id", "nama_lengkap", "email", "phone", "tanggal_lahir", "alamat",
+    "program_studi_id", "jalur_masuk_id", "status", "nim", "created_at", "approved_at",
+    "program_studi_diterima_id",
+)
+
+
+@job_type("export_calon", max_concurrency=2, validate=_validate_export)
+def export_calon_job(db: Session, context: JobContext) -> dict:
+    """Export data calon ke CSV di JOB_EXPORT_DIR (opsional filter status, prodi, jalur)"""
+    query = _filtered_calon(db, context.params)
+    if context.params.get("status"):
+        query = query.filter(CalonMahasiswa.status == StatusPendaftaran(context.params["status"]))
+    total = query.count()
+
+    os.makedirs(settings.JOB_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_EXPORT_DIR, f"calon-{context.id}.csv")
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        columns = [getattr(CalonMahasiswa, column) for column in EXPORT_COLUMNS]
+        for row in query.with_entities(*columns).order_by(CalonMahasiswa.id).yield_per(1000):
+            writer.writerow([value.value if isinstance(value, StatusPendaftaran) else value for value in row])
+            rows += 1
+            if rows % 1000 == 0:
+                context.progress(rows, total)
+    context.progress(rows, total)
+    return {"path": path, "rows": rows}
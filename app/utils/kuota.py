@@ -0,0 +1,106 @@
+"""
+Kuota penerimaan per program studi x jalur masuk
+
+Approve memakai satu kursi lewat UPDATE atomik di transaksi approve:
+
+    UPDATE kuota_prodi SET terisi = terisi + 1
+    WHERE program_studi_id = :prodi AND jalur_masuk_id = :jalur AND terisi < kapasitas
+
+Cek kuota O(1) (lookup unique index), tanpa COUNT calon approved, dan aman
+untuk approve bersamaan: dua transaksi tidak bisa sama-sama mengambil kursi
+terakhir. Jika transaksi approve di-rollback, kursi ikut kembali.
+"""
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa, KuotaProdi, StatusPendaftaran
+
+
+class KuotaPenuh(ValueError):
+    """Kuota program studi x jalur masuk sudah penuh"""
+
+    def __init__(self, kuota: KuotaProdi):
+        self.program_studi_id = kuota.program_studi_id
+        self.jalur_masuk_id = kuota.jalur_masuk_id
+        self.kapasitas = kuota.kapasitas
+        super().__init__(
+            f"Kuota program studi {kuota.program_studi_id} jalur {kuota.jalur_masuk_id} "
+            f"sudah penuh (kapasitas {kuota.kapasitas})"
+        )
+
+
+def _kuota_filter(program_studi_id: int, jalur_masuk_id: int) -> list:
+    return [
+        KuotaProdi.program_studi_id == program_studi_id,
+        KuotaProdi.jalur_masuk_id == jalur_masuk_id,
+    ]
+
+
+def claim_seats(db: Session, program_studi_id: int, jalur_masuk_id: int, count: int = 1) -> None:
+    """
+    Pakai `count` kursi kuota di transaksi session yang sedang berjalan
+
+    Tanpa baris kuota untuk prodi x jalur ini berarti tidak dibatasi.
+
+    Raises:
+        KuotaPenuh: Jika sisa kuota kurang dari count
+    """
+    claimed = db.query(KuotaProdi).filter(
+        *_kuota_filter(program_studi_id, jalur_masuk_id),
+        KuotaProdi.terisi + count <= KuotaProdi.kapasitas
+    ).update({KuotaProdi.terisi: KuotaProdi.terisi + count}, synchronize_session=False)
+    if claimed:
+        return
+
+    kuota = db.query(KuotaProdi).filter(*_kuota_filter(program_studi_id, jalur_masuk_id)).first()
+    if kuota is not None:
+        raise KuotaPenuh(kuota)
+
+
+def set_kuota(db: Session, program_studi_id: int, jalur_masuk_id: int, kapasitas: int) -> KuotaProdi:
+    """
+    Buat atau ubah kapasitas kuota (belum di-commit)
+
+    Saat kuota pertama kali dibuat, `terisi` diinisialisasi dari jumlah calon
+    yang sudah approved lewat satu INSERT ... SELECT COUNT(*). Statement tulis
+    memegang write lock SQLite sejak awal, sehingga approve yang commit di
+    antara COUNT dan INSERT tidak mungkin terlewat. Setelah itu `terisi`
+    dipelihara oleh approve; kapasitas diubah dengan UPDATE bersyarat
+    terisi <= kapasitas agar tidak bisa turun di bawah kursi yang baru diambil.
+
+    Raises:
+        ValueError: Jika kapasitas lebih kecil dari kursi yang sudah terisi
+    """
+    terisi = select(
+        literal(program_studi_id),
+        literal(jalur_masuk_id),
+        literal(kapasitas),
+        func.count(CalonMahasiswa.id),
+    ).where(
+        # Kursi dipakai di prodi tempat calon diterima (data lama: prodi daftar)
+        func.coalesce(
+            CalonMahasiswa.program_studi_diterima_id, CalonMahasiswa.program_studi_id
+        ) == program_studi_id,
+        CalonMahasiswa.jalur_masuk_id == jalur_masuk_id,
+        CalonMahasiswa.status == StatusPendaftaran.APPROVED
+    )
+    db.execute(
+        sqlite_insert(KuotaProdi).from_select(
+            ["program_studi_id", "jalur_masuk_id", "kapasitas", "terisi"], terisi
+        ).on_conflict_do_nothing(index_elements=["program_studi_id", "jalur_masuk_id"])
+    )
+    updated = db.query(KuotaProdi).filter(
+        *_kuota_filter(program_studi_id, jalur_masuk_id),
+        KuotaProdi.terisi <= kapasitas
+    ).update({KuotaProdi.kapasitas: kapasitas}, synchronize_session=False)
+
+    kuota = db.query(KuotaProdi).filter(
+        *_kuota_filter(program_studi_id, jalur_masuk_id)
+    ).populate_existing().one()
+    if not updated:
+        raise ValueError(
+            f"Kapasitas {kapasitas} lebih kecil dari kursi yang sudah terisi ({kuota.terisi})"
+        )
+    return kuota
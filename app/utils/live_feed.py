@@ -0,0 +1,228 @@
+"""
+Live feed statistik dashboard (Server-Sent Events)
+
+Dashboard berlangganan GET /api/pmb/stats/stream, menerima satu snapshot
+statistik lalu delta setiap kali ada register / approve / reject.
+
+Delta di-coalesce: semua perubahan dalam satu jendela (LIVE_FEED_COALESCE_MS)
+dijumlahkan menjadi satu event, diserialisasi sekali, lalu di-fan-out ke
+antrian setiap koneksi. Ribuan dashboard = satu event per jendela, bukan
+ribuan query agregat.
+
+Koneksi yang terlalu lambat (antrian penuh) tidak memblok publisher: backlog-nya
+dibuang dan diganti event "resync" agar client mengambil ulang /stats.
+
+Koneksi baru berlangganan lebih dulu, baru kemudian snapshot diambil dari
+database. Saat subscribe, jendela delta yang sedang berjalan ditutup dan
+dikirim hanya ke subscriber lama: delta itu sudah ter-commit sehingga sudah
+termasuk di snapshot. Antrian koneksi baru hanya menerima delta dengan seq
+lebih besar dari snapshot, dan tidak ada delta yang hilang di antaranya.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Optional
+
+from app.config import settings
+from app.models import StatusPendaftaran
+
+DELTA_FIELDS = ("total_pendaftar", "pending", "approved", "rejected")
+COUNT_FIELDS = ("program_studi_counts", "jalur_masuk_counts")
+
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Serialisasi satu event SSE"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+KEEP_ALIVE = ": keep-alive\n\n"
+RESYNC = format_event("resync", {"reason": "slow_consumer"})
+
+
+def status_delta(
+    old_status: Optional[StatusPendaftaran],
+    new_status: StatusPendaftaran,
+    program_studi_nama: Optional[str] = None,
+    jalur_masuk_nama: Optional[str] = None,
+    count: int = 1,
+) -> dict:
+    """
+    Delta statistik untuk perubahan status (format sama dengan /stats)
+
+    Args:
+        old_status: Status lama, None untuk registrasi baru
+        program_studi_nama / jalur_masuk_nama: Diisi untuk registrasi baru
+            (hitungan per prodi / jalur mencakup semua status)
+        count: Jumlah calon dengan perubahan yang sama (transisi massal)
+    """
+    delta = {new_status.value: count}
+    if old_status is None:
+        delta["total_pendaftar"] = count
+        if program_studi_nama:
+            delta["program_studi_counts"] = {program_studi_nama: count}
+        if jalur_masuk_nama:
+            delta["jalur_masuk_counts"] = {jalur_masuk_nama: count}
+    elif old_status != new_status:
+        delta[old_status.value] = -count
+    else:
+        return {}
+    return delta
+
+
+def merge_delta(target: dict, delta: dict) -> dict:
+    """Jumlahkan delta ke target (in-place), return target"""
+    for field in DELTA_FIELDS:
+        if field in delta:
+            target[field] = target.get(field, 0) + delta[field]
+    for field in COUNT_FIELDS:
+        for name, count in delta.get(field, {}).items():
+            counts = target.setdefault(field, {})
+            counts[name] = counts.get(name, 0) + count
+    return target
+
+
+class LiveFeed:
+    """Broadcaster delta statistik dengan coalescing dan antrian per subscriber"""
+
+    def __init__(self, coalesce_ms: float = 250.0, queue_size: int = 64):
+        self.coalesce_seconds = coalesce_ms / 1000.0
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: set = set()
+        self._pending: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.seq = 0
+        self.published = 0
+        self.broadcasts = 0
+        self.resyncs = 0
+
+    def publish(self, delta: dict) -> None:
+        """
+        Tambahkan delta ke jendela coalescing berikutnya
+
+        Thread-safe dan tidak pernah blocking; tanpa subscriber delta dibuang.
+        """
+        if not delta:
+            return
+        with self._lock:
+            if not self._subscribers:
+                return
+            first = self._pending is None
+            self._pending = merge_delta(self._pending or {}, delta)
+            self.published += 1
+            loop, wakeup = self._loop, self._wakeup
+        if first:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # Event loop subscriber sudah ditutup
+                pass
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Daftarkan koneksi baru; harus dipanggil dari event loop yang melayani stream
+
+        Delta yang dipublish sebelum subscribe tidak masuk antrian ini (jendela
+        berjalan langsung dikirim ke subscriber lama), sehingga snapshot yang
+        diambil setelah subscribe ditambah delta di antrian selalu konsisten.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self._loop is not loop or self._flusher is None or self._flusher.done():
+                # Subscriber terikat pada event loop; mulai flusher di loop ini
+                self._subscribers.clear()
+                self._pending = None
+                self._loop = loop
+                self._wakeup = asyncio.Event()
+                self._flusher = loop.create_task(self._run())
+            elif self._pending is not None:
+                delta, self._pending = self._pending, None
+                self._broadcast(delta, list(self._subscribers))
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.coalesce_seconds)
+            self._wakeup.clear()
+            with self._lock:
+                delta, self._pending = self._pending, None
+                subscribers = list(self._subscribers)
+            if delta is not None:
+                self._broadcast(delta, subscribers)
+
+    def _broadcast(self, delta: dict, subscribers: list) -> None:
+        self.seq += 1
+        self.broadcasts += 1
+        message = format_event("delta", delta, event_id=self.seq)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(queue)
+
+    def _resync(self, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+        self.resyncs += 1
+
+    async def stream(
+        self,
+        snapshot: dict,
+        heartbeat_seconds: float = 15.0,
+        queue: Optional[asyncio.Queue] = None,
+        snapshot_seq: Optional[int] = None,
+    ):
+        """
+        Async generator untuk StreamingResponse: snapshot lalu delta
+
+        Komentar keep-alive dikirim jika tidak ada event selama heartbeat_seconds.
+        Saat client disconnect Starlette membatalkan generator dan subscriber dilepas.
+
+        Args:
+            queue: Antrian dari subscribe() yang dipanggil sebelum snapshot diambil
+            snapshot_seq: Nilai seq saat subscribe (id event snapshot)
+        """
+        if queue is None:
+            queue = self.subscribe()
+            snapshot_seq = self.seq
+        try:
+            yield format_event("snapshot", snapshot, event_id=snapshot_seq)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield KEEP_ALIVE
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "broadcasts": self.broadcasts,
+                "resyncs": self.resyncs,
+                "seq": self.seq,
+            }
+
+
+live_feed = LiveFeed(
+    coalesce_ms=settings.LIVE_FEED_COALESCE_MS,
+    queue_size=settings.LIVE_FEED_QUEUE_SIZE,
+)
@@ -0,0 +1,125 @@
+"""
+Upgrade skema database lama saat startup (SQLite)
+
+Base.metadata.create_all hanya membuat tabel yang belum ada; kolom dan index
+baru di tabel yang sudah ada (mis. calon_mahasiswa dari database sebelum
+fitur deteksi duplikat) tidak ikut dibuat, sehingga setiap query ORM gagal
+dengan "no such column". ensure_schema menambahkannya secara idempotent:
+
+1. ALTER TABLE ... ADD COLUMN untuk kolom model yang belum ada
+2. Backfill isi kolom tersebut untuk baris lama
+3. CREATE INDEX IF NOT EXISTS untuk semua index model
+
+Semua langkah dijalankan dalam satu transaksi; database yang sudah terbaru
+tidak diubah sama sekali.
+"""
+
+import logging
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa, next_change_seq
+from app.utils.validators import build_name_key
+
+logger = logging.getLogger(__name__)
+
+
+def _backfill_name_key(connection: Connection) -> None:
+    rows = connection.execute(text(
+        "SELECT id, nama_lengkap FROM calon_mahasiswa WHERE name_key IS NULL"
+    )).all()
+    if rows:
+        connection.execute(
+            text("UPDATE calon_mahasiswa SET name_key = :name_key WHERE id = :id"),
+            [{"id": calon_id, "name_key": build_name_key(nama)} for calon_id, nama in rows]
+        )
+
+
+def _backfill_change_seq(connection: Connection) -> None:
+    # Baris lama mendapat nomor dari blok sequence sebesar max(id), urut ID,
+    # sehingga feed perubahan (change_seq, id) juga mencakup data sebelum upgrade
+    max_id = connection.execute(text("SELECT MAX(id) FROM calon_mahasiswa")).scalar()
+    if not max_id:
+        return
+    first = next_change_seq(Session(bind=connection), max_id)
+    connection.execute(
+        text("UPDATE calon_mahasiswa SET change_seq = :offset + id WHERE change_seq IS NULL"),
+        {"offset": first - 1}
+    )
+
+
+def _backfill_program_studi_diterima(connection: Connection) -> None:
+    # Sebelum seleksi multi-pilihan calon selalu diterima di prodi daftar
+    connection.execute(text(
+        "UPDATE calon_mahasiswa SET program_studi_diterima_id = program_studi_id WHERE status = 'APPROVED'"
+    ))
+
+
+class ColumnUpgrade(NamedTuple):
+    """Kolom yang ditambahkan ke tabel lama beserta backfill-nya"""
+    table: str
+    column: str
+    backfill: Optional[Callable[[Connection], None]] = None
+
+
+# Urutan = urutan fitur; backfill kolom belakangan boleh memakai kolom sebelumnya
+COLUMN_UPGRADES = (
+    ColumnUpgrade("calon_mahasiswa", "name_key", _backfill_name_key),
+    ColumnUpgrade("calon_mahasiswa", "change_seq", _backfill_change_seq),
+    # Skor seleksi diisi lewat PUT /api/pmb/seleksi, baris lama tetap NULL
+    ColumnUpgrade("calon_mahasiswa", "skor"),
+    ColumnUpgrade("calon_mahasiswa", "program_studi_diterima_id", _backfill_program_studi_diterima),
+    # Baris sending lama tanpa lease (NULL) dianggap sudah kedaluwarsa
+    ColumnUpgrade("notification_outbox", "claimed_at"),
+    # Job running lama tanpa heartbeat (NULL) dianggap terputus
+    ColumnUpgrade("jobs", "heartbeat_at"),
+)
+
+# Tabel yang index-nya dibuat ulang (IF NOT EXISTS) setelah kolom ditambahkan
+INDEXED_TABLES = (CalonMahasiswa.__table__,)
+
+
+def _add_column_ddl(connection: Connection, upgrade: ColumnUpgrade) -> str:
+    column = CalonMahasiswa.metadata.tables[upgrade.table].c[upgrade.column]
+    ddl = f"ALTER TABLE {upgrade.table} ADD COLUMN {column.name} {column.type.compile(connection.dialect)}"
+    for foreign_key in column.foreign_keys:
+        ddl += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+    return ddl
+
+
+def ensure_schema(engine) -> list:
+    """
+    Tambahkan kolom / index yang belum ada di database lama dan backfill isinya
+
+    Returns:
+        Nama kolom yang ditambahkan ("tabel.kolom"), kosong jika skema sudah terbaru
+    """
+    if engine.dialect.name != "sqlite":
+        return []
+    added = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        existing = {}
+        for upgrade in COLUMN_UPGRADES:
+            if upgrade.table not in existing:
+                existing[upgrade.table] = {column["name"] for column in inspector.get_columns(upgrade.table)}
+            if upgrade.column in existing[upgrade.table]:
+                continue
+            connection.execute(text(_add_column_ddl(connection, upgrade)))
+            if upgrade.backfill is not None:
+                upgrade.backfill(connection)
+            existing[upgrade.table].add(upgrade.column)
+            added.append(f"{upgrade.table}.{upgrade.column}")
+
+        for table in INDEXED_TABLES:
+            columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+            for index in table.indexes:
+                if all(column.name in columns for column in index.columns):
+                    index.create(connection, checkfirst=True)
+
+    if added:
+        logger.info("Skema database di-upgrade, kolom baru: %s", ", ".join(added))
+    return added
@@ -9,14 +9,25 @@ Idempotent - akan return NIM yang sama jika sudah di-generate sebelumnya.
 """
 
 from datetime import datetime
+from typing import NamedTuple, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from app.models import CalonMahasiswa
+import re
 import threading
 
+try:
+    import numpy as np
+except ImportError:  # numpy opsional, batch parsing fallback ke loop Python
+    np = None
+
 # Lock untuk thread safety
 _nim_lock = threading.Lock()
 
+# Format: YYYY[3digit]-XXXX (hanya digit ASCII)
+NIM_PATTERN = re.compile(r'([0-9]{4})([0-9]{3})-([0-9]{4})')
+NIM_LENGTH = 12
+
 
 def generate_nim(calon_id: int, tahun: int, kode_prodi: str, db: Session) -> str:
     """
@@ -37,11 +48,7 @@ def generate_nim(calon_id: int, tahun: int, kode_prodi: str, db: Session) -> str
     
     with _nim_lock:
         # Validasi input
-        if not isinstance(tahun, int) or tahun < 2000 or tahun > 2100:
-            raise ValueError(f"Tahun tidak valid: {tahun}")
-        
-        if not isinstance(kode_prodi, str) or len(kode_prodi) != 3 or not kode_prodi.isdigit():
-            raise ValueError(f"Kode prodi harus 3 digit: {kode_prodi}")
+        _validate_nim_params(tahun, kode_prodi)
         
         # Check: Apakah calon ini sudah punya NIM? (idempotent)
         calon = db.query(CalonMahasiswa).filter_by(id=calon_id).first()
@@ -52,19 +59,7 @@ def generate_nim(calon_id: int, tahun: int, kode_prodi: str, db: Session) -> str
             # Sudah punya NIM, return yang sudah ada (idempotent)
             return calon.nim
         
-        # Hitung running number: berapa banyak NIM sudah di-generate untuk tahun+prodi ini?
-        existing_count = db.query(func.count(CalonMahasiswa.id)).filter(
-            and_(
-                CalonMahasiswa.nim.isnot(None),
-                CalonMahasiswa.nim.like(f"{tahun}{kode_prodi}%")
-            )
-        ).scalar()
-        
-        # Running number dimulai dari 0001
-        running_number = existing_count + 1
-        
-        # Format: YYYY-KODE-XXXX atau YYYY[KODE]XXXX
-        nim = f"{tahun}{kode_prodi}-{running_number:04d}"
+        nim = next_nim(tahun, kode_prodi, db)
         
         # Simpan NIM ke database
         calon.nim = nim
@@ -75,6 +70,42 @@ def generate_nim(calon_id: int, tahun: int, kode_prodi: str, db: Session) -> str
         return nim
 
 
+def next_nim(tahun: int, kode_prodi: str, db: Session) -> str:
+    """
+    Hitung NIM berikutnya untuk tahun + prodi tanpa menyimpannya
+    
+    Tidak memakai lock: caller menyimpan NIM lewat UPDATE dan mengulang
+    dengan NIM baru jika constraint unique nim dilanggar (approve lain
+    mendapat nomor yang sama lebih dulu).
+    
+    Raises:
+        ValueError: Jika tahun atau kode prodi tidak valid
+    """
+    _validate_nim_params(tahun, kode_prodi)
+    
+    # Hitung running number: berapa banyak NIM sudah di-generate untuk tahun+prodi ini?
+    existing_count = db.query(func.count(CalonMahasiswa.id)).filter(
+        and_(
+            CalonMahasiswa.nim.isnot(None),
+            CalonMahasiswa.nim.like(f"{tahun}{kode_prodi}%")
+        )
+    ).scalar()
+    
+    # Running number dimulai dari 0001
+    running_number = existing_count + 1
+    
+    # Format: YYYY-KODE-XXXX atau YYYY[KODE]XXXX
+    return f"{tahun}{kode_prodi}-{running_number:04d}"
+
+
+def _validate_nim_params(tahun: int, kode_prodi: str) -> None:
+    if not isinstance(tahun, int) or tahun < 2000 or tahun > 2100:
+        raise ValueError(f"Tahun tidak valid: {tahun}")
+    
+    if not isinstance(kode_prodi, str) or len(kode_prodi) != 3 or not kode_prodi.isdigit():
+        raise ValueError(f"Kode prodi harus 3 digit: {kode_prodi}")
+
+
 def validate_nim_format(nim: str) -> bool:
     """
     Validasi format NIM
@@ -85,10 +116,7 @@ def validate_nim_format(nim: str) -> bool:
     Returns:
         True jika format valid, False sebaliknya
     """
-    import re
-    # Format: YYYY[3digit]-XXXX
-    pattern = r'^\d{4}\d{3}-\d{4}$'
-    return bool(re.match(pattern, nim))
+    return isinstance(nim, str) and NIM_PATTERN.fullmatch(nim) is not None
 
 
 def parse_nim(nim: str) -> dict:
@@ -116,3 +144,81 @@ def parse_nim(nim: str) -> dict:
         'kode_prodi': kode_prodi,
         'running_number': running_number
     }
+
+
+class NIMBatch(NamedTuple):
+    """
+    Hasil parsing banyak NIM dalam bentuk kolom
+
+    Elemen yang tidak valid berisi tahun=0, kode_prodi='' dan running_number=0.
+    Berupa numpy array jika numpy tersedia, selain itu list.
+    """
+    tahun: Sequence[int]
+    kode_prodi: Sequence[str]
+    running_number: Sequence[int]
+    valid: Sequence[bool]
+
+
+def parse_nim_batch(nims: Sequence[str]) -> NIMBatch:
+    """
+    Parse dan validasi banyak NIM sekaligus (untuk job rekonsiliasi)
+
+    Menggunakan operasi vectorized numpy jika tersedia. NIM yang tidak valid
+    tidak menimbulkan exception; cek kolom valid.
+
+    Args:
+        nims: Sequence / array NIM string
+
+    Returns:
+        NIMBatch dengan kolom tahun, kode_prodi, running_number dan valid
+    """
+    if np is not None:
+        return _parse_nim_batch_numpy(nims)
+    return _parse_nim_batch_python(nims)
+
+
+def validate_nim_format_batch(nims: Sequence[str]) -> Sequence[bool]:
+    """Validasi format banyak NIM sekaligus, return mask valid"""
+    return parse_nim_batch(nims).valid
+
+
+def _parse_nim_batch_python(nims: Sequence[str]) -> NIMBatch:
+    tahun, kode_prodi, running_number, valid = [], [], [], []
+    fullmatch = NIM_PATTERN.fullmatch
+    for nim in nims:
+        match = fullmatch(nim) if isinstance(nim, str) else None
+        if match is None:
+            tahun.append(0)
+            kode_prodi.append('')
+            running_number.append(0)
+            valid.append(False)
+        else:
+            tahun.append(int(match.group(1)))
+            kode_prodi.append(match.group(2))
+            running_number.append(int(match.group(3)))
+            valid.append(True)
+    return NIMBatch(tahun, kode_prodi, running_number, valid)
+
+
+def _parse_nim_batch_numpy(nims: Sequence[str]) -> NIMBatch:
+    # Satu karakter ekstra untuk mendeteksi string yang lebih panjang dari NIM
+    width = NIM_LENGTH + 1
+    strings = np.asarray(nims).astype(f'U{width}')
+    codes = strings.view(np.uint32).reshape(len(strings), width)
+
+    is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+    valid = (
+        is_digit[:, 0:7].all(axis=1)
+        & (codes[:, 7] == ord('-'))
+        & is_digit[:, 8:12].all(axis=1)
+        & (codes[:, 12] == 0)
+    )
+
+    digits = codes.astype(np.int64) - ord('0')
+    place = np.array([1000, 100, 10, 1], dtype=np.int64)
+    tahun = np.where(valid, digits[:, 0:4] @ place, 0)
+    running_number = np.where(valid, digits[:, 8:12] @ place, 0)
+    kode_prodi = np.ascontiguousarray(codes[:, 4:7]).view('U3').ravel()
+    kode_prodi = np.where(valid, kode_prodi, '')
+
+    return NIMBatch(tahun, kode_prodi, running_number, valid)
@@ -0,0 +1,411 @@
+"""
+Transactional outbox notifikasi calon mahasiswa
+
+Approve menulis baris notification_outbox di transaksi yang sama dengan
+perubahan status, sehingga notifikasi tidak pernah hilang (status ter-commit
+tanpa notifikasi) dan tidak pernah terkirim untuk approve yang di-rollback.
+Pengiriman email tidak menambah latency request.
+
+OutboxDispatcher (background thread) mengambil baris yang jatuh tempo per
+batch, mengirimnya lewat thread pool berukuran tetap (batas koneksi SMTP
+bersamaan, satu koneksi dipakai ulang untuk beberapa pesan), lalu mencatat
+hasilnya. Pengiriman yang gagal dijadwalkan ulang dengan exponential backoff
+sampai max attempts, setelah itu ditandai failed.
+
+Batch di-claim dengan satu UPDATE bersyarat (status masih pending) ...
+RETURNING yang juga mencatat claimed_at, sehingga dua dispatcher (mis.
+beberapa worker proses) tidak pernah mengirim baris yang sama. Pengiriman
+bersifat at-least-once: baris sending yang lease-nya (claimed_at + lease)
+sudah lewat dianggap ditinggal dispatcher yang mati dan dikembalikan ke
+pending. Baris yang masih dikirim dispatcher lain tidak disentuh.
+"""
+
+import logging
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models import CalonMahasiswa, NotificationOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutgoingNotification:
+    """Salinan baris outbox yang aman dipakai di thread pengirim"""
+    id: int
+    recipient: str
+    subject: str
+    body: str
+
+
+def enqueue_approval_notification(db: Session, calon: CalonMahasiswa) -> NotificationOutbox:
+    """
+    Tambahkan notifikasi approval ke outbox di transaksi session yang sedang berjalan
+
+    Caller yang melakukan commit bersama perubahan status calon.
+    """
+    notification = NotificationOutbox(**approval_notification_values(
+        calon.id, calon.email, calon.nama_lengkap, calon.program_studi.nama, calon.nim
+    ))
+    db.add(notification)
+    return notification
+
+
+def approval_notification_values(
+    calon_id: int,
+    email: str,
+    nama_lengkap: str,
+    program_studi_nama: str,
+    nim: str,
+) -> dict:
+    """Kolom baris outbox notifikasi approval (juga dipakai untuk insert massal hasil seleksi)"""
+    return dict(
+        calon_mahasiswa_id=calon_id,
+        channel="email",
+        recipient=email,
+        subject=f"Selamat! Anda diterima di {program_studi_nama}",
+        body=(
+            f"Halo {nama_lengkap},\n\n"
+            f"Selamat, pendaftaran Anda di program studi {program_studi_nama} "
+            f"telah disetujui.\n"
+            f"NIM Anda: {nim}\n\n"
+            f"Panitia {settings.APP_NAME}"
+        ),
+    )
+
+
+class SMTPSender:
+    """Pengirim email lewat SMTP (satu koneksi per batch pesan)"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        timeout: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send_many(self, notifications: list) -> list:
+        """
+        Kirim beberapa pesan lewat satu koneksi SMTP
+
+        Returns:
+            List error per pesan (None = terkirim), urutan sama dengan input
+        """
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except (OSError, smtplib.SMTPException) as e:
+            return [e] * len(notifications)
+
+        errors = []
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for notification in notifications:
+                try:
+                    smtp.send_message(self._build_message(notification))
+                    errors.append(None)
+                except smtplib.SMTPServerDisconnected:
+                    raise
+                except smtplib.SMTPException as e:
+                    # Penolakan satu pesan (penerima, pengirim, isi) tidak
+                    # menggagalkan pesan lain di koneksi yang sama
+                    errors.append(e)
+        except (OSError, smtplib.SMTPException) as e:
+            errors.extend([e] * (len(notifications) - len(errors)))
+        finally:
+            try:
+                smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                smtp.close()
+        return errors
+
+    def _build_message(self, notification: OutgoingNotification) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = notification.recipient
+        message["Subject"] = notification.subject
+        message.set_content(notification.body)
+        return message
+
+
+class OutboxDispatcher:
+    """Background worker pool yang mengirim isi notification_outbox"""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        sender,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 30.0,
+        poll_interval_seconds: float = 2.0,
+        lease_seconds: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outbox-sender")
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_delivery_lag_seconds = 0.0
+
+    def start(self) -> None:
+        """Kembalikan baris sending yang lease-nya habis lalu jalankan worker thread"""
+        self.recover_in_flight()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Selesaikan batch yang sedang berjalan lalu hentikan worker"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def wake(self) -> None:
+        """Minta dispatcher memeriksa outbox sekarang (mis. setelah approve)"""
+        self._wakeup.set()
+
+    def recover_in_flight(self, now: Optional[datetime] = None) -> int:
+        """
+        Kembalikan baris sending yang lease-nya sudah habis ke pending
+
+        Returns:
+            Jumlah baris yang dikembalikan
+        """
+        expired_before = (now or datetime.utcnow()) - timedelta(seconds=self.lease_seconds)
+        session = self.session_factory()
+        try:
+            recovered = session.query(NotificationOutbox).filter(
+                NotificationOutbox.status == OutboxStatus.SENDING,
+                or_(
+                    NotificationOutbox.claimed_at.is_(None),
+                    NotificationOutbox.claimed_at < expired_before,
+                ),
+            ).update({NotificationOutbox.status: OutboxStatus.PENDING}, synchronize_session=False)
+            session.commit()
+            return recovered
+        finally:
+            session.close()
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Proses satu batch notifikasi yang jatuh tempo
+
+        Returns:
+            Jumlah notifikasi yang diproses (terkirim maupun gagal)
+        """
+        now = now or datetime.utcnow()
+        session = self.session_factory()
+        try:
+            due = select(NotificationOutbox.id).where(
+                NotificationOutbox.status == OutboxStatus.PENDING,
+                NotificationOutbox.next_attempt_at <= now,
+            ).order_by(NotificationOutbox.id).limit(self.batch_size)
+            # Hanya baris yang masih pending saat UPDATE yang di-claim; baris
+            # yang sudah diambil dispatcher lain tidak ikut ter-RETURNING
+            claim = update(NotificationOutbox).where(
+                NotificationOutbox.status == OutboxStatus.PENDING,
+                NotificationOutbox.id.in_(due.scalar_subquery()),
+            ).values(status=OutboxStatus.SENDING, claimed_at=datetime.utcnow()).returning(
+                NotificationOutbox.id,
+                NotificationOutbox.recipient,
+                NotificationOutbox.subject,
+                NotificationOutbox.body,
+                NotificationOutbox.created_at,
+            )
+            rows = sorted(session.execute(claim, execution_options={"synchronize_session": False}).all())
+            # Claim di-commit dulu agar tidak ada lock database selama mengirim
+            session.commit()
+            if not rows:
+                return 0
+
+            notifications = [
+                OutgoingNotification(row.id, row.recipient, row.subject, row.body) for row in rows
+            ]
+            created_at = {row.id: row.created_at for row in rows}
+
+            errors = self._send(notifications)
+
+            finished_at = datetime.utcnow()
+            rows = session.query(NotificationOutbox).filter(
+                NotificationOutbox.id.in_(created_at)
+            ).all()
+            for row in rows:
+                self._record_result(row, errors[row.id], now, finished_at)
+            session.commit()
+        finally:
+            session.close()
+
+        self.batches += 1
+        delivered = [created_at[id] for id, error in errors.items() if error is None]
+        if delivered:
+            self.last_delivery_lag_seconds = round((finished_at - min(delivered)).total_seconds(), 3)
+        return len(notifications)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "batches": self.batches,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "last_delivery_lag_seconds": self.last_delivery_lag_seconds,
+        }
+
+    def _send(self, notifications: list) -> dict:
+        # Bagi batch ke maksimal `concurrency` pengirim, masing-masing satu koneksi
+        chunks = [notifications[i::self.concurrency] for i in range(self.concurrency)]
+        chunks = [chunk for chunk in chunks if chunk]
+        errors = {}
+        for chunk, chunk_errors in zip(chunks, self._executor.map(self._send_chunk, chunks)):
+            for notification, error in zip(chunk, chunk_errors):
+                errors[notification.id] = error
+        return errors
+
+    def _send_chunk(self, chunk: list) -> list:
+        try:
+            return self.sender.send_many(chunk)
+        except Exception as e:
+            logger.exception("Pengiriman notifikasi gagal")
+            return [e] * len(chunk)
+
+    def _record_result(
+        self,
+        row: NotificationOutbox,
+        error: Optional[Exception],
+        now: datetime,
+        finished_at: datetime,
+    ) -> None:
+        row.attempts += 1
+        if error is None:
+            row.status = OutboxStatus.SENT
+            row.sent_at = finished_at
+            row.last_error = None
+            self.sent += 1
+            return
+
+        row.last_error = str(error)[:500] or type(error).__name__
+        if row.attempts >= self.max_attempts:
+            row.status = OutboxStatus.FAILED
+            self.failed += 1
+            logger.warning("Notifikasi %s gagal permanen: %s", row.id, row.last_error)
+        else:
+            row.status = OutboxStatus.PENDING
+            row.next_attempt_at = now + timedelta(
+                seconds=self.retry_base_seconds * 2 ** (row.attempts - 1)
+            )
+            self.retried += 1
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Baris dari dispatcher lain yang mati saat mengirim
+                self.recover_in_flight()
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Dispatcher notifikasi gagal memproses batch")
+                processed = 0
+            if processed < self.batch_size:
+                # Outbox kosong / sisa belum jatuh tempo: tunggu approve berikutnya atau poll
+                self._wakeup.wait(self.poll_interval_seconds)
+                self._wakeup.clear()
+
+
+def outbox_metrics(db: Session, now: Optional[datetime] = None) -> dict:
+    """Queue depth dan lag outbox (umur notifikasi pending tertua)"""
+    now = now or datetime.utcnow()
+    counts = dict(
+        db.query(NotificationOutbox.status, func.count(NotificationOutbox.id))
+        .group_by(NotificationOutbox.status)
+        .all()
+    )
+    oldest_pending = db.query(func.min(NotificationOutbox.created_at)).filter(
+        NotificationOutbox.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING])
+    ).scalar()
+    metrics = {status.value: counts.get(status, 0) for status in OutboxStatus}
+    metrics["queue_depth"] = metrics["pending"] + metrics["sending"]
+    metrics["oldest_pending_age_seconds"] = (
+        round((now - oldest_pending).total_seconds(), 3) if oldest_pending else 0.0
+    )
+    if _dispatcher is not None:
+        metrics["dispatcher"] = _dispatcher.stats()
+    return metrics
+
+
+# Dispatcher aplikasi, dijalankan saat startup jika NOTIFICATION_DISPATCHER_ENABLED
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def start_notification_dispatcher(session_factory: sessionmaker) -> OutboxDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        sender = SMTPSender(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            sender=settings.NOTIFICATION_SENDER,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+        _dispatcher = OutboxDispatcher(
+            session_factory,
+            sender,
+            batch_size=settings.NOTIFICATION_BATCH_SIZE,
+            concurrency=settings.NOTIFICATION_CONCURRENCY,
+            max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+            retry_base_seconds=settings.NOTIFICATION_RETRY_BASE_SECONDS,
+            poll_interval_seconds=settings.NOTIFICATION_POLL_INTERVAL_SECONDS,
+            lease_seconds=settings.NOTIFICATION_LEASE_SECONDS,
+        )
+        _dispatcher.start()
+    return _dispatcher
+
+
+def stop_notification_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher = None
+
+
+def wake_notification_dispatcher(event=None) -> None:
+    """Subscriber event Approved: kirim notifikasi tanpa menunggu interval poll"""
+    if _dispatcher is not None:
+        _dispatcher.wake()
@@ -0,0 +1,303 @@
+"""
+Peringkat calon mahasiswa per program studi x jalur masuk
+
+Calon yang sedang mengikuti seleksi (pending dan punya skor) bersaing di
+setiap prodi pilihannya. Peringkat mengikuti urutan alokasi seleksi: skor
+tertinggi lebih dulu, skor sama diurutkan berdasarkan ID.
+
+Menghitung peringkat dengan ORDER BY + COUNT / OFFSET per request berarti
+scan seluruh pelamar prodi. Sebagai gantinya setiap (prodi, jalur) punya
+order-statistic tree (treap dengan ukuran subtree) di memori:
+
+- rank: O(log n), jumlah calon di depan dihitung dari ukuran subtree kiri
+- top-k: O(log n + k)
+- insert / remove saat skor, pilihan atau status berubah: O(log n)
+
+Index dibangun dari database saat pertama dipakai (atau lewat rebuild) dan
+dipelihara oleh subscriber event bus (SkorUpdated, approve / reject). Index
+bersifat per proses; rebuild menyelaraskan ulang dengan database.
+"""
+
+import random
+import threading
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa, PilihanProdi, StatusPendaftaran
+
+
+class _Node:
+    __slots__ = ("key", "priority", "left", "right", "size")
+
+    def __init__(self, key: tuple, priority: float):
+        self.key = key
+        self.priority = priority
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.size = 1
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node is not None else 0
+
+
+def _update(node: _Node) -> _Node:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node: Optional[_Node], key: tuple, inclusive: bool = False) -> tuple:
+    """Pisah treap menjadi (key < key, sisanya); inclusive: (key <= key, sisanya)"""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        left, right = _split(node.right, key, inclusive)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key, inclusive)
+    node.left = right
+    return left, _update(node)
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Gabung dua treap; semua key di left lebih kecil dari key di right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+class OrderStatisticTree:
+    """Himpunan key terurut (treap) dengan rank dan top-k O(log n)"""
+
+    def __init__(self, keys: Iterable[tuple] = (), rng: Optional[random.Random] = None):
+        self._random = (rng or random.Random()).random
+        self._root: Optional[_Node] = self._build(sorted(keys))
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def _build(self, keys: list) -> Optional[_Node]:
+        # Cartesian tree dari key terurut dengan prioritas acak: O(n), hasilnya
+        # sama dengan treap yang dibangun lewat insert satu per satu
+        stack: list = []
+        for key in keys:
+            node = _Node(key, self._random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+
+        # Ukuran subtree dihitung post-order (iteratif, tanpa batas rekursi)
+        order, pending = [], [root] if root is not None else []
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            pending.extend(child for child in (node.left, node.right) if child is not None)
+        for node in reversed(order):
+            _update(node)
+        return root
+
+    def insert(self, key: tuple) -> None:
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key, self._random())), right)
+
+    def remove(self, key: tuple) -> bool:
+        """Hapus key. Returns: False jika key tidak ada"""
+        left, rest = _split(self._root, key)
+        middle, right = _split(rest, key, inclusive=True)
+        self._root = _merge(left, right)
+        return middle is not None
+
+    def rank(self, key: tuple) -> Optional[int]:
+        """Posisi key (mulai 1), None jika key tidak ada"""
+        node, before = self._root, 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif node.key < key:
+                before += _size(node.left) + 1
+                node = node.right
+            else:
+                return before + _size(node.left) + 1
+        return None
+
+    def top(self, k: int) -> list:
+        """k key terkecil, terurut"""
+        result, stack, node = [], [], self._root
+        while len(result) < k and (stack or node is not None):
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            result.append(node.key)
+            node = node.right
+        return result
+
+
+def _rank_key(calon_id: int, skor: float) -> tuple:
+    # Urutan sama dengan seleksi.allocate: skor tertinggi, lalu ID terkecil
+    return (-skor, calon_id)
+
+
+class RankIndex:
+    """Order-statistic tree per (program_studi_id, jalur_masuk_id), thread-safe"""
+
+    def __init__(self):
+        self._trees: dict = {}
+        # calon_id -> (skor, jalur_masuk_id, pilihan)
+        self._entries: dict = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+
+    def reset(self) -> None:
+        """Kosongkan index; dibangun ulang dari database saat dipakai berikutnya"""
+        with self._lock:
+            self._trees = {}
+            self._entries = {}
+            self._loaded = False
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Bangun ulang index dari database (calon pending yang punya skor)
+
+        Returns:
+            Jumlah calon di index
+        """
+        calon = CalonMahasiswa.__table__
+        pilihan_prodi = PilihanProdi.__table__
+        pool_filter = (
+            calon.c.status == StatusPendaftaran.PENDING,
+            calon.c.skor.isnot(None),
+        )
+        with self._lock:
+            connection = db.connection()
+            calon_rows = connection.execute(
+                select(calon.c.id, calon.c.skor, calon.c.jalur_masuk_id, calon.c.program_studi_id)
+                .where(*pool_filter)
+            ).all()
+            pilihan_rows = connection.execute(
+                select(pilihan_prodi.c.calon_mahasiswa_id, pilihan_prodi.c.program_studi_id)
+                .join(calon, calon.c.id == pilihan_prodi.c.calon_mahasiswa_id)
+                .where(*pool_filter)
+                .order_by(pilihan_prodi.c.calon_mahasiswa_id, pilihan_prodi.c.urutan)
+            )
+            pilihan = {
+                calon_id: tuple(prodi for _, prodi in rows)
+                for calon_id, rows in groupby(pilihan_rows, key=itemgetter(0))
+            }
+
+            entries, keys = {}, {}
+            for calon_id, skor, jalur, prodi in calon_rows:
+                entry_pilihan = pilihan.get(calon_id) or (prodi,)
+                entries[calon_id] = (skor, jalur, entry_pilihan)
+                for program_studi_id in entry_pilihan:
+                    keys.setdefault((program_studi_id, jalur), []).append(_rank_key(calon_id, skor))
+
+            self._trees = {group: OrderStatisticTree(group_keys) for group, group_keys in keys.items()}
+            self._entries = entries
+            self._loaded = True
+            self.rebuilds += 1
+            return len(entries)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.rebuild(db)
+
+    def update(self, calon_id: int, skor: float, jalur_masuk_id: int, pilihan: tuple) -> None:
+        """Set skor dan pilihan prodi calon (insert atau pindah posisi)"""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(calon_id)
+            self._entries[calon_id] = (skor, jalur_masuk_id, tuple(pilihan))
+            for program_studi_id in pilihan:
+                tree = self._trees.get((program_studi_id, jalur_masuk_id))
+                if tree is None:
+                    tree = self._trees[(program_studi_id, jalur_masuk_id)] = OrderStatisticTree()
+                tree.insert(_rank_key(calon_id, skor))
+
+    def remove(self, calon_ids: Iterable[int]) -> None:
+        """Keluarkan calon dari peringkat (sudah tidak pending)"""
+        with self._lock:
+            if not self._loaded:
+                return
+            for calon_id in calon_ids:
+                self._remove(calon_id)
+
+    def _remove(self, calon_id: int) -> None:
+        entry = self._entries.pop(calon_id, None)
+        if entry is None:
+            return
+        skor, jalur_masuk_id, pilihan = entry
+        for program_studi_id in pilihan:
+            self._trees[(program_studi_id, jalur_masuk_id)].remove(_rank_key(calon_id, skor))
+
+    def rank(self, db: Session, calon_id: int) -> Optional[dict]:
+        """
+        Peringkat calon di setiap prodi pilihannya
+
+        Returns:
+            Dict skor, jalur_masuk_id dan peringkat (urutan, program_studi_id,
+            rank, total), atau None jika calon tidak sedang diseleksi
+        """
+        with self._lock:
+            self._ensure_loaded(db)
+            entry = self._entries.get(calon_id)
+            if entry is None:
+                return None
+            skor, jalur_masuk_id, pilihan = entry
+            peringkat = []
+            for urutan, program_studi_id in enumerate(pilihan, start=1):
+                tree = self._trees[(program_studi_id, jalur_masuk_id)]
+                peringkat.append({
+                    "urutan": urutan,
+                    "program_studi_id": program_studi_id,
+                    "rank": tree.rank(_rank_key(calon_id, skor)),
+                    "total": len(tree),
+                })
+            return {"skor": skor, "jalur_masuk_id": jalur_masuk_id, "peringkat": peringkat}
+
+    def top(self, db: Session, program_studi_id: int, jalur_masuk_id: int, k: int) -> tuple:
+        """
+        k calon teratas di satu prodi x jalur
+
+        Returns:
+            Tuple (total calon, list dict rank / calon_id / skor)
+        """
+        with self._lock:
+            self._ensure_loaded(db)
+            tree = self._trees.get((program_studi_id, jalur_masuk_id))
+            if tree is None:
+                return 0, []
+            items = [
+                {"rank": rank, "calon_id": calon_id, "skor": -negated_skor}
+                for rank, (negated_skor, calon_id) in enumerate(tree.top(k), start=1)
+            ]
+            return len(tree), items
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "calon": len(self._entries),
+                "groups": len(self._trees),
+                "rebuilds": self.rebuilds,
+            }
+
+
+rank_index = RankIndex()
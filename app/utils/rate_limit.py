@@ -0,0 +1,115 @@
+"""
+Token-bucket rate limiting per client
+
+In-process, tanpa akses database di hot path. Setiap route punya limiter
+sendiri (dikonfigurasi di Settings) dan setiap client punya bucket sendiri:
+API key yang terdaftar di RATE_LIMIT_API_KEYS, selain itu IP address. Header
+X-API-Key yang tidak terdaftar diabaikan, sehingga client tidak bisa mendapat
+bucket baru dengan mengirim key acak di setiap request. Jumlah bucket dibatasi (LRU) agar memori tetap terbatas.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+
+
+class TokenBucketLimiter:
+    """Token bucket per client key"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = 100_000):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list[float]]" = OrderedDict()  # key -> [tokens, last_refill]
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, client_key: str) -> float:
+        """
+        Ambil satu token untuk client
+
+        Returns:
+            0 jika request diizinkan, atau jumlah detik sampai token berikutnya tersedia
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client_key)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self._buckets[client_key] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0.0
+
+            self.limited += 1
+            return (1 - bucket[0]) / self.rate_per_second
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.allowed = self.limited = 0
+
+
+limiters = {
+    "register": TokenBucketLimiter(
+        settings.RATE_LIMIT_REGISTER_PER_MINUTE,
+        settings.RATE_LIMIT_REGISTER_BURST,
+        settings.RATE_LIMIT_MAX_CLIENTS,
+    ),
+    "status": TokenBucketLimiter(
+        settings.RATE_LIMIT_STATUS_PER_MINUTE,
+        settings.RATE_LIMIT_STATUS_BURST,
+        settings.RATE_LIMIT_MAX_CLIENTS,
+    ),
+}
+
+
+def client_key(request: Request) -> str:
+    """Identitas client: API key jika terdaftar, selain itu IP address"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key and api_key in settings.RATE_LIMIT_API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(route: str):
+    """
+    Dependency FastAPI untuk rate limiting per route
+
+    Example:
+        @router.post("/register", dependencies=[Depends(rate_limit("register"))])
+    """
+    # async: cek hanya memegang lock sebentar, tidak perlu pindah ke threadpool
+    async def dependency(request: Request) -> None:
+        limiter = limiters[route]
+        if not settings.RATE_LIMIT_ENABLED or limiter.rate_per_second <= 0:
+            return
+        retry_after = limiter.acquire(client_key(request))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Terlalu banyak request. Coba lagi nanti.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    return dependency
+
+
+def reset_rate_limits() -> None:
+    """Reset semua bucket (dipakai saat testing)"""
+    for limiter in limiters.values():
+        limiter.reset()
@@ -0,0 +1,196 @@
+"""
+Rollup time-series registrasi
+
+Setiap event (registrasi baru = pending, approved, rejected) menambah counter
+di tabel registration_rollup untuk bucket jam-nya, dalam transaksi yang sama
+dengan perubahan data calon. Query time-series hanya membaca baris rollup
+(jumlahnya ~ jam x status x prodi x jalur), tidak pernah calon_mahasiswa.
+
+Database yang dibuat sebelum fitur rollup (atau rollup yang perlu dikoreksi)
+diisi ulang dari calon_mahasiswa lewat rebuild_rollups; ensure_rollups
+menjalankannya saat startup jika tabel rollup masih kosong.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa, RegistrationRollup, StatusPendaftaran
+
+GRANULARITIES = ("hour", "day")
+
+
+def hour_bucket(at: datetime) -> datetime:
+    """Awal jam dari timestamp"""
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_bucket(at: datetime, granularity: str) -> datetime:
+    """Awal bucket (jam atau hari) dari timestamp"""
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return hour_bucket(at)
+
+
+def record_rollup(
+    db: Session,
+    status: StatusPendaftaran,
+    program_studi_id: int,
+    jalur_masuk_id: int,
+    at: Optional[datetime] = None,
+    count: int = 1,
+) -> None:
+    """
+    Tambah counter rollup (upsert) di transaksi session yang sedang berjalan
+
+    Args:
+        status: Status baru calon (pending untuk registrasi)
+        at: Waktu event, default sekarang (UTC)
+        count: Jumlah event yang ditambahkan
+    """
+    values = dict(
+        bucket_start=hour_bucket(at or datetime.utcnow()),
+        status=status,
+        program_studi_id=program_studi_id,
+        jalur_masuk_id=jalur_masuk_id,
+        count=count,
+    )
+    statement = sqlite_insert(RegistrationRollup).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["bucket_start", "status", "program_studi_id", "jalur_masuk_id"],
+        set_={"count": RegistrationRollup.count + statement.excluded.count},
+    )
+    db.execute(statement)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Hitung ulang seluruh rollup dari tabel calon_mahasiswa (backfill / koreksi)
+
+    Registrasi dihitung di jam created_at. Calon approved / rejected juga
+    dihitung di jam updated_at dengan status akhirnya; riwayat perubahan status
+    di antaranya tidak tersimpan sehingga tidak bisa direkonstruksi.
+
+    Returns:
+        Jumlah baris rollup
+    """
+    registered_at = func.strftime("%Y-%m-%d %H:00:00", CalonMahasiswa.created_at)
+    decided_at = func.strftime(
+        "%Y-%m-%d %H:00:00", func.coalesce(CalonMahasiswa.updated_at, CalonMahasiswa.created_at)
+    )
+    dimensions = (CalonMahasiswa.program_studi_id, CalonMahasiswa.jalur_masuk_id)
+
+    registrations = db.query(
+        registered_at, *dimensions, func.count(CalonMahasiswa.id)
+    ).group_by(registered_at, *dimensions).all()
+    decisions = db.query(
+        decided_at, CalonMahasiswa.status, *dimensions, func.count(CalonMahasiswa.id)
+    ).filter(
+        CalonMahasiswa.status.in_([StatusPendaftaran.APPROVED, StatusPendaftaran.REJECTED])
+    ).group_by(decided_at, CalonMahasiswa.status, *dimensions).all()
+    rows = [
+        (bucket, StatusPendaftaran.PENDING, program_studi_id, jalur_masuk_id, count)
+        for bucket, program_studi_id, jalur_masuk_id, count in registrations
+    ] + decisions
+
+    db.query(RegistrationRollup).delete()
+    if rows:
+        db.execute(insert(RegistrationRollup), [
+            {
+                "bucket_start": datetime.strptime(bucket, "%Y-%m-%d %H:%M:%S"),
+                "status": status,
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": jalur_masuk_id,
+                "count": count,
+            }
+            for bucket, status, program_studi_id, jalur_masuk_id, count in rows
+        ])
+    db.commit()
+    return len(rows)
+
+
+def ensure_rollups(engine) -> int:
+    """
+    Isi tabel rollup dari calon_mahasiswa jika masih kosong (database lama)
+
+    Returns:
+        Jumlah baris rollup yang dibuat, 0 jika rollup sudah terisi
+    """
+    db = Session(bind=engine)
+    try:
+        if db.query(RegistrationRollup.id).first() is not None:
+            return 0
+        if db.query(CalonMahasiswa.id).first() is None:
+            return 0
+        return rebuild_rollups(db)
+    finally:
+        db.close()
+
+
+def query_timeseries(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    status: Optional[StatusPendaftaran] = None,
+    program_studi_id: Optional[int] = None,
+    jalur_masuk_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> list:
+    """
+    Ambil jumlah event per bucket dalam range [start, end)
+
+    Bucket harian dihitung dari baris rollup per jam. Bucket yang belum
+    selesai (masih berjalan saat ini) atau hanya sebagian berada di dalam
+    range ditandai partial=True: count-nya belum final dan tidak boleh
+    dibandingkan langsung dengan bucket penuh.
+
+    Returns:
+        List dict (bucket, status, program_studi_id, jalur_masuk_id, count, partial) terurut per bucket
+    """
+    upper = min(end, now or datetime.utcnow())
+    step = timedelta(days=1) if granularity == "day" else timedelta(hours=1)
+    query = db.query(
+        RegistrationRollup.bucket_start,
+        RegistrationRollup.status,
+        RegistrationRollup.program_studi_id,
+        RegistrationRollup.jalur_masuk_id,
+        RegistrationRollup.count,
+    ).filter(
+        RegistrationRollup.bucket_start >= hour_bucket(start),
+        RegistrationRollup.bucket_start < end,
+    )
+    if status is not None:
+        query = query.filter(RegistrationRollup.status == status)
+    if program_studi_id is not None:
+        query = query.filter(RegistrationRollup.program_studi_id == program_studi_id)
+    if jalur_masuk_id is not None:
+        query = query.filter(RegistrationRollup.jalur_masuk_id == jalur_masuk_id)
+
+    counts = defaultdict(int)
+    for bucket_start, row_status, prodi_id, jalur_id, count in query:
+        counts[(truncate_bucket(bucket_start, granularity), row_status.value, prodi_id, jalur_id)] += count
+
+    return [
+        {
+            "bucket": bucket,
+            "status": row_status,
+            "program_studi_id": prodi_id,
+            "jalur_masuk_id": jalur_id,
+            "count": count,
+            "partial": bucket < start or bucket + step > upper,
+        }
+        for (bucket, row_status, prodi_id, jalur_id), count in sorted(counts.items())
+    ]
+
+
+def default_range(granularity: str, now: Optional[datetime] = None) -> tuple:
+    """Range default: 24 jam terakhir (hour) atau 30 hari terakhir (day)"""
+    now = now or datetime.utcnow()
+    end = truncate_bucket(now, granularity) + (timedelta(days=1) if granularity == "day" else timedelta(hours=1))
+    start = end - (timedelta(days=30) if granularity == "day" else timedelta(hours=24))
+    return start, end
@@ -0,0 +1,81 @@
+"""
+Full-text search calon mahasiswa (SQLite FTS5)
+
+Index dibuat oleh DDL di app/models/calon_mahasiswa.py dan disinkronkan
+oleh trigger. Modul ini menyediakan:
+- ensure_search_index: membuat index pada database lama + rebuild isinya
+- build_match_query: mengubah input user menjadi query FTS5 yang aman
+- search_calon_mahasiswa: query ranked (bm25) + pagination
+"""
+
+import re
+
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, literal_column, text
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa
+from app.models.calon_mahasiswa import SEARCH_INDEX_DDL
+
+# Bobot bm25 per kolom: nama_lengkap, alamat, email
+BM25_WEIGHTS = (10.0, 2.0, 5.0)
+
+# Tabel FTS hanya dideklarasikan untuk query, tidak ikut Base.metadata.create_all
+search_index = Table(
+    "calon_mahasiswa_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_index(engine) -> None:
+    """
+    Buat index FTS5 jika belum ada (mis. database dibuat sebelum fitur search)
+    dan isi ulang dari tabel calon_mahasiswa
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        if inspect(connection).has_table("calon_mahasiswa_fts"):
+            return
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO calon_mahasiswa_fts(calon_mahasiswa_fts) VALUES ('rebuild')"))
+
+
+def build_match_query(q: str) -> str:
+    """
+    Ubah input bebas menjadi query FTS5: setiap kata di-quote (tidak ada
+    operator FTS yang bisa disisipkan) dan dicari sebagai prefix
+
+    Example:
+        'Ahm hidaya' -> '"ahm"* "hidaya"*'
+    """
+    tokens = _TOKEN_PATTERN.findall(q.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_calon_mahasiswa(db: Session, q: str, skip: int = 0, limit: int = 20) -> list:
+    """
+    Cari calon mahasiswa berdasarkan nama, alamat atau email
+
+    Returns:
+        List tuple (CalonMahasiswa, score); score bm25 semakin kecil semakin relevan
+    """
+    match_query = build_match_query(q)
+    if not match_query:
+        return []
+
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    score = literal_column(f"bm25(calon_mahasiswa_fts, {weights})")
+    return (
+        db.query(CalonMahasiswa, score)
+        .join(search_index, search_index.c.rowid == CalonMahasiswa.id)
+        .filter(text("calon_mahasiswa_fts MATCH :match_query"))
+        .params(match_query=match_query)
+        .order_by(score, CalonMahasiswa.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
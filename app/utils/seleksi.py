@@ -0,0 +1,292 @@
+"""
+Seleksi berbasis skor dengan beberapa pilihan program studi
+
+Setiap calon (pending, punya skor) memilih beberapa prodi terurut prioritas
+(tabel pilihan_prodi; tanpa pilihan = prodi saat mendaftar). Kapasitas per
+prodi adalah sisa kuota prodi x jalur (kuota_prodi); prodi tanpa kuota di
+jalur ini tidak menerima calon lewat seleksi.
+
+Alokasi memakai deferred acceptance (Gale-Shapley, calon yang melamar).
+Karena semua prodi mengurutkan calon dengan skor yang sama, hasilnya adalah
+matching stabil yang unik dan identik dengan serial dictatorship: proses
+calon dari skor tertinggi dan tempatkan di pilihan teratas yang masih punya
+kursi. Tidak ada calon yang lebih memilih prodi lain yang menerima calon
+berskor lebih rendah. Kompleksitas O(n log n + n x jumlah pilihan), sehingga
+pool 200 ribu calon dialokasikan dalam hitungan detik.
+
+Prodi hasil disimpan di program_studi_diterima_id; program_studi_id tetap
+prodi saat mendaftar sehingga status, rollup dan stats cube (yang dikelompokkan
+per prodi daftar) tetap menunjukkan prodi yang dilamar. Kuota dipakai di prodi
+tempat calon diterima.
+
+Pool dibaca dan alokasi dihitung tanpa lock tulis, sehingga register /
+approve / reject tetap berjalan selama alokasi. Baru setelah itu transaksi
+tulis dimulai (lock SQLite); di dalamnya kuota dan pool (status pending,
+skor, pilihan) dibaca ulang. Jika sama dengan yang dialokasikan, hasil
+langsung diterapkan; jika berubah, alokasi diulang. Setelah
+OPTIMISTIC_ATTEMPTS kali berubah, alokasi terakhir dihitung sambil memegang
+lock agar seleksi tetap selesai.
+
+Hasil ditulis sekaligus dalam satu transaksi: UPDATE executemany per calon
+(prodi diterima dan NIM dari blok NIM per prodi, ditandai change_seq seleksi),
+lalu satu UPDATE set-based untuk status dan timestamp, kuota, rollup, stats
+cube dan outbox notifikasi, lalu satu event BulkApproved. Pool dibaca dan
+ditulis lewat Core (bukan objek ORM) karena jumlah barisnya ratusan ribu.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.events import event_bus, BulkApproved
+from app.models import (
+    CalonMahasiswa,
+    KuotaProdi,
+    NotificationOutbox,
+    PilihanProdi,
+    ProgramStudi,
+    StatusPendaftaran,
+    next_change_seq,
+)
+from app.utils.kuota import claim_seats
+from app.utils.outbox import approval_notification_values
+from app.utils.rollups import record_rollup
+from app.utils.stats_cube import record_cube_counts
+
+
+# Percobaan alokasi tanpa lock sebelum alokasi dihitung di dalam transaksi tulis
+OPTIMISTIC_ATTEMPTS = 3
+
+
+class Pelamar(NamedTuple):
+    """Calon dalam pool seleksi (tuple: dibuat ratusan ribu kali per seleksi)"""
+    id: int
+    skor: float
+    pilihan: tuple  # program_studi_id terurut prioritas
+
+
+def allocate(pelamar: Iterable[Pelamar], kapasitas: dict) -> dict:
+    """
+    Alokasikan calon ke prodi (matching stabil dengan prioritas skor)
+
+    Skor sama diurutkan berdasarkan ID (mendaftar lebih dulu menang).
+
+    Args:
+        pelamar: Calon beserta pilihan prodi-nya
+        kapasitas: program_studi_id -> jumlah kursi
+
+    Returns:
+        Dict calon_id -> (program_studi_id, urutan pilihan mulai 1); calon
+        yang tidak mendapat kursi tidak ada di dict
+    """
+    sisa = dict(kapasitas)
+    hasil = {}
+    for calon in sorted(pelamar, key=lambda p: (-p.skor, p.id)):
+        for urutan, prodi in enumerate(calon.pilihan, start=1):
+            if sisa.get(prodi, 0) > 0:
+                sisa[prodi] -= 1
+                hasil[calon.id] = (prodi, urutan)
+                break
+    return hasil
+
+
+def _load_pool(db: Session, jalur_masuk_id: int) -> tuple:
+    calon = CalonMahasiswa.__table__
+    pilihan_prodi = PilihanProdi.__table__
+    pool_filter = (
+        calon.c.jalur_masuk_id == jalur_masuk_id,
+        calon.c.status == StatusPendaftaran.PENDING,
+        calon.c.skor.isnot(None),
+    )
+    connection = db.connection()
+    calon_rows = connection.execute(
+        select(
+            calon.c.id,
+            calon.c.skor,
+            calon.c.program_studi_id,
+            calon.c.created_at,
+            calon.c.nama_lengkap,
+            calon.c.email,
+        ).where(*pool_filter).order_by(calon.c.id)
+    ).all()
+
+    pilihan_rows = connection.execute(
+        select(pilihan_prodi.c.calon_mahasiswa_id, pilihan_prodi.c.program_studi_id)
+        .join(calon, calon.c.id == pilihan_prodi.c.calon_mahasiswa_id)
+        .where(*pool_filter)
+        .order_by(pilihan_prodi.c.calon_mahasiswa_id, pilihan_prodi.c.urutan)
+    )
+    pilihan = {
+        calon_id: tuple(prodi for _, prodi in rows)
+        for calon_id, rows in groupby(pilihan_rows, key=itemgetter(0))
+    }
+
+    pelamar = [
+        Pelamar(row.id, row.skor, pilihan.get(row.id) or (row.program_studi_id,))
+        for row in calon_rows
+    ]
+    return pelamar, {row.id: row for row in calon_rows}
+
+
+def _snapshot(db: Session, jalur_masuk_id: int) -> tuple:
+    """Sisa kuota per prodi dan pool pelamar jalur ini: (kapasitas, pelamar, rows)"""
+    kapasitas = {
+        program_studi_id: max(kapasitas - terisi, 0)
+        for program_studi_id, kapasitas, terisi in db.query(
+            KuotaProdi.program_studi_id, KuotaProdi.kapasitas, KuotaProdi.terisi
+        ).filter(KuotaProdi.jalur_masuk_id == jalur_masuk_id)
+    }
+    pelamar, rows = _load_pool(db, jalur_masuk_id)
+    return kapasitas, pelamar, rows
+
+
+def _nim_blocks(db: Session, hasil_per_prodi: dict, tahun: int) -> dict:
+    """Blok NIM berurutan per prodi: satu COUNT per prodi, bukan per calon"""
+    kode = dict(db.query(ProgramStudi.id, ProgramStudi.kode).filter(
+        ProgramStudi.id.in_(hasil_per_prodi)
+    ))
+    nims = {}
+    for prodi, calon_ids in hasil_per_prodi.items():
+        prefix = f"{tahun}{kode[prodi]}"
+        existing = db.query(func.count(CalonMahasiswa.id)).filter(
+            CalonMahasiswa.nim.like(f"{prefix}%")
+        ).scalar()
+        for offset, calon_id in enumerate(calon_ids, start=existing + 1):
+            nims[calon_id] = f"{prefix}-{offset:04d}"
+    return nims
+
+
+def run_seleksi(
+    db: Session,
+    jalur_masuk_id: int,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Jalankan seleksi satu jalur masuk dan terapkan hasilnya sebagai approve massal
+
+    Args:
+        jalur_masuk_id: Jalur yang diseleksi (mis. SNBT, Mandiri)
+        dry_run: Hanya hitung alokasi tanpa mengubah data
+        progress: Callback (done, total) per tahap
+
+    Returns:
+        Ringkasan: jumlah pelamar, diterima, tidak_diterima, per prodi dan per
+        urutan pilihan
+    """
+    report = progress or (lambda done, total: None)
+
+    for _ in range(OPTIMISTIC_ATTEMPTS):
+        # Baca dan alokasikan tanpa lock tulis
+        kapasitas, pelamar, rows = _snapshot(db, jalur_masuk_id)
+        db.rollback()
+        report(1, 3)
+        hasil = allocate(pelamar, kapasitas)
+        report(2, 3)
+        if dry_run or not hasil:
+            break
+        # Mulai transaksi tulis (lock SQLite): pool, kuota dan nomor NIM tidak
+        # berubah oleh writer lain sampai hasil di-commit
+        change_seq = next_change_seq(db)
+        current = _snapshot(db, jalur_masuk_id)
+        if current[:2] == (kapasitas, pelamar):
+            rows = current[2]
+            break
+        # Pool atau kuota berubah selama alokasi: ulangi dengan data terbaru
+        db.rollback()
+    else:
+        change_seq = next_change_seq(db)
+        kapasitas, pelamar, rows = _snapshot(db, jalur_masuk_id)
+        hasil = allocate(pelamar, kapasitas)
+
+    per_prodi = Counter(prodi for prodi, _ in hasil.values())
+    summary = {
+        "jalur_masuk_id": jalur_masuk_id,
+        "dry_run": dry_run,
+        "pelamar": len(pelamar),
+        "diterima": len(hasil),
+        "tidak_diterima": len(pelamar) - len(hasil),
+        "per_prodi": {str(prodi): count for prodi, count in sorted(per_prodi.items())},
+        "per_pilihan": {str(urutan): count for urutan, count in sorted(Counter(u for _, u in hasil.values()).items())},
+    }
+    if dry_run or not hasil:
+        db.rollback()
+        report(3, 3)
+        return summary
+
+    # Urutan NIM dalam prodi mengikuti peringkat skor
+    ranked = sorted(hasil, key=lambda calon_id: (-rows[calon_id].skor, calon_id))
+    hasil_per_prodi = defaultdict(list)
+    for calon_id in ranked:
+        hasil_per_prodi[hasil[calon_id][0]].append(calon_id)
+    nims = _nim_blocks(db, hasil_per_prodi, datetime.now().year)
+
+    now = datetime.utcnow()
+    table = CalonMahasiswa.__table__
+    connection = db.connection()
+    # Bagian per calon hanya prodi diterima dan NIM; baris hasil ditandai change_seq
+    # seleksi ini lalu status/timestamp di-set dengan satu UPDATE set-based
+    connection.execute(
+        table.update().where(
+            table.c.id == bindparam("b_id"),
+            table.c.status == StatusPendaftaran.PENDING,
+        ).values(
+            program_studi_diterima_id=bindparam("b_prodi"),
+            nim=bindparam("b_nim"),
+            change_seq=change_seq,
+        ),
+        [{"b_id": calon_id, "b_prodi": hasil[calon_id][0], "b_nim": nims[calon_id]} for calon_id in ranked]
+    )
+    approved = connection.execute(
+        update(table).where(
+            table.c.change_seq == change_seq,
+            table.c.status == StatusPendaftaran.PENDING,
+        ).values(
+            status=StatusPendaftaran.APPROVED,
+            approved_at=now,
+            updated_at=now,
+        )
+    ).rowcount
+    if approved != len(ranked):
+        db.rollback()
+        raise ValueError(f"Seleksi dibatalkan: {len(ranked) - approved} calon tidak lagi pending")
+
+    for prodi, count in per_prodi.items():
+        claim_seats(db, prodi, jalur_masuk_id, count)
+
+    # Rollup dan cube per prodi daftar (sama seperti approve satu per satu)
+    registered = Counter(
+        (rows[calon_id].program_studi_id, rows[calon_id].created_at.year) for calon_id in hasil
+    )
+    rollup = Counter()
+    cube = Counter()
+    for (prodi, tahun), count in registered.items():
+        rollup[prodi] += count
+        cube[(StatusPendaftaran.PENDING, prodi, jalur_masuk_id, tahun)] -= count
+        cube[(StatusPendaftaran.APPROVED, prodi, jalur_masuk_id, tahun)] += count
+    for prodi, count in rollup.items():
+        record_rollup(db, StatusPendaftaran.APPROVED, prodi, jalur_masuk_id, at=now, count=count)
+    record_cube_counts(db, cube)
+
+    nama = dict(db.query(ProgramStudi.id, ProgramStudi.nama).filter(ProgramStudi.id.in_(per_prodi)))
+    connection.execute(insert(NotificationOutbox.__table__), [
+        approval_notification_values(
+            calon_id, rows[calon_id].email, rows[calon_id].nama_lengkap, nama[hasil[calon_id][0]], nims[calon_id]
+        )
+        for calon_id in ranked
+    ])
+    db.commit()
+    # Objek calon yang sudah ada di session tidak lagi sesuai database
+    db.expire_all()
+    report(3, 3)
+
+    event_bus.publish(BulkApproved(
+        calon_ids=tuple(ranked),
+        program_studi_ids=tuple({prodi for prodi, _ in registered})
+    ))
+    return summary
@@ -0,0 +1,110 @@
+"""
+Single-flight request coalescing
+
+Request identik yang datang bersamaan berbagi satu komputasi yang sedang
+berjalan (in-flight) dan hasilnya. Hanya request pertama (leader) yang
+benar-benar memulai fungsi (sebagai task terpisah); semua request, termasuk
+leader, menunggu task yang sama lewat asyncio.shield sehingga pembatalan satu
+request tidak membatalkan komputasi untuk yang lain.
+
+Dipakai untuk endpoint baca yang mahal seperti /api/pmb/stats.
+Asumsi: semua caller berjalan di event loop yang sama (satu worker uvicorn).
+"""
+
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+
+class SingleFlight:
+    """Grup single-flight: satu komputasi in-flight per key"""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Jalankan fn() untuk key, atau tunggu hasil komputasi yang sedang berjalan
+
+        Args:
+            key: Key yang mengidentifikasi request identik
+            fn: Coroutine factory yang dieksekusi oleh leader
+
+        Returns:
+            Hasil fn() (sama persis untuk semua caller yang di-coalesce)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # Komputasi berjalan sebagai task sendiri: jika client leader putus
+            # (request di-cancel) follower tetap mendapat hasilnya
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(functools.partial(self._done, key))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Hindari warning "exception was never retrieved" jika semua caller sudah pergi
+            task.exception()
+
+    def stats(self) -> dict:
+        """Metrics jumlah eksekusi dan request yang di-coalesce"""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+
+def singleflight(
+    key_func: Optional[Callable[..., Hashable]] = None,
+    exclude: Iterable[str] = ("db",),
+    group: Optional[SingleFlight] = None,
+):
+    """
+    Decorator single-flight untuk fungsi async (termasuk endpoint FastAPI)
+
+    Args:
+        key_func: Fungsi (args yang sama dengan fungsi asli) -> key. Default:
+            nama fungsi + semua argumen kecuali yang ada di exclude
+        exclude: Nama argumen yang tidak ikut key (mis. session database)
+        group: SingleFlight yang dipakai; default satu grup per fungsi
+
+    Example:
+        @router.get("/stats")
+        @singleflight()
+        async def get_stats(db: Session = Depends(get_db)): ...
+    """
+    excluded = frozenset(exclude)
+
+    def decorator(func):
+        flight = group or SingleFlight()
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> Hashable:
+            if key_func is not None:
+                return key_func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(
+                (name, value) for name, value in bound.arguments.items()
+                if name not in excluded
+            )
+            return (func.__qualname__, params)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(make_key(args, kwargs), lambda: func(*args, **kwargs))
+
+        wrapper.singleflight = flight
+        return wrapper
+
+    return decorator
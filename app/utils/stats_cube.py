@@ -0,0 +1,319 @@
+"""
+Cube statistik multi-dimensi
+
+Tabel stats_cube menyimpan jumlah calon per status x program studi x jalur
+masuk x tahun pendaftaran dan di-update di transaksi yang sama dengan setiap
+perubahan status. Fakultas diturunkan dari program studi.
+
+Cube yang kecil (status x prodi x jalur x tahun baris) dimuat ke memori,
+lalu setiap slice / roll-up dijawab di Python tanpa GROUP BY atas tabel
+calon_mahasiswa. Database lama yang belum punya isi stats_cube diisi
+dengan rebuild saat startup (ensure_stats_cube).
+
+Cube in-memory (di response cache) tidak di-invalidate setiap perubahan
+status. Perubahan sel yang dicatat di sebuah session ditambahkan ke cube
+setelah session itu commit (dibuang jika rollback), sehingga cube hanya
+dimuat ulang setelah rebuild, TTL habis, atau ada prodi / jalur baru.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from typing import Optional
+
+from sqlalchemy import event, extract, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import CalonMahasiswa, JalurMasuk, ProgramStudi, StatsCubeCell, StatusPendaftaran
+from app.utils.cache import response_cache, STATS_CUBE_KEY, STATS_CUBE_TAG
+
+CUBE_DIMENSIONS = ("status", "program_studi", "fakultas", "jalur_masuk", "tahun")
+
+_CELL_KEY = ["status", "program_studi_id", "jalur_masuk_id", "tahun"]
+
+
+def _add_to_cell(
+    db: Session,
+    status: StatusPendaftaran,
+    program_studi_id: int,
+    jalur_masuk_id: int,
+    tahun: int,
+    count: int,
+) -> None:
+    statement = sqlite_insert(StatsCubeCell).values(
+        status=status,
+        program_studi_id=program_studi_id,
+        jalur_masuk_id=jalur_masuk_id,
+        tahun=tahun,
+        count=count,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=_CELL_KEY,
+        set_={"count": StatsCubeCell.count + statement.excluded.count},
+    )
+    db.execute(statement)
+    cached_cube.track(db, {(status, program_studi_id, jalur_masuk_id, tahun): count})
+
+
+def record_cube_transition(
+    db: Session,
+    program_studi_id: int,
+    jalur_masuk_id: int,
+    tahun: int,
+    old_status: Optional[StatusPendaftaran],
+    new_status: StatusPendaftaran,
+    count: int = 1,
+) -> None:
+    """
+    Pindahkan calon antar sel cube di transaksi session yang sedang berjalan
+
+    Args:
+        tahun: Tahun pendaftaran calon (created_at)
+        old_status: Status sebelumnya, None untuk registrasi baru
+        new_status: Status baru
+        count: Jumlah calon yang berpindah
+    """
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        _add_to_cell(db, old_status, program_studi_id, jalur_masuk_id, tahun, -count)
+    _add_to_cell(db, new_status, program_studi_id, jalur_masuk_id, tahun, count)
+
+
+def record_cube_counts(db: Session, deltas: dict) -> None:
+    """
+    Tambahkan banyak perubahan sel cube sekaligus (satu upsert executemany)
+
+    Dipakai perubahan massal (hasil seleksi) yang memindahkan calon ke banyak
+    sel; perubahan dijumlahkan per sel lebih dulu oleh caller.
+
+    Args:
+        deltas: (status, program_studi_id, jalur_masuk_id, tahun) -> perubahan count
+    """
+    rows = [
+        dict(status=status, program_studi_id=prodi, jalur_masuk_id=jalur, tahun=tahun, count=count)
+        for (status, prodi, jalur, tahun), count in deltas.items()
+        if count
+    ]
+    if not rows:
+        return
+    table = StatsCubeCell.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=_CELL_KEY,
+        set_={"count": table.c.count + statement.excluded.count},
+    )
+    db.connection().execute(statement, rows)
+    cached_cube.track(db, deltas)
+
+
+def rebuild_stats_cube(db: Session) -> int:
+    """
+    Hitung ulang seluruh cube dari tabel calon_mahasiswa (backfill / koreksi)
+
+    Satu-satunya tempat cube dihitung dengan GROUP BY; dijalankan sebagai
+    operasi admin, bukan di jalur request.
+
+    Returns:
+        Jumlah sel cube
+    """
+    tahun = extract("year", CalonMahasiswa.created_at)
+    rows = db.query(
+        CalonMahasiswa.status,
+        CalonMahasiswa.program_studi_id,
+        CalonMahasiswa.jalur_masuk_id,
+        tahun,
+        func.count(CalonMahasiswa.id),
+    ).group_by(
+        CalonMahasiswa.status,
+        CalonMahasiswa.program_studi_id,
+        CalonMahasiswa.jalur_masuk_id,
+        tahun,
+    ).all()
+
+    db.query(StatsCubeCell).delete()
+    db.add_all([
+        StatsCubeCell(
+            status=status,
+            program_studi_id=program_studi_id,
+            jalur_masuk_id=jalur_masuk_id,
+            tahun=int(row_tahun),
+            count=count,
+        )
+        for status, program_studi_id, jalur_masuk_id, row_tahun, count in rows
+    ])
+    db.commit()
+    return len(rows)
+
+
+def ensure_stats_cube(engine) -> int:
+    """
+    Isi tabel stats_cube dari calon_mahasiswa jika masih kosong (database lama)
+
+    Returns:
+        Jumlah sel cube yang dibuat, 0 jika cube sudah terisi
+    """
+    db = Session(bind=engine)
+    try:
+        if db.query(StatsCubeCell.id).first() is not None:
+            return 0
+        if db.query(CalonMahasiswa.id).first() is None:
+            return 0
+        return rebuild_stats_cube(db)
+    finally:
+        db.close()
+
+
+class StatsCube:
+    """Cube statistik in-memory yang bisa di-slice dan di-roll-up"""
+
+    def __init__(self, counts: dict, program_studi: dict, jalur_masuk: dict):
+        # counts: (status, program_studi_id, jalur_masuk_id, tahun) -> count
+        self.counts = counts
+        # program_studi: id -> (kode, fakultas); jalur_masuk: id -> kode
+        self.program_studi = program_studi
+        self.jalur_masuk = jalur_masuk
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db: Session) -> "StatsCube":
+        """Muat semua sel cube beserta atribut prodi (kode, fakultas) dan jalur (kode)"""
+        program_studi = {
+            prodi_id: (kode, fakultas)
+            for prodi_id, kode, fakultas in db.query(ProgramStudi.id, ProgramStudi.kode, ProgramStudi.fakultas)
+        }
+        jalur_masuk = dict(db.query(JalurMasuk.id, JalurMasuk.kode).all())
+        rows = db.query(
+            StatsCubeCell.status,
+            StatsCubeCell.program_studi_id,
+            StatsCubeCell.jalur_masuk_id,
+            StatsCubeCell.tahun,
+            StatsCubeCell.count,
+        ).filter(StatsCubeCell.count != 0).all()
+
+        counts = {
+            (status, prodi_id, jalur_id, tahun): count
+            for status, prodi_id, jalur_id, tahun, count in rows
+            if prodi_id in program_studi and jalur_id in jalur_masuk
+        }
+        return cls(counts, program_studi, jalur_masuk)
+
+    def apply(self, deltas: dict) -> bool:
+        """
+        Tambahkan perubahan sel yang sudah ter-commit
+
+        Returns:
+            False jika ada prodi / jalur yang belum dikenal cube (cube harus dimuat ulang)
+        """
+        with self._lock:
+            if any(
+                prodi_id not in self.program_studi or jalur_id not in self.jalur_masuk
+                for _, prodi_id, jalur_id, _ in deltas
+            ):
+                return False
+            for key, count in deltas.items():
+                total = self.counts.get(key, 0) + count
+                if total:
+                    self.counts[key] = total
+                else:
+                    self.counts.pop(key, None)
+            return True
+
+    def slice(self, filters: dict, group_by: list) -> list:
+        """
+        Filter sel cube lalu roll-up ke dimensi group_by
+
+        Args:
+            filters: {dimensi: nilai}, dimensi yang tidak ada tidak difilter
+            group_by: Dimensi yang dipertahankan di hasil
+
+        Returns:
+            List dict berisi nilai dimensi group_by dan count, terurut
+        """
+        with self._lock:
+            cells = list(self.counts.items())
+
+        totals = defaultdict(int)
+        for (status, prodi_id, jalur_id, tahun), count in cells:
+            prodi_kode, fakultas = self.program_studi[prodi_id]
+            coordinate = {
+                "status": status.value,
+                "program_studi": prodi_kode,
+                "fakultas": fakultas,
+                "jalur_masuk": self.jalur_masuk[jalur_id],
+                "tahun": tahun,
+            }
+            if any(coordinate[dimension] != value for dimension, value in filters.items()):
+                continue
+            totals[tuple(coordinate[dimension] for dimension in group_by)] += count
+
+        return [
+            {**dict(zip(group_by, key)), "count": count}
+            for key, count in sorted(totals.items(), key=lambda item: tuple(str(v) for v in item[0]))
+            if count
+        ]
+
+
+# Key Session.info untuk perubahan sel cube di transaksi yang belum selesai
+_SESSION_DELTAS = "stats_cube_deltas"
+
+
+class CachedStatsCube:
+    """
+    Cube di response cache yang diikutkan perubahan setiap transaksi yang commit
+
+    Cube yang dimuat saat ada transaksi penulis cube berjalan (atau yang
+    commit selama pemuatan) tidak disimpan: perubahan transaksi itu bisa
+    terhitung dua kali atau terlewat. Cube seperti itu hanya dipakai untuk
+    request yang memuatnya.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._generation = 0
+
+    def get(self, db: Session) -> StatsCube:
+        """Cube dari cache, dimuat dari tabel stats_cube jika belum ada"""
+        cube = response_cache.get(STATS_CUBE_KEY)
+        if cube is not None:
+            return cube
+        with self._lock:
+            quiet = self._in_flight == 0
+            generation = self._generation
+        cube = StatsCube.load(db)
+        with self._lock:
+            if quiet and generation == self._generation:
+                response_cache.set(STATS_CUBE_KEY, cube, tags=[STATS_CUBE_TAG])
+        return cube
+
+    def track(self, db: Session, deltas: dict) -> None:
+        """Catat perubahan sel di transaksi session; diterapkan ke cube setelah commit"""
+        pending = db.info.get(_SESSION_DELTAS)
+        if pending is None:
+            pending = db.info[_SESSION_DELTAS] = Counter()
+            with self._lock:
+                self._in_flight += 1
+                self._generation += 1
+        pending.update(deltas)
+
+    def _after_commit(self, session: Session) -> None:
+        deltas = session.info.get(_SESSION_DELTAS)
+        if not deltas:
+            return
+        with self._lock:
+            self._generation += 1
+            cube = response_cache.peek(STATS_CUBE_KEY)
+            if cube is not None and not cube.apply(deltas):
+                response_cache.invalidate_tags(STATS_CUBE_TAG)
+
+    def _after_transaction_end(self, session: Session, transaction) -> None:
+        # Commit, rollback maupun close: perubahan yang belum diterapkan dibuang
+        if transaction.parent is None and session.info.pop(_SESSION_DELTAS, None) is not None:
+            with self._lock:
+                self._in_flight -= 1
+
+
+cached_cube = CachedStatsCube()
+event.listen(Session, "after_commit", cached_cube._after_commit)
+event.listen(Session, "after_transaction_end", cached_cube._after_transaction_end)
@@ -0,0 +1,213 @@
+"""
+Upload dan download dokumen calon mahasiswa (ijazah, foto, KK)
+
+Upload membaca body request per chunk dan langsung menulisnya ke file
+sementara di UPLOAD_DIR, sambil menghitung ukuran dan SHA-256. Memori per
+request hanya sebesar satu chunk berapa pun ukuran file. Tipe file ditentukan
+dari magic bytes chunk pertama (bukan hanya header Content-Type), dan upload
+dihentikan begitu melewati UPLOAD_MAX_BYTES.
+
+Download penuh memakai FileResponse Starlette apa adanya. Header Range
+(resume / preview sebagian) dilayani FileRangeResponse yang membaca dan
+mengirim hanya byte yang diminta per chunk; keduanya tidak memuat file ke
+memori.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import FileResponse
+
+# Magic bytes -> content type yang diizinkan
+FILE_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+EXTENSIONS = {
+    "application/pdf": "pdf",
+    "image/jpeg": "jpg",
+    "image/png": "png",
+}
+
+
+class UploadTooLarge(ValueError):
+    """Ukuran upload melebihi batas"""
+
+
+class UnsupportedFileType(ValueError):
+    """Tipe file tidak diizinkan atau tidak sesuai Content-Type"""
+
+
+class RangeNotSatisfiable(ValueError):
+    """Header Range di luar ukuran file"""
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    """Hasil upload yang sudah tersimpan di disk"""
+    relative_path: str
+    size_bytes: int
+    sha256: str
+    content_type: str
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Tentukan content type dari magic bytes awal file"""
+    for signature, content_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+async def save_upload_stream(
+    chunks: AsyncIterator[bytes],
+    upload_dir: str,
+    subdir: str,
+    max_bytes: int,
+    allowed_types: tuple,
+    declared_type: Optional[str] = None,
+) -> StoredUpload:
+    """
+    Tulis body upload ke disk per chunk sambil menghitung ukuran dan checksum
+
+    File ditulis ke nama sementara lalu di-rename (atomic) setelah lengkap;
+    jika upload gagal / ditolak file sementara dihapus.
+
+    Args:
+        chunks: Body request (mis. request.stream())
+        subdir: Sub-direktori di upload_dir (mis. ID calon)
+        allowed_types: Content type yang diizinkan untuk dokumen ini
+        declared_type: Header Content-Type dari client, harus sesuai isi file
+
+    Raises:
+        UploadTooLarge: Jika ukuran melebihi max_bytes
+        UnsupportedFileType: Jika tipe file tidak diizinkan / tidak sesuai
+    """
+    directory = os.path.join(upload_dir, subdir)
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}")
+
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    head = b""
+    try:
+        async with await anyio.open_file(temp_path, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Ukuran file melebihi batas {max_bytes} bytes")
+                if content_type is None:
+                    head = (head + chunk)[:16]
+                    if len(head) >= 8:
+                        content_type = _check_type(head, allowed_types, declared_type)
+                digest.update(chunk)
+                await f.write(chunk)
+        if content_type is None:
+            content_type = _check_type(head, allowed_types, declared_type)
+
+        name = f"{uuid.uuid4().hex}.{EXTENSIONS[content_type]}"
+        await run_in_threadpool(os.replace, temp_path, os.path.join(directory, name))
+    except BaseException:
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+
+    return StoredUpload(
+        relative_path=f"{subdir}/{name}",
+        size_bytes=size,
+        sha256=digest.hexdigest(),
+        content_type=content_type,
+    )
+
+
+def _check_type(head: bytes, allowed_types: tuple, declared_type: Optional[str]) -> str:
+    content_type = sniff_content_type(head)
+    if content_type is None or content_type not in allowed_types:
+        raise UnsupportedFileType(f"Tipe file tidak diizinkan. Gunakan: {', '.join(allowed_types)}")
+    if declared_type and declared_type.split(";")[0].strip().lower() not in (content_type, "application/octet-stream"):
+        raise UnsupportedFileType(f"Content-Type {declared_type} tidak sesuai isi file ({content_type})")
+    return content_type
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_upload(upload_dir: str, relative_path: str) -> None:
+    """Hapus file upload (mis. versi lama yang sudah diganti)"""
+    _remove_quietly(os.path.join(upload_dir, relative_path))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    Parse header Range (satu range bytes)
+
+    Returns:
+        Tuple (start, end) inklusif, atau None jika tidak ada / bukan range bytes
+        tunggal (response penuh)
+
+    Raises:
+        RangeNotSatisfiable: Jika range di luar ukuran file
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: N byte terakhir
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(FileResponse):
+    """FileResponse 206 yang hanya mengirim byte [start, end]"""
+
+    def __init__(self, path: str, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,6 +1,7 @@
 """Validation utilities"""
 
 import re
+import unicodedata
 from datetime import datetime
 
 
@@ -55,3 +56,67 @@ def normalize_phone(phone: str) -> str:
         return '+' + phone
     else:
         raise ValueError(f"Format nomor tidak dikenali: {phone}")
+
+
+# Variasi penulisan nama yang umum, disamakan sebelum dibuat key
+_NAME_ALIASES = {
+    "m": "muhammad", "muh": "muhammad", "moh": "muhammad", "mhd": "muhammad",
+    "muhamad": "muhammad", "mohammad": "muhammad", "mohamad": "muhammad", "mochammad": "muhammad",
+}
+
+# Ejaan lama / variasi bunyi -> bentuk baku (urutan penting)
+_PHONETIC_RULES = [
+    (re.compile(pattern), replacement) for pattern, replacement in [
+        ("dj", "j"), ("tj", "c"), ("sj", "sy"), ("oe", "u"), ("(?<=[aeiou])j(?=[aeiou])", "y"),
+        ("ch", "h"), ("kh", "h"), ("ph", "f"), ("sy", "s"), ("ny", "n"), ("ng", "n"),
+        ("q", "k"), ("x", "ks"), ("z", "s"), ("v", "f"), ("w", "u"), ("y", "i"), ("h", ""),
+    ]
+]
+
+
+def normalize_name(nama: str) -> str:
+    """
+    Normalize nama untuk perbandingan: lowercase, tanpa diakritik dan tanda baca,
+    alias umum disamakan (mis. 'M.' / 'Moh.' -> 'muhammad')
+
+    Examples:
+    - "Moh. Ahmad  Hidayat" -> "muhammad ahmad hidayat"
+    """
+    nama = unicodedata.normalize("NFKD", nama)
+    nama = "".join(c for c in nama if not unicodedata.combining(c)).lower()
+    tokens = re.findall(r"[a-z]+", nama)
+    return " ".join(_NAME_ALIASES.get(token, token) for token in tokens)
+
+
+def phonetic_key(token: str) -> str:
+    """
+    Key fonetik sederhana untuk satu kata nama Indonesia
+
+    Ejaan lama disamakan (dj->j, oe->u, tj->c), huruf ganda digabung, lalu
+    vokal setelah huruf pertama dibuang.
+
+    Examples:
+    - "soekarno" / "sukarno" -> "skrn"
+    - "djoko" / "joko" -> "jk"
+    """
+    for pattern, replacement in _PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    if not token:
+        return ""
+    key = token[0]
+    for char in token[1:]:
+        if char in "aeiou" or char == key[-1]:
+            continue
+        key += char
+    return key
+
+
+def build_name_key(nama: str) -> str:
+    """
+    Blocking key nama: key fonetik tiap kata, diurutkan agar urutan nama tidak berpengaruh
+
+    Examples:
+    - "Hidayat, Achmad" dan "Ahmad Hidajat" -> key yang sama
+    """
+    keys = sorted(filter(None, (phonetic_key(token) for token in normalize_name(nama).split())))
+    return " ".join(keys)[:50]
@@ -0,0 +1,206 @@
+"""
+Group-commit write-behind queue untuk registrasi
+
+Di SQLite setiap commit berarti satu fsync, sehingga throughput registrasi
+dibatasi jumlah commit per detik. Writer ini menerima registrasi yang sudah
+divalidasi dari banyak request, lalu menyimpannya dalam satu transaksi per
+batch (maksimal N baris atau setiap beberapa milidetik).
+
+Durability tidak berubah: future setiap request baru di-resolve dengan ID
+setelah transaksi batch-nya ter-commit. Jika batch gagal karena constraint
+(mis. email duplikat hasil race), baris di-commit satu per satu agar hanya
+request yang bermasalah yang menerima error.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models import CalonMahasiswa, StatusPendaftaran
+from app.utils.rollups import record_rollup
+from app.utils.stats_cube import record_cube_transition
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Background writer yang menyimpan registrasi dalam batch transaksi"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch_rows: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, values: dict) -> Future:
+        """
+        Antrikan satu registrasi
+
+        Args:
+            values: Kolom CalonMahasiswa yang sudah divalidasi
+
+        Returns:
+            Future yang di-resolve dengan ID calon setelah batch ter-commit
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush antrian yang tersisa lalu hentikan thread writer"""
+        with self._start_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="registration-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch: list) -> None:
+        session = self.session_factory()
+        try:
+            calons = [CalonMahasiswa(**values) for values, _ in batch]
+            session.add_all(calons)
+            session.flush()
+            _record_rollups(session, calons)
+            ids = [calon.id for calon in calons]
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            for values, future in batch:
+                self._commit_single(values, future)
+            return
+        except Exception as e:
+            session.rollback()
+            logger.exception("Group commit registrasi gagal")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            session.close()
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), calon_id in zip(batch, ids):
+            future.set_result(calon_id)
+
+    def _commit_single(self, values: dict, future: Future) -> None:
+        session = self.session_factory()
+        try:
+            calon = CalonMahasiswa(**values)
+            session.add(calon)
+            session.flush()
+            _record_rollups(session, [calon])
+            calon_id = calon.id
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            future.set_exception(e)
+            return
+        finally:
+            session.close()
+        self.batches += 1
+        self.rows += 1
+        future.set_result(calon_id)
+
+
+def _record_rollups(session: Session, calons: list) -> None:
+    """Satu upsert rollup dan cube per kombinasi prodi x jalur x tahun dalam batch"""
+    counts = Counter(
+        (calon.program_studi_id, calon.jalur_masuk_id, calon.created_at.year) for calon in calons
+    )
+    for (program_studi_id, jalur_masuk_id, tahun), count in counts.items():
+        record_rollup(session, StatusPendaftaran.PENDING, program_studi_id, jalur_masuk_id, count=count)
+        record_cube_transition(
+            session, program_studi_id, jalur_masuk_id, tahun,
+            None, StatusPendaftaran.PENDING, count=count
+        )
+
+
+# Satu writer per engine (aplikasi dan test memakai database berbeda)
+_writers: dict = {}
+_writers_lock = threading.Lock()
+
+
+def get_registration_writer(bind) -> GroupCommitWriter:
+    """Ambil (atau buat) writer untuk engine database yang diberikan"""
+    with _writers_lock:
+        writer = _writers.get(bind)
+        if writer is None:
+            writer = GroupCommitWriter(
+                sessionmaker(autocommit=False, autoflush=False, bind=bind),
+                max_batch_rows=settings.REGISTRATION_BATCH_MAX_ROWS,
+                max_wait_ms=settings.REGISTRATION_BATCH_MAX_WAIT_MS,
+            )
+            _writers[bind] = writer
+        return writer
+
+
+def stop_registration_writers() -> None:
+    """Flush dan hentikan semua writer (dipanggil saat shutdown)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
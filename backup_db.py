@@ -0,0 +1,47 @@
+"""
+Backup online database PMB tanpa menghentikan pendaftaran
+
+Contoh:
+    python backup_db.py
+    python backup_db.py --method vacuum --dir /mnt/backup --keep 14
+"""
+
+import argparse
+import sys
+
+from app.config import settings
+from app.utils.backup import BACKUP_METHODS, BackupError, backup_database, sqlite_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backup online database PMB (SQLite)")
+    parser.add_argument("--dir", default=settings.BACKUP_DIR, help="Direktori tujuan backup")
+    parser.add_argument("--method", default=settings.BACKUP_METHOD, choices=BACKUP_METHODS)
+    parser.add_argument("--pages-per-step", type=int, default=settings.BACKUP_PAGES_PER_STEP)
+    parser.add_argument("--step-sleep", type=float, default=settings.BACKUP_STEP_SLEEP_SECONDS)
+    parser.add_argument("--keep", type=int, default=settings.BACKUP_KEEP, help="Jumlah backup terbaru yang disimpan")
+    args = parser.parse_args(argv)
+    
+    try:
+        result = backup_database(
+            sqlite_path(settings.DATABASE_URL),
+            args.dir,
+            method=args.method,
+            pages_per_step=args.pages_per_step,
+            step_sleep_seconds=args.step_sleep,
+            keep=args.keep,
+        )
+    except BackupError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    print(f"✅ Backup selesai: {result.path}")
+    print(f"   - Method: {result.method} ({result.restarts} restart)")
+    print(f"   - Ukuran: {result.size_bytes} bytes ({result.pages} halaman)")
+    print(f"   - Durasi: {result.duration_seconds} s ({result.throughput_mb_per_second} MB/s)")
+    print(f"   - Integrity check: {result.integrity}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
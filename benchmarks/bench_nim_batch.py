@@ -0,0 +1,66 @@
+"""
+Benchmark batch parsing NIM vs loop per item
+
+Usage:
+    python -m benchmarks.bench_nim_batch [jumlah_nim]
+"""
+
+import random
+import sys
+import time
+
+from app.utils import nim_generator
+from app.utils.nim_generator import parse_nim, parse_nim_batch
+
+
+def generate_nims(count: int, invalid_ratio: float = 0.05) -> list:
+    """Buat NIM acak, sebagian sengaja tidak valid"""
+    rng = random.Random(42)
+    nims = []
+    for _ in range(count):
+        nim = f"{rng.randint(2015, 2030)}{rng.randint(1, 999):03d}-{rng.randint(1, 9999):04d}"
+        if rng.random() < invalid_ratio:
+            nim = nim.replace("-", rng.choice(["", "/", "--"]))
+        nims.append(nim)
+    return nims
+
+
+def per_item_loop(nims: list) -> list:
+    """Baseline: parse_nim satu per satu dengan try/except"""
+    results = []
+    for nim in nims:
+        try:
+            results.append(parse_nim(nim))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+def timeit(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    nims = generate_nims(count)
+
+    rows = [("loop parse_nim", timeit(per_item_loop, nims))]
+    rows.append(("batch (python)", timeit(nim_generator._parse_nim_batch_python, nims)))
+    if nim_generator.np is not None:
+        rows.append(("batch (numpy, list input)", timeit(parse_nim_batch, nims)))
+        array = nim_generator.np.asarray(nims)
+        rows.append(("batch (numpy, array input)", timeit(parse_nim_batch, array)))
+
+    baseline = rows[0][1]
+    print(f"{count} NIM")
+    for name, seconds in rows:
+        print(f"  {name:<28} {seconds * 1000:9.1f} ms  {count / seconds:12,.0f} NIM/s  x{baseline / seconds:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
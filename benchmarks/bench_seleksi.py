@@ -0,0 +1,101 @@
+"""
+Benchmark seleksi berbasis skor (alokasi + penerapan hasil ke database)
+
+Membuat database SQLite sementara berisi N calon pending dengan skor acak dan
+tiga pilihan prodi, lalu mengukur alokasi saja dan run_seleksi end-to-end
+(UPDATE massal, blok NIM, kuota, rollup, cube, outbox).
+
+Usage:
+    python -m benchmarks.bench_seleksi [jumlah_calon]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import CalonMahasiswa, JalurMasuk, KuotaProdi, PilihanProdi, ProgramStudi, StatusPendaftaran
+from app.utils.seleksi import Pelamar, allocate, run_seleksi
+
+JUMLAH_PRODI = 50
+JUMLAH_PILIHAN = 3
+
+
+def seed(session_factory, count: int) -> list:
+    """Isi database dengan prodi, kuota (total ~60% pelamar) dan calon dengan pilihan"""
+    rng = random.Random(42)
+    db = session_factory()
+    db.add_all([
+        ProgramStudi(id=p, kode=f"{p:03d}", nama=f"Prodi {p}", fakultas="Bench")
+        for p in range(1, JUMLAH_PRODI + 1)
+    ])
+    db.add(JalurMasuk(id=1, kode="SNBT", nama="Seleksi Nasional Berbasis Tes"))
+    db.add_all([
+        KuotaProdi(program_studi_id=p, jalur_masuk_id=1, kapasitas=int(count * 0.6 / JUMLAH_PRODI), terisi=0)
+        for p in range(1, JUMLAH_PRODI + 1)
+    ])
+    db.flush()
+
+    now = datetime.utcnow()
+    pelamar = []
+    calon_rows, pilihan_rows = [], []
+    for calon_id in range(1, count + 1):
+        pilihan = tuple(rng.sample(range(1, JUMLAH_PRODI + 1), JUMLAH_PILIHAN))
+        skor = round(rng.uniform(0, 1000), 2)
+        pelamar.append(Pelamar(calon_id, skor, pilihan))
+        calon_rows.append(dict(
+            id=calon_id, nama_lengkap=f"Calon {calon_id}", email=f"calon{calon_id}@bench.id",
+            phone="081234567890", tanggal_lahir=date(2005, 1, 1), alamat="Jl. Bench",
+            program_studi_id=pilihan[0], jalur_masuk_id=1, status=StatusPendaftaran.PENDING,
+            skor=skor, created_at=now, updated_at=now,
+        ))
+        pilihan_rows.extend(
+            dict(calon_mahasiswa_id=calon_id, urutan=urutan, program_studi_id=prodi)
+            for urutan, prodi in enumerate(pilihan, start=1)
+        )
+    db.execute(insert(CalonMahasiswa.__table__), calon_rows)
+    db.execute(insert(PilihanProdi.__table__), pilihan_rows)
+    db.commit()
+    db.close()
+    return pelamar
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        pelamar = seed(session_factory, count)
+
+        kapasitas = {p: int(count * 0.6 / JUMLAH_PRODI) for p in range(1, JUMLAH_PRODI + 1)}
+        started = time.perf_counter()
+        allocate(pelamar, kapasitas)
+        allocate_seconds = time.perf_counter() - started
+
+        db = session_factory()
+        started = time.perf_counter()
+        dry = run_seleksi(db, 1, dry_run=True)
+        dry_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = run_seleksi(db, 1)
+        run_seconds = time.perf_counter() - started
+        db.close()
+        engine.dispose()
+
+    print(f"{count} calon, {JUMLAH_PRODI} prodi, {JUMLAH_PILIHAN} pilihan; diterima {result['diterima']}")
+    print(f"  {'alokasi (in-memory)':<28} {allocate_seconds * 1000:9.1f} ms")
+    print(f"  {'run_seleksi dry run':<28} {dry_seconds * 1000:9.1f} ms")
+    print(f"  {'run_seleksi (tulis hasil)':<28} {run_seconds * 1000:9.1f} ms")
+    assert dry["diterima"] == result["diterima"]
+
+
+if __name__ == "__main__":
+    main()
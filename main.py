@@ -1,51 +1,12 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.database import init_db, Base, engine
-from app.routers import pmb, master_data
-from app.models import CalonMahasiswa, ProgramStudi, JalurMasuk
+"""
+Entry point server PMB
 
-# Initialize database
-Base.metadata.create_all(bind=engine)
+Aplikasi didefinisikan di app/main.py; file ini hanya menjalankan uvicorn.
+"""
 
-# Create FastAPI app
-app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    description="Sistem Penerimaan Mahasiswa Baru (PMB) dengan NIM Auto-Generate"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(master_data.router)
-app.include_router(pmb.router)
-
-
-@app.get("/", tags=["Root"])
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "Selamat datang di Sistem PMB (Penerimaan Mahasiswa Baru)",
-        "version": settings.APP_VERSION,
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
-
-
-@app.get("/health", tags=["Health"])
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "version": settings.APP_VERSION}
+from app.main import app
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,10 +1,24 @@
+import asyncio
+import hashlib
+import threading
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import get_db, Base
-from app.models import ProgramStudi, JalurMasuk, CalonMahasiswa, StatusPendaftaran
+from app.models import ProgramStudi, JalurMasuk, CalonMahasiswa, StatusPendaftaran, NotificationOutbox, OutboxStatus, RegistrationRollup, StatsCubeCell
+from app.utils.cache import response_cache
+from app.events import event_bus
+from app.utils.jobs import get_job_runner
+from app.utils.admission import approve_calon, reject_calon, StatusConflict
+from app.utils.kuota import KuotaPenuh
+from app.utils.ranking import rank_index
+from app.utils.idempotency import idempotency_store
+from app.utils.rollups import ensure_rollups, query_timeseries
+from app.utils.stats_cube import ensure_stats_cube
+from app.utils.rate_limit import limiters, reset_rate_limits, TokenBucketLimiter
+from app.utils.concurrency import limiters as concurrency_limiters
 from datetime import date, datetime, timedelta
 
 # Setup test database
@@ -34,6 +48,10 @@ client = TestClient(app)
 def setup_database():
     """Setup test database before each test"""
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    rank_index.reset()
+    idempotency_store.clear()
+    reset_rate_limits()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -464,6 +482,30 @@ class TestPMBStatistics:
         assert response.json()["pending"] == 2
         assert response.json()["approved"] == 0
         assert "Teknik Informatika" in response.json()["program_studi_counts"]
+    
+    def test_shared_computation_outlives_leader_session(self, setup_master_data):
+        """Test follower tetap mendapat hasil walau leader di-cancel dan session-nya ditutup"""
+        from app.routers.pmb import get_pmb_statistics
+        leader_db, follower_db = TestingSessionLocal(), TestingSessionLocal()
+        used = []
+        event.listen(leader_db, "after_begin", lambda *args: used.append(args))
+        
+        async def scenario():
+            leader = asyncio.ensure_future(get_pmb_statistics(db=leader_db))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(get_pmb_statistics(db=follower_db))
+            await asyncio.sleep(0)
+            # get_db menutup session leader begitu request-nya di-cancel
+            leader.cancel()
+            leader_db.close()
+            return await follower
+        
+        try:
+            stats = asyncio.run(scenario())
+        finally:
+            follower_db.close()
+        assert stats.total_pendaftar == 0
+        assert used == []
 
 
 # ================== INTEGRATION TESTS ==================
@@ -511,3 +553,1585 @@ class TestIntegration:
         assert final_status.status_code == 200
         assert final_status.json()["status"] == "approved"
         assert final_status.json()["nim"] == nim
+
+
+# ================== RESPONSE CACHE TESTS ==================
+
+class TestResponseCache:
+    """Test response cache untuk /status dan /list"""
+    
+    def _register(self, idx=0, program_studi_id=1):
+        response = client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon {idx}",
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": 1
+            }
+        )
+        return response.json()["id"]
+    
+    def test_status_cached_and_invalidated_on_approve(self, setup_master_data):
+        """Test status di-cache lalu di-invalidate saat approve"""
+        calon_id = self._register()
+        
+        client.get(f"/api/pmb/status/{calon_id}")
+        client.get(f"/api/pmb/status/{calon_id}")
+        assert response_cache.stats()["hits"] == 1
+        
+        client.put(f"/api/pmb/approve/{calon_id}", json={})
+        
+        response = client.get(f"/api/pmb/status/{calon_id}")
+        assert response.json()["status"] == "approved"
+        assert response.json()["nim"] is not None
+    
+    def test_list_bucket_invalidated_on_register_and_reject(self, setup_master_data):
+        """Test list per filter bucket di-invalidate saat register dan reject"""
+        calon_id = self._register(0)
+        
+        pending = client.get("/api/pmb/list?status_filter=pending")
+        assert len(pending.json()) == 1
+        
+        self._register(1)
+        pending = client.get("/api/pmb/list?status_filter=pending")
+        assert len(pending.json()) == 2
+        
+        client.post(f"/api/pmb/reject/{calon_id}")
+        pending = client.get("/api/pmb/list?status_filter=pending")
+        rejected = client.get("/api/pmb/list?status_filter=rejected")
+        assert len(pending.json()) == 1
+        assert [c["id"] for c in rejected.json()] == [calon_id]
+    
+    def test_other_prodi_bucket_not_invalidated(self, setup_master_data):
+        """Test register di prodi lain tidak meng-invalidate bucket prodi ini"""
+        self._register(0, program_studi_id=1)
+        client.get("/api/pmb/list?program_studi_id=1")
+        
+        self._register(1, program_studi_id=2)
+        client.get("/api/pmb/list?program_studi_id=1")
+        assert response_cache.stats()["hits"] == 1
+    
+    def test_cache_stats_endpoint(self, setup_master_data):
+        """Test endpoint metrics cache"""
+        response = client.get("/api/pmb/cache/stats")
+        assert response.status_code == 200
+        assert "hit_ratio" in response.json()
+
+
+# ================== IDEMPOTENCY TESTS ==================
+
+class TestIdempotencyKey:
+    """Test Idempotency-Key pada register"""
+    
+    payload = {
+        "nama_lengkap": "Ahmad Hidayat",
+        "email": "ahmad@email.com",
+        "phone": "082123456789",
+        "tanggal_lahir": "2005-01-15",
+        "alamat": "Jl. Merdeka No. 10, Jakarta",
+        "program_studi_id": 1,
+        "jalur_masuk_id": 1
+    }
+    
+    def test_retry_returns_original_response(self, setup_master_data):
+        """Test retry dengan key yang sama return response awal, bukan 409"""
+        headers = {"Idempotency-Key": "reg-001"}
+        first = client.post("/api/pmb/register", json=self.payload, headers=headers)
+        retry = client.post("/api/pmb/register", json=self.payload, headers=headers)
+        
+        assert first.status_code == 201
+        assert retry.status_code == 201
+        assert retry.json()["id"] == first.json()["id"]
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        
+        db = TestingSessionLocal()
+        assert db.query(CalonMahasiswa).count() == 1
+        db.close()
+    
+    def test_same_key_different_body_rejected(self, setup_master_data):
+        """Test key yang sama dengan data berbeda ditolak"""
+        headers = {"Idempotency-Key": "reg-002"}
+        client.post("/api/pmb/register", json=self.payload, headers=headers)
+        
+        other = dict(self.payload, email="lain@email.com")
+        response = client.post("/api/pmb/register", json=other, headers=headers)
+        assert response.status_code == 422
+    
+    def test_failed_request_not_stored(self, setup_master_data):
+        """Test request yang gagal tidak disimpan sehingga retry dieksekusi ulang"""
+        headers = {"Idempotency-Key": "reg-003"}
+        invalid = dict(self.payload, program_studi_id=999)
+        assert client.post("/api/pmb/register", json=invalid, headers=headers).status_code == 400
+        assert client.post("/api/pmb/register", json=invalid, headers=headers).status_code == 400
+    
+    def test_without_key_duplicate_still_conflict(self, setup_master_data):
+        """Test tanpa Idempotency-Key perilaku lama tetap (409)"""
+        client.post("/api/pmb/register", json=self.payload)
+        response = client.post("/api/pmb/register", json=self.payload)
+        assert response.status_code == 409
+
+
+# ================== RATE LIMIT TESTS ==================
+
+class TestRateLimit:
+    """Test token-bucket rate limiting per client"""
+    
+    def test_status_polling_limited_with_retry_after(self, setup_master_data, monkeypatch):
+        """Test polling status melebihi burst mendapat 429 + Retry-After"""
+        monkeypatch.setitem(limiters, "status", TokenBucketLimiter(rate_per_minute=60, burst=2))
+        
+        assert client.get("/api/pmb/status/999").status_code == 404
+        assert client.get("/api/pmb/status/999").status_code == 404
+        
+        response = client.get("/api/pmb/status/999")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    
+    def test_api_key_has_own_bucket(self, setup_master_data, monkeypatch):
+        """Test client dengan API key terdaftar berbeda tidak saling menghabiskan kuota"""
+        monkeypatch.setitem(limiters, "status", TokenBucketLimiter(rate_per_minute=60, burst=1))
+        monkeypatch.setattr("app.utils.rate_limit.settings.RATE_LIMIT_API_KEYS", ["a", "b"])
+        
+        assert client.get("/api/pmb/status/999", headers={"X-API-Key": "a"}).status_code == 404
+        assert client.get("/api/pmb/status/999", headers={"X-API-Key": "a"}).status_code == 429
+        assert client.get("/api/pmb/status/999", headers={"X-API-Key": "b"}).status_code == 404
+    
+    def test_unknown_api_key_uses_ip_bucket(self, setup_master_data, monkeypatch):
+        """Test API key acak tidak memberi bucket baru"""
+        monkeypatch.setitem(limiters, "status", TokenBucketLimiter(rate_per_minute=60, burst=1))
+        monkeypatch.setattr("app.utils.rate_limit.settings.RATE_LIMIT_API_KEYS", ["a"])
+        
+        assert client.get("/api/pmb/status/999", headers={"X-API-Key": "x1"}).status_code == 404
+        assert client.get("/api/pmb/status/999", headers={"X-API-Key": "x2"}).status_code == 429
+        assert client.get("/api/pmb/status/999").status_code == 429
+
+
+# ================== LOAD SHEDDING TESTS ==================
+
+class TestLoadShedding:
+    """Test adaptive concurrency middleware"""
+    
+    def test_read_shed_with_503_when_saturated(self, setup_master_data):
+        """Test request read ditolak 503 saat limit in-flight tercapai"""
+        client.get("/health")  # pastikan middleware stack sudah dibangun
+        read_limiter = concurrency_limiters["read"]
+        saturated = int(read_limiter.limit)
+        read_limiter.in_flight += saturated
+        try:
+            response = client.get("/api/pmb/stats")
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "1"
+            
+            # Write punya limiter sendiri, tidak ikut di-shed
+            write = client.post("/api/master/program-studi", json={
+                "kode": "009", "nama": "Fisika", "fakultas": "MIPA"
+            })
+            assert write.status_code == 201
+        finally:
+            read_limiter.in_flight -= saturated
+    
+    def test_shed_response_has_cors_headers(self, setup_master_data):
+        """Test 503 load shedding melewati CORS middleware"""
+        client.get("/health")
+        read_limiter = concurrency_limiters["read"]
+        saturated = int(read_limiter.limit)
+        read_limiter.in_flight += saturated
+        try:
+            response = client.get("/api/pmb/stats", headers={"Origin": "http://dashboard.test"})
+            assert response.status_code == 503
+            assert response.headers["access-control-allow-origin"] == "*"
+        finally:
+            read_limiter.in_flight -= saturated
+    
+    def test_long_running_routes_not_limited(self, setup_master_data):
+        """Test upload dokumen dan job admin tidak memakai limiter write"""
+        client.get("/health")
+        write_limiter = concurrency_limiters["write"]
+        saturated = int(write_limiter.limit)
+        write_limiter.in_flight += saturated
+        try:
+            assert client.get("/api/jobs").status_code == 200
+            assert client.post("/api/pmb/stats/cube/rebuild").status_code == 200
+            assert client.post("/api/pmb/status/bulk", json={"ids": [1]}).status_code != 503
+            assert client.post("/api/master/program-studi", json={
+                "kode": "009", "nama": "Fisika", "fakultas": "MIPA"
+            }).status_code == 503
+        finally:
+            write_limiter.in_flight -= saturated
+    
+    def test_metrics_endpoint(self, setup_master_data):
+        """Test endpoint /metrics berisi limit per kelas route"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert set(response.json()["concurrency"]) == {"read", "write"}
+
+
+# ================== GROUP COMMIT TESTS ==================
+
+class TestGroupCommitRegistration:
+    """Test registrasi lewat group-commit writer"""
+    
+    def test_register_via_group_commit(self, setup_master_data, monkeypatch):
+        """Test registrasi mode group-commit menghasilkan response yang sama"""
+        monkeypatch.setattr("app.routers.pmb.settings.REGISTRATION_GROUP_COMMIT_ENABLED", True)
+        payload = {
+            "nama_lengkap": "Ahmad Hidayat",
+            "email": "ahmad@email.com",
+            "phone": "082123456789",
+            "tanggal_lahir": "2005-01-15",
+            "alamat": "Jl. Merdeka No. 10, Jakarta",
+            "program_studi_id": 1,
+            "jalur_masuk_id": 1
+        }
+        
+        response = client.post("/api/pmb/register", json=payload)
+        assert response.status_code == 201
+        assert response.json()["status"] == "pending"
+        assert response.json()["program_studi"]["kode"] == "001"
+        
+        status_response = client.get(f"/api/pmb/status/{response.json()['id']}")
+        assert status_response.status_code == 200
+        
+        assert client.post("/api/pmb/register", json=payload).status_code == 409
+
+
+# ================== SEARCH TESTS ==================
+
+class TestSearch:
+    """Test full-text search calon mahasiswa"""
+    
+    def _register(self, idx, nama, alamat):
+        client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": nama,
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": alamat,
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        )
+    
+    def test_search_partial_name(self, setup_master_data):
+        """Test cari dengan potongan nama (prefix)"""
+        self._register(0, "Ahmad Hidayat", "Jl. Merdeka No. 10, Jakarta")
+        self._register(1, "Budi Santoso", "Jl. Sudirman, Bandung")
+        
+        response = client.get("/api/pmb/search?q=hida")
+        assert response.status_code == 200
+        assert [r["nama_lengkap"] for r in response.json()] == ["Ahmad Hidayat"]
+    
+    def test_search_address_and_email(self, setup_master_data):
+        """Test cari berdasarkan alamat dan email"""
+        self._register(0, "Ahmad Hidayat", "Jl. Merdeka No. 10, Jakarta")
+        self._register(1, "Budi Santoso", "Jl. Sudirman, Bandung")
+        
+        assert [r["email"] for r in client.get("/api/pmb/search?q=bandung").json()] == ["calon1@email.com"]
+        assert len(client.get("/api/pmb/search?q=calon0").json()) == 1
+    
+    def test_search_ranked_name_before_address(self, setup_master_data):
+        """Test kecocokan di nama lebih relevan daripada di alamat"""
+        self._register(0, "Siti Aminah", "Jl. Kartini, Jakarta")
+        self._register(1, "Kartini Putri", "Jl. Mawar, Jakarta")
+        
+        results = client.get("/api/pmb/search?q=kartini").json()
+        assert [r["nama_lengkap"] for r in results] == ["Kartini Putri", "Siti Aminah"]
+        assert results[0]["score"] <= results[1]["score"]
+    
+    def test_search_pagination(self, setup_master_data):
+        """Test pagination hasil search"""
+        for i in range(3):
+            self._register(i, f"Calon Jakarta {i}", "Jl. Test, Jakarta")
+        
+        page1 = client.get("/api/pmb/search?q=jakarta&limit=2").json()
+        page2 = client.get("/api/pmb/search?q=jakarta&skip=2&limit=2").json()
+        assert len(page1) == 2
+        assert len(page2) == 1
+    
+    def test_search_index_follows_update(self, setup_master_data):
+        """Test index ikut ter-update saat data calon berubah"""
+        self._register(0, "Ahmad Hidayat", "Jl. Merdeka No. 10, Jakarta")
+        
+        db = TestingSessionLocal()
+        calon = db.query(CalonMahasiswa).first()
+        calon.nama_lengkap = "Ahmad Kurniawan"
+        db.commit()
+        db.close()
+        
+        assert client.get("/api/pmb/search?q=hidayat").json() == []
+        assert len(client.get("/api/pmb/search?q=kurnia").json()) == 1
+    
+    def test_search_operator_injection_is_literal(self, setup_master_data):
+        """Test sintaks FTS di input diperlakukan sebagai teks biasa"""
+        self._register(0, "Ahmad Hidayat", "Jl. Merdeka No. 10, Jakarta")
+        
+        response = client.get('/api/pmb/search?q=ahmad OR "x" NEAR(')
+        assert response.status_code == 200
+        assert response.json() == []
+        assert client.get("/api/pmb/search?q=!!").status_code == 400
+
+
+# ================== DUPLICATE DETECTION TESTS ==================
+
+class TestDuplicateDetection:
+    """Test deteksi calon duplikat"""
+    
+    def _payload(self, email, nama="Ahmad Hidayat", phone="082123456789", program_studi_id=1):
+        return {
+            "nama_lengkap": nama,
+            "email": email,
+            "phone": phone,
+            "tanggal_lahir": "2005-01-15",
+            "alamat": "Jl. Merdeka No. 10, Jakarta",
+            "program_studi_id": program_studi_id,
+            "jalur_masuk_id": 1
+        }
+    
+    def test_register_warns_possible_duplicate(self, setup_master_data):
+        """Test orang yang sama dengan email lain ditandai di header"""
+        first = client.post("/api/pmb/register", json=self._payload("ahmad@email.com"))
+        assert "X-Possible-Duplicates" not in first.headers
+        
+        second = client.post(
+            "/api/pmb/register",
+            json=self._payload("ahmad.h@email.com", nama="Achmad Hidajat", phone="081399998888", program_studi_id=2)
+        )
+        assert second.status_code == 201
+        assert second.headers["X-Possible-Duplicates"] == str(first.json()["id"])
+    
+    def test_idempotent_replay_keeps_duplicate_header(self, setup_master_data):
+        """Test replay Idempotency-Key mengembalikan header X-Possible-Duplicates yang sama"""
+        first = client.post("/api/pmb/register", json=self._payload("ahmad@email.com"))
+        payload = self._payload("ahmad.h@email.com", nama="Achmad Hidajat", phone="081399998888")
+        headers = {"Idempotency-Key": "dup-replay"}
+        
+        original = client.post("/api/pmb/register", json=payload, headers=headers)
+        replay = client.post("/api/pmb/register", json=payload, headers=headers)
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert replay.json() == original.json()
+        assert replay.headers["X-Possible-Duplicates"] == str(first.json()["id"])
+    
+    def test_register_block_mode(self, setup_master_data, monkeypatch):
+        """Test mode block menolak registrasi duplikat"""
+        monkeypatch.setattr("app.routers.pmb.settings.DUPLICATE_CHECK_MODE", "block")
+        client.post("/api/pmb/register", json=self._payload("ahmad@email.com"))
+        
+        response = client.post("/api/pmb/register", json=self._payload("lain@email.com"))
+        assert response.status_code == 409
+    
+    def test_batch_scan(self, setup_master_data):
+        """Test batch scan menemukan pasangan duplikat"""
+        first = client.post("/api/pmb/register", json=self._payload("ahmad@email.com")).json()
+        second = client.post("/api/pmb/register", json=self._payload("ahmad2@email.com")).json()
+        client.post(
+            "/api/pmb/register",
+            json=self._payload("budi@email.com", nama="Budi Santoso", phone="081234567890")
+        )
+        
+        response = client.get("/api/pmb/duplicates")
+        assert response.status_code == 200
+        assert response.json()["total_pairs"] == 1
+        pair = response.json()["pairs"][0]
+        assert (pair["duplicate_of"], pair["calon_id"]) == (first["id"], second["id"])
+        assert set(pair["reasons"]) == {"nama", "tanggal_lahir", "phone"}
+
+
+# ================== LOOKUP TESTS ==================
+
+class TestLookup:
+    """Test lookup calon berdasarkan NIM, email dan telepon"""
+    
+    def _register_and_approve(self):
+        calon = client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": "Ahmad Hidayat",
+                "email": "Ahmad@Email.com",
+                "phone": "082123456789",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Merdeka No. 10, Jakarta",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()
+        nim = client.put(f"/api/pmb/approve/{calon['id']}", json={}).json()["nim"]
+        return calon["id"], nim
+    
+    def test_lookup_by_nim(self, setup_master_data):
+        """Test lookup NIM valid"""
+        calon_id, nim = self._register_and_approve()
+        
+        response = client.get(f"/api/pmb/lookup/nim/{nim}")
+        assert response.status_code == 200
+        assert response.json()["id"] == calon_id
+        assert response.json()["program_studi"]["kode"] == "001"
+    
+    def test_lookup_by_nim_malformed_rejected(self, setup_master_data):
+        """Test NIM dengan format salah ditolak sebelum query"""
+        assert client.get("/api/pmb/lookup/nim/2025-001-0001").status_code == 400
+        assert client.get("/api/pmb/lookup/nim/2025001-9999").status_code == 404
+    
+    def test_lookup_by_email_case_insensitive(self, setup_master_data):
+        """Test lookup email tidak case-sensitive"""
+        calon_id, _ = self._register_and_approve()
+        
+        response = client.get("/api/pmb/lookup/email/AHMAD@email.com")
+        assert response.status_code == 200
+        assert response.json()["id"] == calon_id
+        assert client.get("/api/pmb/lookup/email/bukan-email").status_code == 400
+    
+    def test_lookup_by_phone_any_format(self, setup_master_data):
+        """Test lookup telepon dengan format 08... maupun +628..."""
+        calon_id, _ = self._register_and_approve()
+        
+        for phone in ["082123456789", "+6282123456789"]:
+            response = client.get(f"/api/pmb/lookup/phone/{phone}")
+            assert response.status_code == 200
+            assert [c["id"] for c in response.json()] == [calon_id]
+        
+        assert client.get("/api/pmb/lookup/phone/12345").status_code == 400
+
+
+# ================== BULK STATUS TESTS ==================
+
+class TestBulkStatus:
+    """Test multi-get status calon"""
+    
+    def _register(self, idx):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon {idx}",
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def test_bulk_status_with_missing(self, setup_master_data):
+        """Test hasil per ID dan ID yang tidak ditemukan dipisah"""
+        ids = [self._register(i) for i in range(3)]
+        client.put(f"/api/pmb/approve/{ids[1]}", json={})
+        client.get(f"/api/pmb/status/{ids[0]}")  # sebagian dari cache
+        
+        response = client.post("/api/pmb/status/bulk", json={"ids": ids + [999, ids[0]]})
+        assert response.status_code == 200
+        body = response.json()
+        assert sorted(body["results"]) == sorted(str(i) for i in ids)
+        assert body["results"][str(ids[1])]["status"] == "approved"
+        assert body["results"][str(ids[1])]["program_studi"]["kode"] == "001"
+        assert body["missing"] == [999]
+    
+    def test_bulk_status_limit(self, setup_master_data, monkeypatch):
+        """Test jumlah ID dibatasi"""
+        monkeypatch.setattr("app.routers.pmb.settings.BULK_STATUS_MAX_IDS", 2)
+        response = client.post("/api/pmb/status/bulk", json={"ids": [1, 2, 3]})
+        assert response.status_code == 400
+        assert client.post("/api/pmb/status/bulk", json={"ids": []}).status_code == 422
+
+
+# ================== TIME-SERIES ROLLUP TESTS ==================
+
+class TestTimeseries:
+    """Test rollup time-series registrasi"""
+    
+    def _register(self, idx, program_studi_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon {idx}",
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def _counts(self, points):
+        counts = {}
+        for point in points:
+            key = (point["status"], point["program_studi_id"])
+            counts[key] = counts.get(key, 0) + point["count"]
+        return counts
+    
+    def test_hourly_counts_by_status_and_prodi(self, setup_master_data):
+        """Test event register/approve/reject tercatat di bucket jam berjalan"""
+        ids = [self._register(0), self._register(1), self._register(2, program_studi_id=2)]
+        client.put(f"/api/pmb/approve/{ids[0]}", json={})
+        client.post(f"/api/pmb/reject/{ids[2]}")
+        
+        response = client.get("/api/pmb/stats/timeseries")
+        assert response.status_code == 200
+        assert self._counts(response.json()["points"]) == {
+            ("pending", 1): 2,
+            ("pending", 2): 1,
+            ("approved", 1): 1,
+            ("rejected", 2): 1,
+        }
+    
+    def test_daily_and_filters(self, setup_master_data):
+        """Test granularity harian dan filter status/prodi"""
+        self._register(0)
+        self._register(1, program_studi_id=2)
+        
+        response = client.get(
+            "/api/pmb/stats/timeseries?granularity=day&status_filter=pending&program_studi_id=2"
+        )
+        points = response.json()["points"]
+        assert len(points) == 1
+        assert points[0]["count"] == 1
+        assert points[0]["bucket"].endswith("T00:00:00")
+    
+    def test_open_bucket_flagged_partial(self, setup_master_data):
+        """Test bucket yang masih berjalan ditandai partial, bucket yang sudah lewat tidak"""
+        self._register(0)
+        points = client.get("/api/pmb/stats/timeseries").json()["points"]
+        assert [point["partial"] for point in points] == [True]
+        
+        bucket = datetime.fromisoformat(points[0]["bucket"])
+        db = TestingSessionLocal()
+        try:
+            closed = query_timeseries(db, bucket, bucket + timedelta(hours=1), now=bucket + timedelta(hours=2))
+            # Range berakhir di tengah bucket: count bucket itu belum lengkap
+            cut = query_timeseries(db, bucket, bucket + timedelta(minutes=30), now=bucket + timedelta(hours=2))
+        finally:
+            db.close()
+        assert [(point["count"], point["partial"]) for point in closed] == [(1, False)]
+        assert [point["partial"] for point in cut] == [True]
+    
+    def test_query_does_not_touch_applicant_table(self, setup_master_data):
+        """Test query time-series hanya membaca tabel rollup"""
+        self._register(0)
+        statements = []
+        
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.get("/api/pmb/stats/timeseries")
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        
+        assert statements
+        assert not any("calon_mahasiswa" in statement for statement in statements)
+    
+    def test_rebuild_from_applicants(self, setup_master_data):
+        """Test rollup yang kosong (database lama) diisi ulang dari calon_mahasiswa"""
+        ids = [self._register(0), self._register(1), self._register(2, program_studi_id=2)]
+        client.put(f"/api/pmb/approve/{ids[0]}", json={})
+        client.post(f"/api/pmb/reject/{ids[2]}")
+        expected = client.get("/api/pmb/stats/timeseries").json()["points"]
+        
+        db = TestingSessionLocal()
+        try:
+            db.query(RegistrationRollup).delete()
+            db.commit()
+        finally:
+            db.close()
+        assert client.get("/api/pmb/stats/timeseries").json()["points"] == []
+        
+        assert ensure_rollups(engine) == 4
+        assert client.get("/api/pmb/stats/timeseries").json()["points"] == expected
+        # Rollup sudah terisi: tidak dihitung ulang
+        assert ensure_rollups(engine) == 0
+    
+    def test_invalid_granularity(self, setup_master_data):
+        """Test granularity tidak valid"""
+        assert client.get("/api/pmb/stats/timeseries?granularity=week").status_code == 400
+
+
+class TestStatsCube:
+    """Test cube statistik multi-dimensi"""
+    
+    def _register(self, idx, program_studi_id=1, jalur_masuk_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon {idx}",
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": jalur_masuk_id
+            }
+        ).json()["id"]
+    
+    def _setup_data(self):
+        mipa = client.post(
+            "/api/master/program-studi",
+            json={"kode": "009", "nama": "Fisika", "fakultas": "MIPA"}
+        ).json()["id"]
+        ids = [
+            self._register(0, program_studi_id=1, jalur_masuk_id=2),
+            self._register(1, program_studi_id=2, jalur_masuk_id=2),
+            self._register(2, program_studi_id=mipa, jalur_masuk_id=2),
+            self._register(3, program_studi_id=mipa, jalur_masuk_id=1),
+            self._register(4, program_studi_id=1, jalur_masuk_id=2),
+        ]
+        for calon_id in ids[:4]:
+            client.put(f"/api/pmb/approve/{calon_id}", json={})
+        client.post(f"/api/pmb/reject/{ids[4]}")
+        return ids
+    
+    def test_slice_approved_per_fakultas(self, setup_master_data):
+        """Test calon approved jalur SNBT per fakultas"""
+        self._setup_data()
+        
+        response = client.get(
+            "/api/pmb/stats/cube?group_by=fakultas&status_filter=approved&jalur_masuk=SNBT"
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 3
+        assert data["cells"] == [
+            {"fakultas": "MIPA", "count": 1},
+            {"fakultas": "Teknik", "count": 2},
+        ]
+    
+    def test_roll_up_matches_stats(self, setup_master_data):
+        """Test roll-up per status sama dengan /stats"""
+        self._setup_data()
+        
+        cube = client.get("/api/pmb/stats/cube?group_by=status").json()
+        stats = client.get("/api/pmb/stats").json()
+        by_status = {cell["status"]: cell["count"] for cell in cube["cells"]}
+        assert cube["total"] == stats["total_pendaftar"]
+        assert by_status == {"approved": stats["approved"], "rejected": stats["rejected"]}
+        
+        year = datetime.utcnow().year
+        by_year = client.get(f"/api/pmb/stats/cube?group_by=tahun,status&tahun={year}").json()
+        assert by_year["total"] == 5
+    
+    def test_cube_reflects_changes_and_rebuild(self, setup_master_data):
+        """Test cube ter-update setelah approve dan rebuild menghasilkan cube yang sama"""
+        calon_id = self._register(0)
+        assert client.get("/api/pmb/stats/cube?status_filter=pending").json()["total"] == 1
+        client.put(f"/api/pmb/approve/{calon_id}", json={})
+        before = client.get("/api/pmb/stats/cube?group_by=status,program_studi").json()
+        assert before["cells"] == [{"status": "approved", "program_studi": "001", "count": 1}]
+        
+        response = client.post("/api/pmb/stats/cube/rebuild")
+        assert response.status_code == 200
+        after = client.get("/api/pmb/stats/cube?group_by=status,program_studi").json()
+        assert after == before
+    
+    def test_backfill_empty_cube(self, setup_master_data):
+        """Test cube yang kosong (database lama) diisi ulang dari calon_mahasiswa saat startup"""
+        self._setup_data()
+        expected = client.get("/api/pmb/stats/cube?group_by=status,program_studi").json()
+        
+        db = TestingSessionLocal()
+        try:
+            db.query(StatsCubeCell).delete()
+            db.commit()
+        finally:
+            db.close()
+        response_cache.clear()
+        assert client.get("/api/pmb/stats/cube").json()["total"] == 0
+        
+        assert ensure_stats_cube(engine) > 0
+        response_cache.clear()
+        assert client.get("/api/pmb/stats/cube?group_by=status,program_studi").json() == expected
+        # Cube sudah terisi: tidak dihitung ulang
+        assert ensure_stats_cube(engine) == 0
+    
+    def test_changes_applied_in_place(self, setup_master_data):
+        """Test approve / reject memperbarui cube yang sudah dimuat tanpa memuat ulang tabel stats_cube"""
+        ids = [self._register(0), self._register(1)]
+        assert client.get("/api/pmb/stats/cube?status_filter=pending").json()["total"] == 2
+        statements = []
+        
+        def capture(conn, cursor, statement, *args):
+            if "FROM stats_cube" in statement:
+                statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.put(f"/api/pmb/approve/{ids[0]}", json={})
+            client.post(f"/api/pmb/reject/{ids[1]}")
+            self._register(2)
+            cells = client.get("/api/pmb/stats/cube?group_by=status").json()["cells"]
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        
+        assert statements == []
+        assert cells == [
+            {"status": "approved", "count": 1},
+            {"status": "pending", "count": 1},
+            {"status": "rejected", "count": 1},
+        ]
+    
+    def test_query_does_not_group_applicant_table(self, setup_master_data):
+        """Test query cube tidak menjalankan GROUP BY atas calon_mahasiswa"""
+        self._register(0)
+        statements = []
+        
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.get("/api/pmb/stats/cube?group_by=fakultas")
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        
+        assert statements
+        assert not any("calon_mahasiswa" in statement for statement in statements)
+    
+    def test_invalid_dimension(self, setup_master_data):
+        """Test dimensi group_by tidak valid"""
+        assert client.get("/api/pmb/stats/cube?group_by=kota").status_code == 400
+
+
+class TestLiveFeed:
+    """Test delta live feed dari register/approve/reject"""
+    
+    def test_state_changes_publish_deltas(self, setup_master_data, monkeypatch):
+        """Test setiap perubahan status mem-publish delta statistik"""
+        published = []
+        monkeypatch.setattr("app.routers.pmb.live_feed.publish", published.append)
+        
+        calon_id = client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": "Calon Live",
+                "email": "live@email.com",
+                "phone": "082123456789",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+        client.put(f"/api/pmb/approve/{calon_id}", json={})
+        
+        # Subscriber sync: delta sudah sampai ke live feed saat response dikirim
+        assert published == [
+            {
+                "pending": 1,
+                "total_pendaftar": 1,
+                "program_studi_counts": {"Teknik Informatika": 1},
+                "jalur_masuk_counts": {"Seleksi Nasional Berbasis Prestasi": 1},
+            },
+            {"approved": 1, "pending": -1},
+        ]
+
+
+class TestApprovalNotification:
+    """Test outbox notifikasi approval"""
+    
+    def test_approve_writes_outbox_row(self, setup_master_data):
+        """Test approve menulis satu notifikasi di outbox, approve ulang tidak menambah"""
+        calon_id = client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": "Calon Notif",
+                "email": "notif@email.com",
+                "phone": "082123456789",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+        nim = client.put(f"/api/pmb/approve/{calon_id}", json={}).json()["nim"]
+        client.put(f"/api/pmb/approve/{calon_id}", json={})
+        
+        db = TestingSessionLocal()
+        try:
+            notifications = db.query(NotificationOutbox).all()
+            assert len(notifications) == 1
+            assert notifications[0].recipient == "notif@email.com"
+            assert nim in notifications[0].body
+            assert notifications[0].status == OutboxStatus.PENDING
+        finally:
+            db.close()
+        
+        metrics = client.get("/metrics").json()["notification_outbox"]
+        assert metrics["queue_depth"] == 1
+        assert metrics["oldest_pending_age_seconds"] >= 0
+
+
+class TestJobs:
+    """Test API job background admin"""
+    
+    def _register(self, idx, program_studi_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon {idx}",
+                "email": f"calon{idx}@email.com",
+                "phone": f"0821234567{idx:02d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def _run(self, type, params=None):
+        response = client.post("/api/jobs", json={"type": type, "params": params or {}})
+        assert response.status_code == 202
+        assert get_job_runner(engine).wait_idle(timeout=10)
+        return client.get(f"/api/jobs/{response.json()['id']}").json()
+    
+    def test_bulk_approve_job(self, setup_master_data):
+        """Test bulk approve per program studi lewat job"""
+        ids = [self._register(0), self._register(1), self._register(2, program_studi_id=2)]
+        
+        job = self._run("bulk_approve", {"program_studi_id": 1})
+        
+        assert job["status"] == "succeeded"
+        assert job["result"] == {"approved": 2, "failed": {}}
+        assert job["progress"] == 100.0
+        statuses = [client.get(f"/api/pmb/status/{calon_id}").json()["status"] for calon_id in ids]
+        assert statuses == ["approved", "approved", "pending"]
+    
+    def test_export_job_and_download(self, setup_master_data, monkeypatch, tmp_path):
+        """Test export CSV lewat job dan download hasilnya"""
+        monkeypatch.setattr("app.utils.jobs.settings.JOB_EXPORT_DIR", str(tmp_path))
+        self._register(0)
+        self._register(1)
+        
+        job = self._run("export_calon", {"status": "pending"})
+        assert job["result"]["rows"] == 2
+        
+        response = client.get(f"/api/jobs/{job['id']}/download")
+        assert response.status_code == 200
+        lines = response.text.strip().splitlines()
+        assert lines[0].startswith("id,nama_lengkap,email")
+        assert len(lines) == 3
+    
+    def test_rebuild_stats_cube_job_listed(self, setup_master_data):
+        """Test job rekomputasi tercatat di daftar job"""
+        self._register(0)
+        job = self._run("rebuild_stats_cube")
+        assert job["result"] == {"cells": 1}
+        
+        jobs = client.get("/api/jobs?type=rebuild_stats_cube").json()
+        assert [j["id"] for j in jobs] == [job["id"]]
+    
+    def test_invalid_job_requests(self, setup_master_data):
+        """Test tipe job tidak dikenal, params tidak valid dan job tidak ditemukan"""
+        assert client.post("/api/jobs", json={"type": "hapus_semua"}).status_code == 400
+        assert client.post(
+            "/api/jobs", json={"type": "bulk_approve", "params": {"program_studi_id": "satu"}}
+        ).status_code == 400
+        assert client.get("/api/jobs/tidak-ada").status_code == 404
+
+
+class TestDokumen:
+    """Test upload dan download dokumen calon mahasiswa"""
+    
+    PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+    PDF = b"%PDF-1.4\n" + b"isi ijazah " * 500
+    
+    @pytest.fixture(autouse=True)
+    def upload_dir(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.routers.pmb.settings.UPLOAD_DIR", str(tmp_path))
+        return tmp_path
+    
+    def _register(self):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": "Calon Dokumen",
+                "email": "dokumen@email.com",
+                "phone": "082123456789",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def _upload(self, calon_id, jenis, content, content_type):
+        return client.put(
+            f"/api/pmb/dokumen/{calon_id}/{jenis}?filename={jenis}.bin",
+            content=content,
+            headers={"Content-Type": content_type}
+        )
+    
+    def test_upload_and_download(self, setup_master_data):
+        """Test upload streaming menyimpan metadata + checksum dan file bisa di-download"""
+        calon_id = self._register()
+        
+        response = self._upload(calon_id, "foto", self.PNG, "image/png")
+        assert response.status_code == 201
+        data = response.json()
+        assert data["size_bytes"] == len(self.PNG)
+        assert data["sha256"] == hashlib.sha256(self.PNG).hexdigest()
+        assert data["content_type"] == "image/png"
+        
+        response = client.get(f"/api/pmb/dokumen/{calon_id}/foto")
+        assert response.status_code == 200
+        assert response.content == self.PNG
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == f'"{data["sha256"]}"'
+        
+        listing = client.get(f"/api/pmb/dokumen/{calon_id}").json()
+        assert [d["jenis"] for d in listing] == ["foto"]
+    
+    def test_range_requests(self, setup_master_data):
+        """Test download sebagian dengan header Range"""
+        calon_id = self._register()
+        self._upload(calon_id, "ijazah", self.PDF, "application/pdf")
+        size = len(self.PDF)
+        
+        response = client.get(f"/api/pmb/dokumen/{calon_id}/ijazah", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206
+        assert response.content == self.PDF[:10]
+        assert response.headers["content-range"] == f"bytes 0-9/{size}"
+        
+        response = client.get(f"/api/pmb/dokumen/{calon_id}/ijazah", headers={"Range": "bytes=-5"})
+        assert response.content == self.PDF[-5:]
+        
+        response = client.get(f"/api/pmb/dokumen/{calon_id}/ijazah", headers={"Range": "bytes=100-"})
+        assert response.content == self.PDF[100:]
+        
+        response = client.get(f"/api/pmb/dokumen/{calon_id}/ijazah", headers={"Range": f"bytes={size}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{size}"
+    
+    def test_reupload_replaces_file(self, setup_master_data, upload_dir):
+        """Test upload ulang mengganti dokumen dan menghapus file lama"""
+        calon_id = self._register()
+        self._upload(calon_id, "kk", self.PDF, "application/pdf")
+        response = self._upload(calon_id, "kk", self.PNG, "image/png")
+        
+        assert response.status_code == 201
+        assert client.get(f"/api/pmb/dokumen/{calon_id}/kk").content == self.PNG
+        assert len(list((upload_dir / str(calon_id)).iterdir())) == 1
+    
+    def test_concurrent_upload_conflict(self, setup_master_data, upload_dir):
+        """Test upload bersamaan untuk jenis yang sama ditolak 409, bukan 500"""
+        calon_id = self._register()
+        competing = []
+        
+        def other_upload_commits_first(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO dokumen_calon") and not competing:
+                competing.append(True)
+                with engine.begin() as other:
+                    other.exec_driver_sql(
+                        "INSERT INTO dokumen_calon (calon_mahasiswa_id, jenis, content_type, size_bytes,"
+                        " sha256, storage_path, created_at, updated_at)"
+                        " VALUES (?, 'KK', 'application/pdf', 1, ?, 'lain.pdf', '2025-01-01', '2025-01-01')",
+                        (calon_id, "0" * 64)
+                    )
+        
+        event.listen(engine, "before_cursor_execute", other_upload_commits_first)
+        try:
+            response = self._upload(calon_id, "kk", self.PDF, "application/pdf")
+        finally:
+            event.remove(engine, "before_cursor_execute", other_upload_commits_first)
+        
+        assert response.status_code == 409
+        assert list((upload_dir / str(calon_id)).iterdir()) == []
+        assert [d["sha256"] for d in client.get(f"/api/pmb/dokumen/{calon_id}").json()] == ["0" * 64]
+    
+    def test_size_limit(self, setup_master_data, monkeypatch, upload_dir):
+        """Test upload melebihi batas ditolak 413 tanpa meninggalkan file"""
+        monkeypatch.setattr("app.routers.pmb.settings.UPLOAD_MAX_BYTES", 1000)
+        calon_id = self._register()
+        
+        assert self._upload(calon_id, "foto", self.PNG, "image/png").status_code == 413
+        
+        # Tanpa Content-Length (chunked): batas dicek saat streaming
+        chunks = (self.PNG[i:i + 512] for i in range(0, len(self.PNG), 512))
+        response = client.put(
+            f"/api/pmb/dokumen/{calon_id}/foto", content=chunks, headers={"Content-Type": "image/png"}
+        )
+        assert response.status_code == 413
+        assert list(upload_dir.rglob("*.*")) == []
+        assert client.get(f"/api/pmb/dokumen/{calon_id}").json() == []
+    
+    def test_type_checks(self, setup_master_data):
+        """Test tipe file dicek dari isi file, bukan hanya Content-Type"""
+        calon_id = self._register()
+        
+        assert self._upload(calon_id, "foto", b"bukan gambar sama sekali", "image/png").status_code == 415
+        assert self._upload(calon_id, "foto", self.PDF, "application/pdf").status_code == 415
+        assert self._upload(calon_id, "ijazah", self.PNG, "application/pdf").status_code == 415
+        assert self._upload(calon_id, "raport", self.PNG, "image/png").status_code == 422
+        assert self._upload(9999, "foto", self.PNG, "image/png").status_code == 404
+
+
+class TestChanges:
+    """Test feed perubahan calon mahasiswa (change data capture)"""
+    
+    def _register(self, idx):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Change {idx}",
+                "email": f"change{idx}@email.com",
+                "phone": f"08212345{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def _all_changes(self, since=None, limit=100):
+        params = {"limit": limit}
+        if since:
+            params["since"] = since
+        return client.get("/api/pmb/changes", params=params).json()
+    
+    def test_changes_follow_write_order(self, setup_master_data):
+        """Test insert dan update (termasuk NIM) muncul berurutan dengan versi terbaru"""
+        ids = [self._register(i) for i in range(3)]
+        
+        first = self._all_changes()
+        assert [c["id"] for c in first["changes"]] == ids
+        assert first["has_more"] is False
+        seqs = [c["change_seq"] for c in first["changes"]]
+        assert seqs == sorted(seqs)
+        
+        client.put(f"/api/pmb/approve/{ids[0]}", json={})
+        client.post(f"/api/pmb/reject/{ids[1]}")
+        
+        data = self._all_changes(since=first["next_cursor"])
+        assert [c["id"] for c in data["changes"]] == [ids[0], ids[1]]
+        approved, rejected = data["changes"]
+        assert approved["status"] == "approved"
+        assert approved["nim"] is not None
+        assert rejected["status"] == "rejected"
+        assert approved["change_seq"] > seqs[-1]
+        
+        # Tidak ada perubahan baru: cursor tetap
+        empty = self._all_changes(since=data["next_cursor"])
+        assert empty["changes"] == []
+        assert empty["next_cursor"] == data["next_cursor"]
+    
+    def test_paging(self, setup_master_data):
+        """Test pagination dengan next_cursor dan has_more"""
+        ids = [self._register(i) for i in range(5)]
+        
+        seen = []
+        cursor = None
+        while True:
+            data = self._all_changes(since=cursor, limit=2)
+            seen.extend(c["id"] for c in data["changes"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+        
+        assert seen == ids
+    
+    def test_unchanged_row_not_restamped(self, setup_master_data):
+        """Test membaca / flush tanpa perubahan tidak memberi change_seq baru"""
+        calon_id = self._register(0)
+        cursor = self._all_changes()["next_cursor"]
+        
+        db = TestingSessionLocal()
+        calon = db.get(CalonMahasiswa, calon_id)
+        calon.nama_lengkap = calon.nama_lengkap
+        db.commit()
+        db.close()
+        client.get(f"/api/pmb/status/{calon_id}")
+        
+        assert self._all_changes(since=cursor)["changes"] == []
+    
+    def test_invalid_cursor_and_limit(self, setup_master_data):
+        """Test cursor tidak valid dan limit berlebih ditolak"""
+        assert client.get("/api/pmb/changes?since=abc").status_code == 400
+        assert client.get("/api/pmb/changes?since=1:x").status_code == 400
+        assert client.get("/api/pmb/changes?limit=100000").status_code == 400
+
+
+class TestStatusTransitions:
+    """Test transisi status dengan UPDATE bersyarat (tanpa lost update)"""
+    
+    def _register(self, idx):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Transisi {idx}",
+                "email": f"transisi{idx}@email.com",
+                "phone": f"08213345{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": 1
+            }
+        ).json()["id"]
+    
+    def test_reject_after_approve_conflicts(self, setup_master_data):
+        """Test reject tidak menimpa calon yang sudah di-approve"""
+        calon_id = self._register(0)
+        nim = client.put(f"/api/pmb/approve/{calon_id}", json={}).json()["nim"]
+        
+        response = client.post(f"/api/pmb/reject/{calon_id}")
+        assert response.status_code == 409
+        assert "approved" in response.json()["detail"]
+        
+        data = client.get(f"/api/pmb/status/{calon_id}").json()
+        assert data["status"] == "approved"
+        assert data["nim"] == nim
+    
+    def test_approve_after_reject_conflicts(self, setup_master_data):
+        """Test calon yang sudah di-reject tidak bisa di-approve, reject ulang idempotent"""
+        calon_id = self._register(0)
+        assert client.post(f"/api/pmb/reject/{calon_id}").status_code == 200
+        assert client.post(f"/api/pmb/reject/{calon_id}").status_code == 200
+        
+        response = client.put(f"/api/pmb/approve/{calon_id}", json={})
+        assert response.status_code == 409
+        assert client.get(f"/api/pmb/status/{calon_id}").json()["nim"] is None
+        assert client.get("/api/pmb/stats").json()["rejected"] == 1
+    
+    def test_stale_read_does_not_overwrite(self, setup_master_data):
+        """Test admin dengan data lama (masih pending) kalah dari transisi yang sudah commit"""
+        calon_id = self._register(0)
+        
+        stale_db = TestingSessionLocal()
+        try:
+            stale = stale_db.get(CalonMahasiswa, calon_id)
+            assert stale.status == StatusPendaftaran.PENDING
+            
+            client.put(f"/api/pmb/approve/{calon_id}", json={})
+            
+            with pytest.raises(StatusConflict) as excinfo:
+                reject_calon(stale_db, stale)
+            assert excinfo.value.current_status == StatusPendaftaran.APPROVED
+        finally:
+            stale_db.close()
+        
+        assert client.get(f"/api/pmb/status/{calon_id}").json()["status"] == "approved"
+        stats = client.get("/api/pmb/stats").json()
+        assert stats["approved"] == 1
+        assert stats["rejected"] == 0
+    
+    def test_concurrent_approvals_get_unique_nims(self, setup_master_data):
+        """Test approve paralel di prodi yang sama tetap mendapat NIM unik tanpa lock global"""
+        ids = [self._register(i) for i in range(6)]
+        errors = []
+        
+        def approve(calon_id):
+            db = TestingSessionLocal()
+            try:
+                approve_calon(db, db.get(CalonMahasiswa, calon_id))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.close()
+        
+        threads = [threading.Thread(target=approve, args=(calon_id,)) for calon_id in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        nims = [client.get(f"/api/pmb/status/{calon_id}").json()["nim"] for calon_id in ids]
+        assert len(set(nims)) == len(ids)
+        assert sorted(int(nim[-4:]) for nim in nims) == list(range(1, len(ids) + 1))
+
+
+class TestBulkReject:
+    """Test reject massal calon pending berdasarkan filter"""
+    
+    def _register(self, idx, program_studi_id=1, jalur_masuk_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Massal {idx}",
+                "email": f"massal{idx}@email.com",
+                "phone": f"08214345{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": jalur_masuk_id
+            }
+        ).json()["id"]
+    
+    def test_dry_run_then_reject(self, setup_master_data):
+        """Test dry run hanya menghitung, reject mengubah semua pending yang cocok sekaligus"""
+        ids = [
+            self._register(0),
+            self._register(1),
+            self._register(2, jalur_masuk_id=2),
+            self._register(3, program_studi_id=2),
+        ]
+        client.put(f"/api/pmb/approve/{ids[1]}", json={})
+        # Isi cache status agar terlihat di-invalidate
+        assert client.get(f"/api/pmb/status/{ids[0]}").json()["status"] == "pending"
+        
+        dry = client.post("/api/pmb/bulk/reject", json={"program_studi_id": 1, "dry_run": True}).json()
+        assert dry["dry_run"] is True
+        assert dry["affected"] == 2
+        assert dry["skipped"] == 1
+        assert dry["groups"] == [
+            {"program_studi_id": 1, "jalur_masuk_id": 1, "count": 1},
+            {"program_studi_id": 1, "jalur_masuk_id": 2, "count": 1},
+        ]
+        assert client.get("/api/pmb/stats").json()["rejected"] == 0
+        
+        result = client.post("/api/pmb/bulk/reject", json={"program_studi_id": 1}).json()
+        assert result["affected"] == 2
+        assert result["skipped"] == 1
+        assert result["groups"] == dry["groups"]
+        
+        statuses = [client.get(f"/api/pmb/status/{calon_id}").json()["status"] for calon_id in ids]
+        assert statuses == ["rejected", "approved", "rejected", "pending"]
+        
+        stats = client.get("/api/pmb/stats").json()
+        assert (stats["pending"], stats["approved"], stats["rejected"]) == (1, 1, 2)
+        cube = client.get("/api/pmb/stats/cube?group_by=status").json()
+        assert {c["status"]: c["count"] for c in cube["cells"]} == {"pending": 1, "approved": 1, "rejected": 2}
+        
+        # Satu change_seq untuk semua baris dari UPDATE yang sama
+        changes = client.get("/api/pmb/changes").json()["changes"]
+        rejected = [c for c in changes if c["status"] == "rejected"]
+        assert [c["id"] for c in rejected] == [ids[0], ids[2]]
+        assert rejected[0]["change_seq"] == rejected[1]["change_seq"]
+        
+        # Semua yang cocok sudah diproses: dilewati, bukan tidak ditemukan
+        again = client.post("/api/pmb/bulk/reject", json={"program_studi_id": 1}).json()
+        assert (again["affected"], again["skipped"]) == (0, 3)
+        none = client.post("/api/pmb/bulk/reject", json={"program_studi_id": 3}).json()
+        assert (none["affected"], none["skipped"]) == (0, 0)
+    
+    def test_created_range_and_jalur_filter(self, setup_master_data):
+        """Test filter jalur dan rentang created_at"""
+        old_id = self._register(0, jalur_masuk_id=3)
+        new_id = self._register(1, jalur_masuk_id=3)
+        db = TestingSessionLocal()
+        db.get(CalonMahasiswa, old_id).created_at = datetime(2024, 1, 10)
+        db.commit()
+        db.close()
+        
+        response = client.post(
+            "/api/pmb/bulk/reject",
+            json={"jalur_masuk_id": 3, "created_to": "2025-01-01T00:00:00"}
+        )
+        assert response.json()["affected"] == 1
+        assert client.get(f"/api/pmb/status/{old_id}").json()["status"] == "rejected"
+        assert client.get(f"/api/pmb/status/{new_id}").json()["status"] == "pending"
+    
+    def test_filter_required(self, setup_master_data):
+        """Test reject massal tanpa filter prodi / jalur ditolak"""
+        self._register(0)
+        response = client.post("/api/pmb/bulk/reject", json={"created_to": "2100-01-01T00:00:00"})
+        assert response.status_code == 400
+        assert client.get("/api/pmb/stats").json()["rejected"] == 0
+
+
+class TestKuota:
+    """Test kuota penerimaan per program studi x jalur masuk"""
+    
+    def _register(self, idx, jalur_masuk_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Kuota {idx}",
+                "email": f"kuota{idx}@email.com",
+                "phone": f"08215345{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": 1,
+                "jalur_masuk_id": jalur_masuk_id
+            }
+        ).json()["id"]
+    
+    def _set_kuota(self, kapasitas, jalur_masuk_id=1):
+        return client.put(
+            "/api/master/kuota",
+            json={"program_studi_id": 1, "jalur_masuk_id": jalur_masuk_id, "kapasitas": kapasitas}
+        )
+    
+    def test_approve_stops_at_capacity(self, setup_master_data):
+        """Test approve ditolak 409 setelah kuota penuh, kursi tidak bocor"""
+        assert self._set_kuota(2).status_code == 200
+        ids = [self._register(i) for i in range(3)]
+        other_jalur = self._register(3, jalur_masuk_id=2)
+        
+        for calon_id in ids[:2]:
+            assert client.put(f"/api/pmb/approve/{calon_id}", json={}).status_code == 200
+        response = client.put(f"/api/pmb/approve/{ids[2]}", json={})
+        assert response.status_code == 409
+        assert "penuh" in response.json()["detail"]
+        
+        data = client.get(f"/api/pmb/status/{ids[2]}").json()
+        assert (data["status"], data["nim"]) == ("pending", None)
+        # Jalur tanpa kuota tidak dibatasi
+        assert client.put(f"/api/pmb/approve/{other_jalur}", json={}).status_code == 200
+        
+        kuota = client.get("/api/master/kuota?program_studi_id=1").json()
+        assert [(k["jalur_masuk_id"], k["kapasitas"], k["terisi"], k["sisa"]) for k in kuota] == [(1, 2, 2, 0)]
+        
+        # Kapasitas dinaikkan: calon berikutnya bisa di-approve
+        assert self._set_kuota(3).json()["sisa"] == 1
+        assert client.put(f"/api/pmb/approve/{ids[2]}", json={}).status_code == 200
+    
+    def test_new_quota_counts_existing_approvals(self, setup_master_data):
+        """Test kuota baru menghitung calon yang sudah approved, kapasitas di bawahnya ditolak"""
+        ids = [self._register(i) for i in range(2)]
+        for calon_id in ids:
+            client.put(f"/api/pmb/approve/{calon_id}", json={})
+        
+        assert self._set_kuota(1).status_code == 400
+        assert client.get("/api/master/kuota").json() == []
+        assert self._set_kuota(2).json()["terisi"] == 2
+        assert client.put("/api/master/kuota", json={
+            "program_studi_id": 99, "jalur_masuk_id": 1, "kapasitas": 5
+        }).status_code == 404
+    
+    def test_concurrent_approvals_respect_capacity(self, setup_master_data):
+        """Test approve paralel tidak melewati kapasitas"""
+        self._set_kuota(3)
+        ids = [self._register(i) for i in range(6)]
+        outcomes = []
+        
+        def approve(calon_id):
+            db = TestingSessionLocal()
+            try:
+                approve_calon(db, db.get(CalonMahasiswa, calon_id))
+                outcomes.append("approved")
+            except KuotaPenuh:
+                outcomes.append("penuh")
+            finally:
+                db.close()
+        
+        threads = [threading.Thread(target=approve, args=(calon_id,)) for calon_id in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(outcomes) == ["approved"] * 3 + ["penuh"] * 3
+        assert client.get("/api/pmb/stats").json()["approved"] == 3
+        assert client.get("/api/master/kuota").json()[0]["terisi"] == 3
+
+
+class TestSeleksi:
+    """Test seleksi berbasis skor dengan beberapa pilihan prodi"""
+    
+    def _register(self, idx, program_studi_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Seleksi {idx}",
+                "email": f"seleksi{idx}@email.com",
+                "phone": f"08216345{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": 2
+            }
+        ).json()["id"]
+    
+    def _run(self, params):
+        response = client.post("/api/jobs", json={"type": "seleksi", "params": params})
+        assert response.status_code == 202
+        assert get_job_runner(engine).wait_idle(timeout=10)
+        job = client.get(f"/api/jobs/{response.json()['id']}").json()
+        assert job["status"] == "succeeded", job
+        return job["result"]
+    
+    def _setup(self):
+        for prodi, kapasitas in ((1, 1), (2, 2)):
+            client.put("/api/master/kuota", json={
+                "program_studi_id": prodi, "jalur_masuk_id": 2, "kapasitas": kapasitas
+            })
+        ids = [self._register(i) for i in range(5)]
+        # skor, pilihan
+        data = [(90, [1, 2]), (80, [1, 2]), (70, [1, 3]), (85, []), (60, [2])]
+        for calon_id, (skor, pilihan) in zip(ids, data):
+            response = client.put(f"/api/pmb/seleksi/{calon_id}", json={"skor": skor, "pilihan": pilihan})
+            assert response.status_code == 200
+        return ids
+    
+    def test_dry_run_does_not_write(self, setup_master_data):
+        """Test dry run hanya menghitung alokasi"""
+        self._setup()
+        result = self._run({"jalur_masuk_id": 2, "dry_run": True})
+        
+        assert result["pelamar"] == 5
+        assert result["diterima"] == 3
+        assert result["per_prodi"] == {"1": 1, "2": 2}
+        assert client.get("/api/pmb/stats").json()["approved"] == 0
+    
+    def test_selection_applies_stable_allocation(self, setup_master_data):
+        """Test hasil seleksi diterapkan sebagai approve massal dengan blok NIM per prodi"""
+        ids = self._setup()
+        result = self._run({"jalur_masuk_id": 2})
+        assert result["diterima"] == 3
+        assert result["per_pilihan"] == {"1": 2, "2": 1}
+        
+        status_of = {calon_id: client.get(f"/api/pmb/status/{calon_id}").json() for calon_id in ids}
+        # Skor 90 -> prodi 1 (pilihan 1); skor 85 tanpa pilihan -> prodi daftar (1) penuh;
+        # skor 80 -> prodi 2 (pilihan 2); skor 70 -> prodi 1 penuh, prodi 3 tanpa kuota; skor 60 -> prodi 2
+        assert [status_of[calon_id]["status"] for calon_id in ids] == [
+            "approved", "approved", "pending", "pending", "approved"
+        ]
+        # Prodi daftar tetap tersimpan, prodi hasil seleksi di program_studi_diterima
+        assert all(status_of[calon_id]["program_studi"]["id"] == 1 for calon_id in ids)
+        assert status_of[ids[0]]["program_studi_diterima"]["id"] == 1
+        assert status_of[ids[1]]["program_studi_diterima"]["id"] == 2
+        assert status_of[ids[2]]["program_studi_diterima"] is None
+        year = datetime.now().year
+        assert status_of[ids[0]]["nim"] == f"{year}001-0001"
+        assert [status_of[ids[1]]["nim"], status_of[ids[4]]["nim"]] == [f"{year}002-0001", f"{year}002-0002"]
+        
+        kuota = {k["program_studi_id"]: k["sisa"] for k in client.get("/api/master/kuota").json()}
+        assert kuota == {1: 0, 2: 0}
+        
+        # Counter turunan konsisten dengan data
+        stats = client.get("/api/pmb/stats").json()
+        assert (stats["approved"], stats["pending"]) == (3, 2)
+        cube = client.get("/api/pmb/stats/cube?group_by=status,program_studi").json()
+        cells = {(c["status"], c["program_studi"]): c["count"] for c in cube["cells"]}
+        # Cube dan rollup dikelompokkan per prodi daftar
+        assert cells == {("approved", "001"): 3, ("pending", "001"): 2}
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(NotificationOutbox).count() == 3
+        finally:
+            db.close()
+        
+        # Dijalankan ulang: tidak ada kursi tersisa
+        assert self._run({"jalur_masuk_id": 2})["diterima"] == 0
+    
+    def test_allocation_recomputed_when_pool_changes(self, setup_master_data, monkeypatch):
+        """Test alokasi dihitung tanpa lock lalu diulang jika pool berubah sebelum diterapkan"""
+        from app.utils import seleksi
+        ids = self._setup()
+        calls = []
+        
+        def allocate(pelamar, kapasitas):
+            if not calls:
+                # Writer lain meng-approve calon skor 90 selama alokasi pertama
+                other = TestingSessionLocal()
+                try:
+                    approve_calon(other, other.get(CalonMahasiswa, ids[0]))
+                finally:
+                    other.close()
+            calls.append(len(pelamar))
+            return original(pelamar, kapasitas)
+        
+        original = seleksi.allocate
+        monkeypatch.setattr(seleksi, "allocate", allocate)
+        db = TestingSessionLocal()
+        try:
+            result = seleksi.run_seleksi(db, 2)
+        finally:
+            db.close()
+        
+        assert calls == [5, 4]
+        # Kursi prodi 1 sudah dipakai calon yang di-approve langsung
+        assert result["diterima"] == 2
+        assert result["per_prodi"] == {"2": 2}
+        stats = client.get("/api/pmb/stats").json()
+        assert (stats["approved"], stats["pending"]) == (3, 2)
+    
+    def test_seleksi_input_validation(self, setup_master_data):
+        """Test validasi skor dan pilihan prodi"""
+        calon_id = self._register(0)
+        url = f"/api/pmb/seleksi/{calon_id}"
+        
+        assert client.put(url, json={"skor": 50, "pilihan": [1, 1]}).status_code == 422
+        assert client.put(url, json={"skor": -1}).status_code == 422
+        assert client.put(url, json={"skor": 50, "pilihan": [1, 99]}).status_code == 400
+        assert client.put(url, json={"skor": 50, "pilihan": [1, 2, 3, 1 + 3]}).status_code == 400
+        assert client.put(url, json={"skor": 50, "pilihan": [2, 3]}).status_code == 200
+        assert client.put(url, json={"skor": 55, "pilihan": [3]}).json() == {
+            "calon_id": calon_id, "skor": 55.0, "pilihan": [3]
+        }
+        assert client.get(f"/api/pmb/status/{calon_id}").json()["skor"] == 55.0
+        
+        client.post(f"/api/pmb/reject/{calon_id}")
+        assert client.put(url, json={"skor": 60}).status_code == 409
+        assert client.post("/api/jobs", json={"type": "seleksi", "params": {}}).status_code == 400
+
+
+class TestRank:
+    """Test peringkat calon per prodi x jalur dari index order-statistic"""
+    
+    def _register(self, idx, program_studi_id=1):
+        return client.post(
+            "/api/pmb/register",
+            json={
+                "nama_lengkap": f"Calon Rank {idx}",
+                "email": f"rank{idx}@email.com",
+                "phone": f"08216346{idx:04d}",
+                "tanggal_lahir": "2005-01-15",
+                "alamat": "Jl. Test",
+                "program_studi_id": program_studi_id,
+                "jalur_masuk_id": 2
+            }
+        ).json()["id"]
+    
+    def _skor(self, calon_id, skor, pilihan=()):
+        response = client.put(f"/api/pmb/seleksi/{calon_id}", json={"skor": skor, "pilihan": list(pilihan)})
+        assert response.status_code == 200
+    
+    def test_rank_per_pilihan(self, setup_master_data):
+        """Test peringkat di setiap prodi pilihan, skor sama diurutkan berdasarkan ID"""
+        ids = [self._register(i) for i in range(4)]
+        self._skor(ids[0], 70, [1, 2])
+        self._skor(ids[1], 90, [2])
+        self._skor(ids[2], 70)
+        self._skor(ids[3], 80, [1])
+        
+        data = client.get(f"/api/pmb/rank/{ids[0]}").json()
+        assert data["skor"] == 70.0
+        assert data["jalur_masuk_id"] == 2
+        # Prodi 1: 80 (ids[3]), 70 (ids[0]), 70 (ids[2]); prodi 2: 90 (ids[1]), 70 (ids[0])
+        assert data["peringkat"] == [
+            {"urutan": 1, "program_studi_id": 1, "rank": 2, "total": 3},
+            {"urutan": 2, "program_studi_id": 2, "rank": 2, "total": 2},
+        ]
+        assert client.get(f"/api/pmb/rank/{ids[2]}").json()["peringkat"][0]["rank"] == 3
+        
+        top = client.get("/api/pmb/rank/top", params={
+            "program_studi_id": 1, "jalur_masuk_id": 2, "limit": 2
+        }).json()
+        assert top["total"] == 3
+        assert [(item["rank"], item["calon_id"], item["skor"]) for item in top["items"]] == [
+            (1, ids[3], 80.0), (2, ids[0], 70.0)
+        ]
+    
+    def test_rank_follows_score_and_status_changes(self, setup_master_data):
+        """Test index diperbarui saat skor berubah dan calon keluar dari pending"""
+        ids = [self._register(i) for i in range(3)]
+        for calon_id, skor in zip(ids, (50, 60, 70)):
+            self._skor(calon_id, skor)
+        assert client.get(f"/api/pmb/rank/{ids[0]}").json()["peringkat"][0]["rank"] == 3
+        
+        self._skor(ids[0], 99)
+        assert client.get(f"/api/pmb/rank/{ids[0]}").json()["peringkat"][0]["rank"] == 1
+        
+        client.post(f"/api/pmb/reject/{ids[2]}")
+        data = client.get(f"/api/pmb/rank/{ids[1]}").json()
+        assert data["peringkat"][0] == {"urutan": 1, "program_studi_id": 1, "rank": 2, "total": 2}
+        assert client.get(f"/api/pmb/rank/{ids[2]}").status_code == 404
+        
+        # Index yang dibangun ulang dari database memberi hasil yang sama
+        assert client.post("/api/pmb/rank/rebuild").json()["calon"] == 2
+        assert client.get(f"/api/pmb/rank/{ids[1]}").json()["peringkat"][0]["rank"] == 2
+    
+    def test_rank_not_found(self, setup_master_data):
+        """Test calon tanpa skor atau tidak ada"""
+        calon_id = self._register(0)
+        
+        assert client.get(f"/api/pmb/rank/{calon_id}").status_code == 404
+        assert client.get("/api/pmb/rank/99999").status_code == 404
+        top = client.get("/api/pmb/rank/top", params={"program_studi_id": 1, "jalur_masuk_id": 2}).json()
+        assert top == {"program_studi_id": 1, "jalur_masuk_id": 2, "total": 0, "items": []}
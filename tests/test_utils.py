@@ -1,15 +1,46 @@
+import os
+import random
 import pytest
+import asyncio
 from datetime import date
-from app.utils.nim_generator import generate_nim, validate_nim_format, parse_nim
+from app.utils import nim_generator
+from app.utils.nim_generator import generate_nim, validate_nim_format, parse_nim, parse_nim_batch
+from app.utils.cache import ResponseCache, response_cache, STATS_CUBE_KEY
+from app.utils.stats_cube import cached_cube, record_cube_transition
+from app.utils.singleflight import singleflight
+from app.utils.idempotency import IdempotencyStore, IdempotencyKeyConflict
+from app.utils.rate_limit import TokenBucketLimiter
+from app.utils.concurrency import AIMDLimiter
+from app.utils.write_behind import GroupCommitWriter
+from sqlalchemy.exc import IntegrityError
 from app.utils.validators import (
     validate_email,
     validate_phone_indonesia,
-    normalize_phone
+    normalize_phone,
+    normalize_name,
+    build_name_key
 )
+from app.utils.duplicates import ApplicantRecord, scan_duplicates
+from app.utils.live_feed import LiveFeed, status_delta, RESYNC
+from app.models import StatusPendaftaran
+from app.events import EventBus, ApplicantEvent, Approved, Rejected
+from app.utils.outbox import SMTPSender, OutboxDispatcher, OutgoingNotification, outbox_metrics
+from app.models import NotificationOutbox, OutboxStatus, Job, JobStatus
+from app.utils.jobs import JobRunner, JOB_TYPES, JobType
+from datetime import datetime, timedelta
+import smtplib
+import socketserver
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.database import Base
-from app.models import ProgramStudi, CalonMahasiswa
+from app.models import ProgramStudi, CalonMahasiswa, JalurMasuk
+from app.utils.seleksi import Pelamar, allocate
+from app.utils.ranking import OrderStatisticTree
+from app.utils.migrations import ensure_schema
+from app.utils.backup import BackupError, BackupScheduler, backup_database, list_backups, sqlite_path
+import sqlite3
+import time
 
 # Setup test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_utils.db"
@@ -243,3 +274,1271 @@ class TestValidators:
         """Test normalize nomor dengan format tidak valid"""
         with pytest.raises(ValueError):
             normalize_phone("123456789")
+
+
+# ================== RESPONSE CACHE TESTS ==================
+
+class TestResponseCache:
+    """Test LRU/TTL response cache"""
+    
+    def test_lru_eviction(self):
+        """Test entry paling lama tidak dipakai di-evict"""
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+    
+    def test_ttl_expiry(self):
+        """Test entry expired setelah TTL"""
+        cache = ResponseCache(max_entries=10, ttl_seconds=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+    
+    def test_invalidate_tags(self):
+        """Test invalidasi hanya entry dengan tag terkait"""
+        cache = ResponseCache()
+        cache.set("a", 1, tags=["x"])
+        cache.set("b", 2, tags=["y"])
+        
+        assert cache.invalidate_tags("x") == 1
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+    
+    def test_disabled(self):
+        """Test cache nonaktif tidak menyimpan apapun"""
+        cache = ResponseCache(enabled=False)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["hits"] == 0
+
+
+class TestCachedStatsCube:
+    """Test cube statistik di cache yang di-update in place setelah commit"""
+    
+    @pytest.fixture
+    def cube_db(self, db_with_prodi):
+        db_with_prodi.add(JalurMasuk(kode="SNBT", nama="SNBT"))
+        db_with_prodi.commit()
+        response_cache.clear()
+        yield db_with_prodi
+        response_cache.clear()
+    
+    def _pending(self, db):
+        return cached_cube.get(db).slice({"status": "pending"}, [])
+    
+    def test_commit_applied_rollback_discarded(self, cube_db):
+        """Test perubahan yang commit ditambahkan ke cube, yang rollback dibuang"""
+        prodi = cube_db.query(ProgramStudi).first().id
+        jalur = cube_db.query(JalurMasuk).first().id
+        cube = cached_cube.get(cube_db)
+        
+        record_cube_transition(cube_db, prodi, jalur, 2025, None, StatusPendaftaran.PENDING, count=2)
+        cube_db.commit()
+        record_cube_transition(cube_db, prodi, jalur, 2025, None, StatusPendaftaran.PENDING)
+        cube_db.rollback()
+        
+        assert cached_cube.get(cube_db) is cube
+        assert self._pending(cube_db) == [{"count": 2}]
+    
+    def test_cube_loaded_during_write_not_cached(self, cube_db):
+        """Test cube yang dimuat saat ada transaksi penulis berjalan tidak disimpan di cache"""
+        prodi = cube_db.query(ProgramStudi).first().id
+        jalur = cube_db.query(JalurMasuk).first().id
+        writer = TestingSessionLocal()
+        try:
+            record_cube_transition(writer, prodi, jalur, 2025, None, StatusPendaftaran.PENDING)
+            assert self._pending(cube_db) == []
+            assert response_cache.peek(STATS_CUBE_KEY) is None
+            writer.commit()
+        finally:
+            writer.close()
+        
+        assert self._pending(cube_db) == [{"count": 1}]
+        assert response_cache.peek(STATS_CUBE_KEY) is not None
+
+
+# ================== SINGLE-FLIGHT TESTS ==================
+
+class TestSingleFlight:
+    """Test single-flight request coalescing"""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Test request identik bersamaan hanya dieksekusi sekali"""
+        calls = []
+        
+        @singleflight()
+        async def expensive(x, db=None):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return {"value": x}
+        
+        async def run():
+            return await asyncio.gather(*[expensive(1, db=object()) for _ in range(10)])
+        
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert expensive.singleflight.stats()["coalesced"] == 9
+    
+    def test_different_keys_not_coalesced(self):
+        """Test argumen berbeda dieksekusi terpisah"""
+        calls = []
+        
+        @singleflight()
+        async def expensive(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return x
+        
+        async def run():
+            return await asyncio.gather(expensive(1), expensive(2))
+        
+        assert asyncio.run(run()) == [1, 2]
+        assert sorted(calls) == [1, 2]
+    
+    def test_exception_propagated_to_followers(self):
+        """Test error leader diteruskan ke semua follower"""
+        @singleflight()
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("gagal")
+        
+        async def run():
+            return await asyncio.gather(failing(), failing(), return_exceptions=True)
+        
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+    
+    def test_cancelled_leader_does_not_fail_followers(self):
+        """Test client leader putus: follower tetap mendapat hasil"""
+        @singleflight()
+        async def expensive():
+            await asyncio.sleep(0.05)
+            return "hasil"
+        
+        async def run():
+            leader = asyncio.ensure_future(expensive())
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(expensive())
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            result = await follower
+            assert leader.cancelled()
+            return result
+        
+        assert asyncio.run(run()) == "hasil"
+        assert expensive.singleflight.stats()["in_flight"] == 0
+
+
+# ================== IDEMPOTENCY STORE TESTS ==================
+
+class TestIdempotencyStore:
+    """Test store Idempotency-Key"""
+    
+    def test_concurrent_duplicates_execute_once(self):
+        """Test duplikat bersamaan menunggu pemilik key dan memakai response-nya"""
+        store = IdempotencyStore()
+        executions = []
+        
+        async def handle():
+            stored = await store.begin("key", "fp")
+            if stored is not None:
+                return stored.body
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            store.complete("key", 201, b'{"id": 1}')
+            return b'{"id": 1}'
+        
+        async def run():
+            return await asyncio.gather(*[handle() for _ in range(5)])
+        
+        assert asyncio.run(run()) == [b'{"id": 1}'] * 5
+        assert len(executions) == 1
+        assert store.replays == 4
+    
+    def test_release_lets_waiter_retry(self):
+        """Test jika pemilik gagal, request yang menunggu mengambil alih key"""
+        store = IdempotencyStore()
+        
+        async def run():
+            assert await store.begin("key", "fp") is None
+            waiter = asyncio.ensure_future(store.begin("key", "fp"))
+            await asyncio.sleep(0)
+            store.release("key")
+            return await waiter
+        
+        assert asyncio.run(run()) is None
+    
+    def test_fingerprint_mismatch(self):
+        """Test key yang sama dengan fingerprint berbeda"""
+        store = IdempotencyStore()
+        
+        async def run():
+            await store.begin("key", "fp-1")
+            store.complete("key", 201, b"{}")
+            await store.begin("key", "fp-2")
+        
+        with pytest.raises(IdempotencyKeyConflict):
+            asyncio.run(run())
+    
+    def test_expired_key_executes_again(self):
+        """Test key yang sudah expired dieksekusi ulang"""
+        store = IdempotencyStore(ttl_seconds=0)
+        
+        async def run():
+            await store.begin("key", "fp")
+            store.complete("key", 201, b"{}")
+            return await store.begin("key", "fp")
+        
+        assert asyncio.run(run()) is None
+
+
+# ================== RATE LIMITER TESTS ==================
+
+class TestTokenBucketLimiter:
+    """Test token bucket limiter"""
+    
+    def test_burst_then_limited(self):
+        """Test request diizinkan sampai burst habis"""
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+        assert limiter.acquire("ip:1") == 0
+        assert limiter.acquire("ip:1") == 0
+        assert limiter.acquire("ip:1") == pytest.approx(1.0, abs=0.05)
+    
+    def test_refill_over_time(self, monkeypatch):
+        """Test token terisi ulang sesuai rate"""
+        now = [100.0]
+        monkeypatch.setattr("app.utils.rate_limit.time.monotonic", lambda: now[0])
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=1)
+        
+        assert limiter.acquire("ip:1") == 0
+        assert limiter.acquire("ip:1") > 0
+        now[0] += 1.0
+        assert limiter.acquire("ip:1") == 0
+    
+    def test_max_clients_bounded(self):
+        """Test jumlah bucket dibatasi"""
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_clients=2)
+        for i in range(5):
+            limiter.acquire(f"ip:{i}")
+        assert len(limiter._buckets) == 2
+
+
+# ================== AIMD LIMITER TESTS ==================
+
+class TestAIMDLimiter:
+    """Test adaptive concurrency limiter"""
+    
+    def test_shed_when_limit_reached(self):
+        """Test slot ditolak saat in-flight == limit"""
+        limiter = AIMDLimiter(initial_limit=2, min_limit=1, max_limit=10, target_latency_ms=100)
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        assert limiter.stats()["shed"] == 1
+    
+    def test_additive_increase_on_fast_requests(self):
+        """Test limit naik setelah satu window request cepat"""
+        limiter = AIMDLimiter(initial_limit=2, min_limit=1, max_limit=10, target_latency_ms=100)
+        for _ in range(2):
+            limiter.try_acquire()
+            limiter.release(0.01)
+        assert limiter.stats()["limit"] == 3
+    
+    def test_multiplicative_decrease_on_slow_requests(self):
+        """Test limit turun saat latency melebihi target, tidak di bawah min"""
+        limiter = AIMDLimiter(initial_limit=10, min_limit=2, max_limit=10, target_latency_ms=100, backoff=0.5)
+        limiter.try_acquire()
+        limiter.release(0.5)
+        assert limiter.stats()["limit"] == 5
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(0.5)
+        assert limiter.stats()["limit"] == 2
+
+
+# ================== GROUP COMMIT WRITER TESTS ==================
+
+class TestGroupCommitWriter:
+    """Test group-commit write-behind queue"""
+    
+    def _values(self, i, prodi_id):
+        return dict(
+            nama_lengkap=f"Test {i}",
+            email=f"test{i}@email.com",
+            phone="+628123456789",
+            tanggal_lahir=date(2005, 1, 15),
+            alamat="Test",
+            program_studi_id=prodi_id,
+            jalur_masuk_id=1,
+            status="pending"
+        )
+    
+    def test_rows_committed_in_one_batch(self, db_with_prodi):
+        """Test beberapa registrasi disimpan dalam satu transaksi"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        writer = GroupCommitWriter(TestingSessionLocal, max_batch_rows=10, max_wait_ms=200)
+        try:
+            futures = [writer.submit(self._values(i, prodi.id)) for i in range(5)]
+            ids = [f.result(timeout=5) for f in futures]
+        finally:
+            writer.stop()
+        
+        assert len(set(ids)) == 5
+        assert writer.stats()["batches"] == 1
+        assert db_with_prodi.query(CalonMahasiswa).count() == 5
+    
+    def test_integrity_error_isolated_to_one_request(self, db_with_prodi):
+        """Test email duplikat dalam batch hanya menggagalkan request tersebut"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        writer = GroupCommitWriter(TestingSessionLocal, max_batch_rows=10, max_wait_ms=200)
+        try:
+            ok = writer.submit(self._values(1, prodi.id))
+            duplicate = writer.submit(self._values(1, prodi.id))
+            other = writer.submit(self._values(2, prodi.id))
+            
+            assert ok.result(timeout=5)
+            assert other.result(timeout=5)
+            with pytest.raises(IntegrityError):
+                duplicate.result(timeout=5)
+        finally:
+            writer.stop()
+
+
+# ================== DUPLICATE DETECTION TESTS ==================
+
+class TestDuplicateDetection:
+    """Test normalisasi nama dan blocking duplikat"""
+    
+    def test_normalize_name(self):
+        """Test normalisasi nama (diakritik, tanda baca, alias)"""
+        assert normalize_name("Moh. Ahmad  Hidayat") == "muhammad ahmad hidayat"
+        assert normalize_name("Renée") == "renee"
+    
+    def test_name_key_old_spelling(self):
+        """Test ejaan lama dan urutan nama menghasilkan key yang sama"""
+        assert build_name_key("Soekarno") == build_name_key("Sukarno")
+        assert build_name_key("Djoko Widodo") == build_name_key("Joko Widodo")
+        assert build_name_key("Hidayat, Achmad") == build_name_key("Ahmad Hidajat")
+        assert build_name_key("Budi Santoso") != build_name_key("Siti Aminah")
+    
+    def test_scan_only_compares_within_blocks(self):
+        """Test pasangan beda block tidak dibandingkan"""
+        records = [
+            ApplicantRecord.create(1, "Ahmad Hidayat", "+6281111", date(2005, 1, 1)),
+            ApplicantRecord.create(2, "Achmad Hidajat", "+6282222", date(2005, 1, 1)),
+            ApplicantRecord.create(3, "Budi Santoso", "+6283333", date(2005, 1, 1)),
+        ]
+        result = scan_duplicates(records)
+        
+        assert [(m.duplicate_of, m.calon_id) for m in result["matches"]] == [(1, 2)]
+    
+    def test_scan_skips_oversized_blocks(self):
+        """Test block terlalu besar (mis. telepon sekolah) dilewati"""
+        records = [
+            ApplicantRecord.create(i, f"Nama Berbeda {chr(65 + i)}", "+6281111", date(2000 + i, 1, 1))
+            for i in range(5)
+        ]
+        result = scan_duplicates(records, max_block_size=3)
+        
+        assert result["oversized_blocks"] == 1
+        assert result["matches"] == []
+
+
+# ================== BATCH NIM PARSING TESTS ==================
+
+class TestParseNIMBatch:
+    """Test parsing dan validasi NIM secara batch"""
+    
+    nims = ["2025001-0001", "2024123-9999", "2025-001-0001", "20250010001", "2025001-0001\n", "", "ABC0001-0001"]
+    
+    def _assert_matches_per_item(self, batch):
+        for i, nim in enumerate(self.nims):
+            assert bool(batch.valid[i]) == validate_nim_format(nim)
+            if validate_nim_format(nim):
+                parsed = parse_nim(nim)
+                assert int(batch.tahun[i]) == parsed["tahun"]
+                assert str(batch.kode_prodi[i]) == parsed["kode_prodi"]
+                assert int(batch.running_number[i]) == parsed["running_number"]
+            else:
+                assert int(batch.tahun[i]) == 0
+                assert str(batch.kode_prodi[i]) == ""
+    
+    def test_validate_rejects_trailing_newline(self):
+        """Test NIM dengan newline di akhir tidak valid"""
+        assert not validate_nim_format("2025001-0001\n")
+        assert not validate_nim_format(None)
+    
+    def test_python_fallback_matches_per_item(self):
+        """Test fallback loop Python sama dengan parse_nim per item"""
+        self._assert_matches_per_item(nim_generator._parse_nim_batch_python(self.nims))
+    
+    def test_numpy_matches_per_item(self):
+        """Test versi vectorized numpy sama dengan parse_nim per item"""
+        np = pytest.importorskip("numpy")
+        self._assert_matches_per_item(parse_nim_batch(self.nims))
+        self._assert_matches_per_item(parse_nim_batch(np.asarray(self.nims)))
+    
+    def test_numpy_rejects_longer_strings(self):
+        """Test string lebih panjang dari NIM tidak terpotong jadi valid"""
+        pytest.importorskip("numpy")
+        batch = parse_nim_batch(["2025001-00011", None])
+        assert not batch.valid.any()
+
+
+# ================== LIVE FEED TESTS ==================
+
+class TestLiveFeed:
+    """Test broadcaster delta statistik (SSE)"""
+    
+    def test_burst_coalesced_into_one_event(self):
+        """Test banyak perubahan dalam satu jendela menjadi satu event untuk semua subscriber"""
+        feed = LiveFeed(coalesce_ms=20)
+        
+        async def run():
+            queues = [feed.subscribe() for _ in range(3)]
+            for _ in range(100):
+                feed.publish(status_delta(None, StatusPendaftaran.PENDING, "Teknik Informatika", "SNBP"))
+            feed.publish(status_delta(StatusPendaftaran.PENDING, StatusPendaftaran.APPROVED))
+            await asyncio.sleep(0.1)
+            return [[q.get_nowait() for _ in range(q.qsize())] for q in queues]
+        
+        received = asyncio.run(run())
+        assert [len(messages) for messages in received] == [1, 1, 1]
+        message = received[0][0]
+        assert all(messages[0] is message for messages in received)
+        assert message.startswith("id: 1\nevent: delta\n")
+        assert '"pending":99' in message
+        assert '"approved":1' in message
+        assert '"total_pendaftar":100' in message
+        assert '"program_studi_counts":{"Teknik Informatika":100}' in message
+        assert feed.stats()["broadcasts"] == 1
+    
+    def test_status_delta_with_count(self):
+        """Test delta transisi massal dikalikan jumlah calon"""
+        delta = status_delta(StatusPendaftaran.PENDING, StatusPendaftaran.REJECTED, count=40)
+        assert delta == {"rejected": 40, "pending": -40}
+    
+    def test_publish_without_subscribers_is_noop(self):
+        """Test publish tanpa subscriber tidak menyimpan apa pun"""
+        feed = LiveFeed()
+        feed.publish(status_delta(None, StatusPendaftaran.PENDING))
+        assert feed.stats()["published"] == 0
+    
+    def test_slow_consumer_gets_resync(self):
+        """Test antrian subscriber yang penuh diganti event resync"""
+        feed = LiveFeed(coalesce_ms=1, queue_size=2)
+        
+        async def run():
+            queue = feed.subscribe()
+            for _ in range(3):
+                feed.publish(status_delta(None, StatusPendaftaran.PENDING))
+                await asyncio.sleep(0.02)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+        
+        assert asyncio.run(run()) == [RESYNC]
+        assert feed.stats()["resyncs"] == 1
+    
+    def test_stream_sends_snapshot_then_deltas(self):
+        """Test stream diawali snapshot lalu delta, subscriber dilepas saat stream ditutup"""
+        feed = LiveFeed(coalesce_ms=1)
+        
+        async def run():
+            stream = feed.stream({"total_pendaftar": 5}, heartbeat_seconds=0.05)
+            snapshot = await stream.__anext__()
+            feed.publish(status_delta(StatusPendaftaran.PENDING, StatusPendaftaran.REJECTED))
+            delta = await stream.__anext__()
+            keep_alive = await stream.__anext__()
+            await stream.aclose()
+            return snapshot, delta, keep_alive
+        
+        snapshot, delta, keep_alive = asyncio.run(run())
+        assert snapshot == 'id: 0\nevent: snapshot\ndata: {"total_pendaftar":5}\n\n'
+        assert '"pending":-1' in delta and '"rejected":1' in delta
+        assert keep_alive.startswith(":")
+        assert feed.stats()["subscribers"] == 0
+    
+    def test_new_subscriber_only_gets_deltas_after_subscribe(self):
+        """Test delta sebelum subscribe (sudah ada di snapshot) tidak dikirim ulang ke koneksi baru"""
+        feed = LiveFeed(coalesce_ms=20)
+        
+        async def run():
+            old = feed.subscribe()
+            feed.publish(status_delta(None, StatusPendaftaran.PENDING))
+            new = feed.subscribe()
+            snapshot_seq = feed.seq
+            feed.publish(status_delta(StatusPendaftaran.PENDING, StatusPendaftaran.APPROVED))
+            await asyncio.sleep(0.1)
+            return snapshot_seq, [old.get_nowait() for _ in range(old.qsize())], [
+                new.get_nowait() for _ in range(new.qsize())
+            ]
+        
+        snapshot_seq, old_messages, new_messages = asyncio.run(run())
+        assert snapshot_seq == 1
+        assert len(old_messages) == 2 and '"total_pendaftar":1' in old_messages[0]
+        assert len(new_messages) == 1
+        assert new_messages[0].startswith("id: 2\n") and '"approved":1' in new_messages[0]
+
+
+# ================== EVENT BUS TESTS ==================
+
+class TestEventBus:
+    """Test domain event bus"""
+    
+    def _approved(self, calon_id=1):
+        return Approved(
+            calon_id=calon_id, program_studi_id=1, jalur_masuk_id=1,
+            old_status=StatusPendaftaran.PENDING, nim="2025001-0001"
+        )
+    
+    def test_dispatch_by_type_and_base_class(self):
+        """Test subscriber menerima event sesuai tipe, termasuk subscriber base class"""
+        bus = EventBus()
+        approved, everything = [], []
+        bus.subscribe(Approved, approved.append)
+        bus.subscribe(ApplicantEvent, everything.append)
+        
+        bus.publish(self._approved())
+        bus.publish(Rejected(calon_id=2, program_studi_id=1, jalur_masuk_id=1, old_status=StatusPendaftaran.PENDING))
+        
+        assert [event.calon_id for event in approved] == [1]
+        assert [event.calon_id for event in everything] == [1, 2]
+        assert everything[1].status_values == ("pending", "rejected")
+    
+    def test_failing_subscriber_does_not_break_publish(self):
+        """Test error subscriber tidak sampai ke publisher maupun subscriber lain"""
+        bus = EventBus()
+        received = []
+        
+        def failing(event):
+            raise RuntimeError("gagal")
+        
+        bus.subscribe(ApplicantEvent, failing)
+        bus.subscribe_async(ApplicantEvent, failing, name="failing")
+        bus.subscribe(ApplicantEvent, received.append)
+        bus.publish(self._approved())
+        bus.drain()
+        
+        assert len(received) == 1
+        assert bus.stats()["async_subscribers"][0]["errors"] == 1
+        bus.stop()
+    
+    def test_async_subscriber_does_not_block_publisher(self):
+        """Test subscriber async lambat: publish tidak menunggu, event berlebih di-drop"""
+        bus = EventBus()
+        release = threading.Event()
+        received = []
+        
+        def slow(event):
+            release.wait(5)
+            received.append(event.calon_id)
+        
+        bus.subscribe_async(ApplicantEvent, slow, name="slow", queue_size=2)
+        for calon_id in range(10):
+            bus.publish(self._approved(calon_id))
+        release.set()
+        bus.drain()
+        
+        stats = bus.stats()["async_subscribers"][0]
+        assert stats["delivered"] == len(received)
+        assert stats["dropped"] == 10 - len(received)
+        assert 0 < len(received) <= 3
+        assert received == sorted(received)
+        bus.stop()
+
+
+# ================== NOTIFICATION OUTBOX TESTS ==================
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP stand-in minimal: menyimpan pesan, menolak penerima 'bounce' dan isi 'ditolak'"""
+    
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b"220 localhost ESMTP test\r\n")
+        data_lines = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if data_lines is not None:
+                if line == b".\r\n":
+                    message = b"".join(data_lines)
+                    data_lines = None
+                    if b"ditolak" in message:
+                        self.wfile.write(b"554 Message rejected\r\n")
+                        continue
+                    self.server.messages.append(message.decode())
+                    self.wfile.write(b"250 OK\r\n")
+                else:
+                    data_lines.append(line)
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250 localhost\r\n")
+            elif command == b"RCPT" and b"bounce" in line:
+                self.wfile.write(b"550 No such user\r\n")
+            elif command == b"DATA":
+                data_lines = []
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"RSET":
+                data_lines = None
+                self.wfile.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+@pytest.fixture
+def smtp_server():
+    """SMTP server lokal di port acak"""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class _FlakySender:
+    """Sender palsu: gagal untuk penerima tertentu, mencatat ukuran setiap chunk"""
+    
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.chunks = []
+    
+    def send_many(self, notifications):
+        self.chunks.append(len(notifications))
+        return [
+            ConnectionError("smtp down") if n.recipient in self.failing else None
+            for n in notifications
+        ]
+
+
+class TestNotificationOutbox:
+    """Test SMTP sender dan dispatcher outbox"""
+    
+    def _enqueue(self, db, prodi_id, count):
+        for i in range(count):
+            calon = CalonMahasiswa(
+                nama_lengkap=f"Test {i}", email=f"test{i}@email.com", phone="+628123456789",
+                tanggal_lahir=date(2005, 1, 15), alamat="Test",
+                program_studi_id=prodi_id, jalur_masuk_id=1
+            )
+            db.add(calon)
+            db.flush()
+            db.add(NotificationOutbox(
+                calon_mahasiswa_id=calon.id, recipient=calon.email,
+                subject="Selamat", body=f"NIM Anda: 2025001-{i:04d}"
+            ))
+        db.commit()
+    
+    def test_smtp_sender_reuses_connection(self, smtp_server):
+        """Test beberapa pesan dikirim lewat satu koneksi, penerima yang ditolak tidak menggagalkan yang lain"""
+        sender = SMTPSender("127.0.0.1", smtp_server.server_address[1], "pmb@test.ac.id")
+        notifications = [
+            OutgoingNotification(1, "a@email.com", "Selamat", "NIM Anda: 2025001-0001"),
+            OutgoingNotification(2, "bounce@email.com", "Selamat", "NIM Anda: 2025001-0002"),
+            OutgoingNotification(3, "c@email.com", "Selamat", "NIM Anda: 2025001-0003"),
+        ]
+        
+        errors = sender.send_many(notifications)
+        
+        assert errors[0] is None and errors[2] is None
+        assert errors[1] is not None
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 2
+        assert "NIM Anda: 2025001-0003" in smtp_server.messages[1]
+    
+    def test_smtp_sender_rejected_message_marked_individually(self, smtp_server):
+        """Test pesan yang ditolak server setelah DATA hanya menggagalkan pesan itu"""
+        sender = SMTPSender("127.0.0.1", smtp_server.server_address[1], "pmb@test.ac.id")
+        notifications = [
+            OutgoingNotification(1, "a@email.com", "Selamat", "ditolak"),
+            OutgoingNotification(2, "b@email.com", "Selamat", "NIM Anda: 2025001-0002"),
+        ]
+        
+        errors = sender.send_many(notifications)
+        
+        assert isinstance(errors[0], smtplib.SMTPDataError)
+        assert errors[1] is None
+        assert len(smtp_server.messages) == 1
+    
+    def test_dispatcher_delivers_batch_via_smtp(self, db_with_prodi, smtp_server):
+        """Test dispatcher mengirim outbox lewat SMTP dan menandai sent"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 5)
+        sender = SMTPSender("127.0.0.1", smtp_server.server_address[1], "pmb@test.ac.id")
+        dispatcher = OutboxDispatcher(TestingSessionLocal, sender, batch_size=10, concurrency=2)
+        try:
+            assert dispatcher.run_once() == 5
+        finally:
+            dispatcher.stop()
+        
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 2
+        assert outbox_metrics(db_with_prodi)["sent"] == 5
+        assert outbox_metrics(db_with_prodi)["queue_depth"] == 0
+    
+    def test_batches_limited_by_concurrency(self, db_with_prodi):
+        """Test batch dibagi ke maksimal `concurrency` pengirim"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 10)
+        sender = _FlakySender()
+        dispatcher = OutboxDispatcher(TestingSessionLocal, sender, batch_size=8, concurrency=3)
+        try:
+            assert dispatcher.run_once() == 8
+            assert dispatcher.run_once() == 2
+            assert dispatcher.run_once() == 0
+        finally:
+            dispatcher.stop()
+        
+        assert sorted(sender.chunks) == [1, 1, 2, 3, 3]
+    
+    def test_retry_with_backoff_then_failed(self, db_with_prodi):
+        """Test pengiriman gagal dijadwalkan ulang dengan backoff lalu ditandai failed"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 2)
+        sender = _FlakySender(failing={"test1@email.com"})
+        dispatcher = OutboxDispatcher(
+            TestingSessionLocal, sender, concurrency=1, max_attempts=3, retry_base_seconds=10
+        )
+        now = datetime.utcnow() + timedelta(seconds=1)
+        try:
+            assert dispatcher.run_once(now) == 2
+            # Belum jatuh tempo
+            assert dispatcher.run_once(now + timedelta(seconds=5)) == 0
+            assert dispatcher.run_once(now + timedelta(seconds=15)) == 1
+            assert dispatcher.run_once(now + timedelta(seconds=25)) == 0
+            assert dispatcher.run_once(now + timedelta(seconds=60)) == 1
+        finally:
+            dispatcher.stop()
+        
+        failed = db_with_prodi.query(NotificationOutbox).filter_by(recipient="test1@email.com").one()
+        db_with_prodi.refresh(failed)
+        assert failed.status == OutboxStatus.FAILED
+        assert failed.attempts == 3
+        assert "smtp down" in failed.last_error
+        assert dispatcher.stats()["sent"] == 1
+        assert dispatcher.stats()["retried"] == 2
+        assert dispatcher.stats()["failed"] == 1
+    
+    def test_in_flight_rows_recovered(self, db_with_prodi):
+        """Test baris sending yang tertinggal (crash) dikirim ulang"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 1)
+        db_with_prodi.query(NotificationOutbox).update({NotificationOutbox.status: OutboxStatus.SENDING})
+        db_with_prodi.commit()
+        
+        dispatcher = OutboxDispatcher(TestingSessionLocal, _FlakySender())
+        try:
+            assert dispatcher.recover_in_flight() == 1
+            assert dispatcher.run_once() == 1
+        finally:
+            dispatcher.stop()
+    
+    def test_recover_only_expired_leases(self, db_with_prodi):
+        """Test baris yang masih dikirim dispatcher lain (lease aktif) tidak diambil alih"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 2)
+        now = datetime.utcnow()
+        active, expired = db_with_prodi.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+        active.status = expired.status = OutboxStatus.SENDING
+        active.claimed_at = now - timedelta(seconds=10)
+        expired.claimed_at = now - timedelta(seconds=120)
+        db_with_prodi.commit()
+        
+        dispatcher = OutboxDispatcher(TestingSessionLocal, _FlakySender(), lease_seconds=60)
+        try:
+            assert dispatcher.recover_in_flight(now) == 1
+            assert dispatcher.run_once() == 1
+        finally:
+            dispatcher.stop()
+        
+        db_with_prodi.refresh(active)
+        db_with_prodi.refresh(expired)
+        assert active.status == OutboxStatus.SENDING
+        assert expired.status == OutboxStatus.SENT
+    
+    def test_claim_skips_rows_taken_by_other_dispatcher(self, db_with_prodi):
+        """Test baris yang sudah di-claim dispatcher lain tidak dikirim ulang"""
+        prodi = db_with_prodi.query(ProgramStudi).first()
+        self._enqueue(db_with_prodi, prodi.id, 3)
+        first = db_with_prodi.query(NotificationOutbox).order_by(NotificationOutbox.id).first()
+        first.status = OutboxStatus.SENDING
+        db_with_prodi.commit()
+        
+        sender = _FlakySender()
+        dispatcher = OutboxDispatcher(TestingSessionLocal, sender, concurrency=1)
+        try:
+            assert dispatcher.run_once() == 2
+        finally:
+            dispatcher.stop()
+        
+        db_with_prodi.refresh(first)
+        assert first.status == OutboxStatus.SENDING
+        assert sender.chunks == [2]
+
+
+# ================== JOB RUNNER TESTS ==================
+
+class TestJobRunner:
+    """Test eksekusi job background"""
+    
+    def _register_type(self, monkeypatch, name, handler, max_concurrency=1):
+        monkeypatch.setitem(JOB_TYPES, name, JobType(name, handler, max_concurrency))
+    
+    def _job(self, job_id):
+        db = TestingSessionLocal()
+        try:
+            return db.get(Job, job_id)
+        finally:
+            db.close()
+    
+    def test_per_type_concurrency_cap(self, db_with_prodi, monkeypatch):
+        """Test job melebihi batas concurrency tipe-nya menunggu sampai slot kosong"""
+        release = threading.Event()
+        running = threading.Event()
+        started = []
+        
+        def blocking(db, context):
+            started.append(context.id)
+            context.progress(1, 2)
+            running.set()
+            release.wait(5)
+            context.progress(2, 2)
+            return {"ok": True}
+        
+        self._register_type(monkeypatch, "test_blocking", blocking, max_concurrency=1)
+        runner = JobRunner(TestingSessionLocal, max_workers=4)
+        try:
+            first = runner.create(db_with_prodi, "test_blocking", {}).id
+            second = runner.create(db_with_prodi, "test_blocking", {}).id
+            assert running.wait(5)
+            assert runner.stats()["waiting"] == {"test_blocking": 1}
+            assert self._job(first).status == JobStatus.RUNNING
+            assert self._job(second).status == JobStatus.QUEUED
+            assert runner.progress(first) == (1, 2)
+            
+            release.set()
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop()
+        
+        assert started == [first, second]
+        for job_id in (first, second):
+            job = self._job(job_id)
+            assert job.status == JobStatus.SUCCEEDED
+            assert job.result == {"ok": True}
+            assert (job.progress_done, job.progress_total) == (2, 2)
+    
+    def test_failed_job_records_error(self, db_with_prodi, monkeypatch):
+        """Test exception handler dicatat sebagai job failed"""
+        def failing(db, context):
+            raise RuntimeError("gagal total")
+        
+        self._register_type(monkeypatch, "test_failing", failing)
+        runner = JobRunner(TestingSessionLocal)
+        try:
+            job_id = runner.create(db_with_prodi, "test_failing", {}).id
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop()
+        
+        job = self._job(job_id)
+        assert job.status == JobStatus.FAILED
+        assert job.error == "gagal total"
+    
+    def test_unknown_type_rejected(self, db_with_prodi):
+        """Test tipe job tidak dikenal"""
+        runner = JobRunner(TestingSessionLocal)
+        try:
+            with pytest.raises(ValueError):
+                runner.create(db_with_prodi, "tidak_ada", {})
+        finally:
+            runner.stop()
+    
+    def test_resume_interrupted_jobs(self, db_with_prodi, monkeypatch):
+        """Test job queued dan running dari proses sebelumnya dijalankan ulang saat start"""
+        self._register_type(monkeypatch, "test_echo", lambda db, context: dict(context.params), max_concurrency=2)
+        db_with_prodi.add_all([
+            Job(id="job-queued", type="test_echo", status=JobStatus.QUEUED, params={"n": 1}),
+            Job(id="job-running", type="test_echo", status=JobStatus.RUNNING, params={"n": 2}, attempts=1),
+            Job(id="job-done", type="test_echo", status=JobStatus.SUCCEEDED, params={}, result={"n": 0}),
+        ])
+        db_with_prodi.commit()
+        
+        runner = JobRunner(TestingSessionLocal)
+        try:
+            assert runner.resume() == 2
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop()
+        
+        assert self._job("job-queued").result == {"n": 1}
+        resumed = self._job("job-running")
+        assert resumed.status == JobStatus.SUCCEEDED
+        assert resumed.attempts == 2
+        assert self._job("job-done").result == {"n": 0}
+    
+    def test_resume_skips_jobs_with_live_heartbeat(self, db_with_prodi, monkeypatch):
+        """Test job running yang masih mengirim heartbeat (worker lain) tidak dijalankan ulang"""
+        self._register_type(monkeypatch, "test_echo", lambda db, context: dict(context.params))
+        now = datetime.utcnow()
+        db_with_prodi.add_all([
+            Job(id="job-hidup", type="test_echo", status=JobStatus.RUNNING, params={}, heartbeat_at=now),
+            Job(id="job-mati", type="test_echo", status=JobStatus.RUNNING, params={},
+                heartbeat_at=now - timedelta(minutes=5)),
+        ])
+        db_with_prodi.commit()
+        
+        runner = JobRunner(TestingSessionLocal, lease_seconds=60)
+        try:
+            assert runner.resume() == 1
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop()
+        
+        assert self._job("job-hidup").status == JobStatus.RUNNING
+        assert self._job("job-mati").status == JobStatus.SUCCEEDED
+    
+    def test_heartbeat_persists_progress(self, db_with_prodi, monkeypatch):
+        """Test heartbeat menulis progress job yang berjalan ke database"""
+        release = threading.Event()
+        reported = threading.Event()
+        
+        def blocking(db, context):
+            context.progress(3, 10)
+            reported.set()
+            release.wait(5)
+            return {}
+        
+        self._register_type(monkeypatch, "test_blocking", blocking)
+        runner = JobRunner(TestingSessionLocal)
+        try:
+            job_id = runner.create(db_with_prodi, "test_blocking", {}).id
+            assert reported.wait(5)
+            assert runner.heartbeat() == 1
+            job = self._job(job_id)
+            assert (job.progress_done, job.progress_total) == (3, 10)
+            assert job.heartbeat_at is not None
+            # Job milik proses ini tidak dianggap terputus
+            assert runner.recover_stale(datetime.utcnow() + timedelta(hours=1)) == 0
+            release.set()
+            assert runner.wait_idle(timeout=5)
+        finally:
+            release.set()
+            runner.stop()
+    
+    def test_job_claimed_once(self, db_with_prodi, monkeypatch):
+        """Test job yang dijadwalkan dua kali (mis. resume di dua proses) hanya dijalankan sekali"""
+        calls = []
+        self._register_type(monkeypatch, "test_count", lambda db, context: calls.append(context.id) or {}, max_concurrency=2)
+        db_with_prodi.add(Job(id="job-dobel", type="test_count", status=JobStatus.QUEUED, params={}))
+        db_with_prodi.commit()
+        
+        runner = JobRunner(TestingSessionLocal)
+        try:
+            runner.submit("job-dobel", "test_count")
+            runner.submit("job-dobel", "test_count")
+            assert runner.wait_idle(timeout=5)
+        finally:
+            runner.stop()
+        
+        assert calls == ["job-dobel"]
+        assert self._job("job-dobel").attempts == 1
+
+
+class TestBackup:
+    """Test backup online database SQLite"""
+    
+    @pytest.fixture
+    def source_db(self, tmp_path):
+        path = str(tmp_path / "source.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE calon (id INTEGER PRIMARY KEY, nama TEXT)")
+        conn.executemany("INSERT INTO calon (nama) VALUES (?)", [(f"Calon {i}" * 20,) for i in range(2000)])
+        conn.commit()
+        conn.close()
+        return path
+    
+    def _count(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM calon").fetchone()[0]
+        finally:
+            conn.close()
+    
+    @pytest.mark.parametrize("method", ["backup", "vacuum"])
+    def test_backup_is_verified_copy(self, source_db, tmp_path, method):
+        """Test backup menghasilkan salinan lengkap yang lolos integrity check"""
+        result = backup_database(source_db, str(tmp_path / "backups"), method=method, pages_per_step=8)
+        
+        assert result.integrity == "ok"
+        assert result.method == method
+        assert result.size_bytes > 0
+        assert result.pages > 0
+        assert result.duration_seconds >= 0
+        assert self._count(result.path) == 2000
+        assert not [name for name in os.listdir(tmp_path / "backups") if name.endswith(".partial")]
+    
+    def test_writers_not_blocked(self, source_db, tmp_path):
+        """Test registrasi tetap bisa commit selama backup berjalan per step"""
+        stop = threading.Event()
+        committed = []
+        
+        def writer():
+            conn = sqlite3.connect(source_db, timeout=5)
+            while not stop.is_set():
+                conn.execute("INSERT INTO calon (nama) VALUES ('baru')")
+                conn.commit()
+                committed.append(time.perf_counter())
+                time.sleep(0.002)
+            conn.close()
+        
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            start = time.perf_counter()
+            result = backup_database(
+                source_db, str(tmp_path / "backups"), pages_per_step=4, step_sleep_seconds=0.002, max_restarts=2
+            )
+            end = time.perf_counter()
+        finally:
+            stop.set()
+            thread.join()
+        
+        assert result.integrity == "ok"
+        assert [t for t in committed if start <= t <= end]
+        # Snapshot konsisten: semua data awal ada, tulis selama backup boleh ikut / tidak
+        assert 2000 <= self._count(result.path) <= self._count(source_db)
+    
+    def test_keep_prunes_old_backups(self, source_db, tmp_path):
+        """Test hanya `keep` backup terbaru yang disimpan"""
+        backup_dir = str(tmp_path / "backups")
+        paths = [backup_database(source_db, backup_dir, keep=2).path for _ in range(3)]
+        
+        assert list_backups(backup_dir) == [paths[2], paths[1]]
+    
+    def test_errors(self, tmp_path):
+        """Test method tidak dikenal, database tidak ada dan database non-SQLite"""
+        with pytest.raises(BackupError):
+            backup_database(str(tmp_path / "tidak-ada.db"), str(tmp_path))
+        with pytest.raises(BackupError):
+            backup_database(str(tmp_path / "tidak-ada.db"), str(tmp_path), method="copy")
+        with pytest.raises(BackupError):
+            sqlite_path("postgresql://user@localhost/pmb")
+        assert sqlite_path("sqlite:///./pmb.db") == "./pmb.db"
+    
+    def test_scheduler_records_results(self, source_db, tmp_path):
+        """Test scheduler mencatat backup berhasil dan gagal"""
+        scheduler = BackupScheduler(lambda: backup_database(source_db, str(tmp_path / "backups")), 3600)
+        assert scheduler.run_once().integrity == "ok"
+        
+        scheduler.backup = lambda: backup_database(str(tmp_path / "hilang.db"), str(tmp_path))
+        assert scheduler.run_once() is None
+        
+        stats = scheduler.stats()
+        assert stats["runs"] == 2
+        assert stats["failures"] == 1
+        assert stats["last_backup"]["integrity"] == "ok"
+        assert "tidak ditemukan" in stats["last_error"]
+
+
+class TestSeleksiAllocation:
+    """Test alokasi seleksi (stable matching dengan prioritas skor)"""
+    
+    def test_higher_score_gets_preferred_choice(self):
+        """Test calon berskor tinggi mendapat pilihan teratas, sisanya turun ke pilihan berikutnya"""
+        pelamar = [
+            Pelamar(1, 70.0, (10, 20)),
+            Pelamar(2, 90.0, (10, 20)),
+            Pelamar(3, 80.0, (10,)),
+            Pelamar(4, 80.0, (20, 10)),
+        ]
+        hasil = allocate(pelamar, {10: 1, 20: 2})
+        
+        assert hasil == {2: (10, 1), 4: (20, 1), 1: (20, 2)}
+    
+    def test_ties_broken_by_registration_order(self):
+        """Test skor sama: ID lebih kecil (mendaftar lebih dulu) menang"""
+        hasil = allocate([Pelamar(7, 50.0, (1,)), Pelamar(3, 50.0, (1,))], {1: 1})
+        assert hasil == {3: (1, 1)}
+    
+    def test_allocation_is_stable(self):
+        """Test tidak ada blocking pair dan kapasitas tidak terlampaui pada pool acak"""
+        rng = random.Random(7)
+        prodi = list(range(1, 9))
+        kapasitas = {p: rng.randint(0, 40) for p in prodi}
+        pelamar = [
+            Pelamar(i, float(rng.randint(0, 100)), tuple(rng.sample(prodi, rng.randint(1, 3))))
+            for i in range(1, 500)
+        ]
+        hasil = allocate(pelamar, kapasitas)
+        
+        diterima = {}
+        for calon_id, (p, _) in hasil.items():
+            diterima.setdefault(p, []).append(calon_id)
+        assert all(len(ids) <= kapasitas[p] for p, ids in diterima.items())
+        
+        rank = {c.id: (-c.skor, c.id) for c in pelamar}
+        for calon in pelamar:
+            assigned = hasil.get(calon.id)
+            better = calon.pilihan[:assigned[1] - 1] if assigned else calon.pilihan
+            for p in better:
+                # Prodi yang lebih disukai harus penuh oleh calon berperingkat lebih baik
+                ids = diterima.get(p, [])
+                assert len(ids) == kapasitas[p]
+                assert all(rank[other] < rank[calon.id] for other in ids)
+
+
+class TestOrderStatisticTree:
+    """Test treap order-statistic untuk index peringkat"""
+    
+    def test_rank_and_top_match_sorted_list(self):
+        """Test rank dan top-k sama dengan list terurut setelah insert / remove acak"""
+        rng = random.Random(7)
+        keys = {(-float(rng.randint(0, 50)), i) for i in range(300)}
+        tree = OrderStatisticTree(keys, rng=random.Random(1))
+        
+        for step in range(300):
+            key = (-float(rng.randint(0, 50)), rng.randint(0, 400))
+            if key in keys:
+                assert tree.remove(key) is True
+                keys.discard(key)
+            else:
+                tree.insert(key)
+                keys.add(key)
+            if step % 50 == 0:
+                ordered = sorted(keys)
+                assert len(tree) == len(ordered)
+                assert all(tree.rank(k) == position for position, k in enumerate(ordered, start=1))
+                assert tree.top(10) == ordered[:10]
+        
+        assert tree.remove((1.0, -1)) is False
+        assert tree.rank((1.0, -1)) is None
+        assert tree.top(10_000) == sorted(keys)
+    
+    def test_empty_tree(self):
+        tree = OrderStatisticTree()
+        assert len(tree) == 0
+        assert tree.top(5) == []
+        tree.insert((-1.0, 1))
+        assert tree.rank((-1.0, 1)) == 1
+
+
+# ================== SCHEMA UPGRADE TESTS ==================
+
+# Skema calon_mahasiswa sebelum kolom-kolom baru ditambahkan
+OLD_SCHEMA_DDL = [
+    """
+    CREATE TABLE program_studi (
+        id INTEGER NOT NULL, kode VARCHAR(3) NOT NULL, nama VARCHAR(100) NOT NULL,
+        fakultas VARCHAR(100) NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE jalur_masuk (
+        id INTEGER NOT NULL, kode VARCHAR(20) NOT NULL, nama VARCHAR(100) NOT NULL,
+        deskripsi VARCHAR(255), created_at DATETIME NOT NULL, PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE calon_mahasiswa (
+        id INTEGER NOT NULL, nama_lengkap VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL,
+        phone VARCHAR(20) NOT NULL, tanggal_lahir DATE NOT NULL, alamat VARCHAR(255) NOT NULL,
+        program_studi_id INTEGER NOT NULL, jalur_masuk_id INTEGER NOT NULL, status VARCHAR(8) NOT NULL,
+        nim VARCHAR(20), created_at DATETIME NOT NULL, approved_at DATETIME, updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(program_studi_id) REFERENCES program_studi (id),
+        FOREIGN KEY(jalur_masuk_id) REFERENCES jalur_masuk (id)
+    )
+    """,
+    "INSERT INTO program_studi VALUES (1, '001', 'Teknik Informatika', 'Teknik', '2024-01-01 00:00:00', '2024-01-01 00:00:00')",
+    "INSERT INTO jalur_masuk VALUES (1, 'SNBT', 'SNBT', NULL, '2024-01-01 00:00:00')",
+    """
+    INSERT INTO calon_mahasiswa VALUES
+    (1, 'Ahmad Hidayat', 'ahmad@email.com', '082123456789', '2005-01-15', 'Jl. Merdeka', 1, 1,
+     'PENDING', NULL, '2024-03-01 08:00:00.000000', NULL, '2024-03-01 08:00:00.000000'),
+    (2, 'Siti Nurhaliza', 'siti@email.com', '082123456780', '2005-02-20', 'Jl. Sudirman', 1, 1,
+     'APPROVED', '20240010001', '2024-03-01 09:00:00.000000', '2024-03-02 10:00:00.000000',
+     '2024-03-02 10:00:00.000000')
+    """,
+]
+
+
+class TestEnsureSchema:
+    """Test upgrade skema database lama saat startup"""
+    
+    def _old_engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.begin() as connection:
+            for statement in OLD_SCHEMA_DDL:
+                connection.exec_driver_sql(statement)
+        Base.metadata.create_all(engine)
+        return engine
+    
+    def test_adds_and_backfills_name_key(self, tmp_path):
+        """Test kolom name_key ditambahkan, diisi untuk baris lama, dan index dibuat"""
+        engine = self._old_engine(tmp_path)
+        
+        assert "calon_mahasiswa.name_key" in ensure_schema(engine)
+        with engine.connect() as connection:
+            keys = dict(connection.exec_driver_sql("SELECT id, name_key FROM calon_mahasiswa").all())
+            indexes = {row[1] for row in connection.exec_driver_sql("PRAGMA index_list(calon_mahasiswa)")}
+        assert keys[1] == build_name_key("Ahmad Hidayat")
+        assert keys[2]
+        assert "ix_calon_mahasiswa_dob_name_key" in indexes
+        engine.dispose()
+    
+    def test_backfills_change_seq(self, tmp_path):
+        """Test baris lama mendapat change_seq dari sequence, urut ID"""
+        engine = self._old_engine(tmp_path)
+        ensure_schema(engine)
+        
+        with engine.connect() as connection:
+            seqs = dict(connection.exec_driver_sql("SELECT id, change_seq FROM calon_mahasiswa").all())
+            sequence = connection.exec_driver_sql(
+                "SELECT value FROM change_sequence WHERE name = 'calon_mahasiswa'"
+            ).scalar()
+            indexes = {row[1] for row in connection.exec_driver_sql("PRAGMA index_list(calon_mahasiswa)")}
+        assert seqs == {1: 1, 2: 2}
+        assert sequence == 2
+        assert "ix_calon_mahasiswa_change_seq" in indexes
+        engine.dispose()
+    
+    def test_orm_works_after_upgrade(self, tmp_path):
+        """Test model CalonMahasiswa terbaru bisa dimuat dari database lama"""
+        engine = self._old_engine(tmp_path)
+        ensure_schema(engine)
+        
+        db = sessionmaker(bind=engine)()
+        calon = db.query(CalonMahasiswa).filter_by(id=1).one()
+        assert calon.skor is None
+        assert db.query(CalonMahasiswa).filter_by(id=2).one().program_studi_diterima_id == 1
+        calon.skor = 80.0
+        db.commit()
+        assert calon.change_seq == 3
+        db.close()
+        
+        with engine.connect() as connection:
+            indexes = {row[1] for row in connection.exec_driver_sql("PRAGMA index_list(calon_mahasiswa)")}
+        assert "ix_calon_mahasiswa_jalur_status" in indexes
+        engine.dispose()
+    
+    def test_idempotent(self, tmp_path):
+        """Test database yang sudah terbaru tidak diubah"""
+        engine = self._old_engine(tmp_path)
+        ensure_schema(engine)
+        assert ensure_schema(engine) == []
+        engine.dispose()